@@ -15,7 +15,6 @@
 """Performs repository-specific activation activities."""
 
 import os
-import shutil
 import sys
 import textwrap
 
@@ -23,7 +22,6 @@ sys.path.insert(0, os.getenv("DEVELOPMENT_ENVIRONMENT_FUNDAMENTAL"))
 from RepositoryBootstrap.SetupAndActivate import (
     CommonEnvironment,
     CurrentShell,
-    DynamicPluginArchitecture,
 )
 
 del sys.path[0]
@@ -38,6 +36,12 @@ sys.modules.pop("_custom_data", None)
 
 from _custom_data import _CUSTOM_DATA
 
+sys.modules.pop("_install_stamp", None)
+sys.modules.pop("_test_executor_registry", None)
+
+import _install_stamp
+import _test_executor_registry
+
 # <Class '<name>' has no '<attr>' member> pylint: disable = E1101
 # <Unrearchable code> pylint: disable = W0101
 # <Unused argument> pylint: disable = W0613
@@ -74,11 +78,29 @@ def GetCustomActions(
             ),
         )
     else:
-        # Verify installations
+        # Verify installations. Verification hashes the entire installation, so the results
+        # are cached along with a fingerprint of the installation (the names, sizes, and
+        # modification times of its files); installations are only verified again when the
+        # fingerprint changes (or when verification is forced via the environment variable
+        # `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_FORCE_VERIFICATION`).
+        cache_filename = os.path.join(generated_dir, "CppClangVerification.json")
+
+        if os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_FORCE_VERIFICATION") == "1":
+            cache = {}
+        else:
+            cache = _install_stamp.Load(cache_filename)
+
         for name, version, path_parts in _CUSTOM_DATA:
             this_dir = os.path.join(*([_script_dir] + path_parts))
             assert os.path.isdir(this_dir), this_dir
 
+            if cache.get(this_dir, None) == _install_stamp.Create(this_dir, version):
+                if verbose:
+                    output_stream.write("'{}' was verified during a previous activation.\n".format(name))
+
+                continue
+
+            # The result is cached by a separate action that only runs when verification succeeds
             actions += [
                 CurrentShell.Commands.Execute(
                     'python "{script}" Verify "{name}" "{dir}" "{version}"'.format(
@@ -93,6 +115,9 @@ def GetCustomActions(
                         version=version,
                     ),
                 ),
+                CurrentShell.Commands.Execute(
+                    _install_stamp.CreateRecordCommandLine(cache_filename, this_dir, version),
+                ),
             ]
 
         if configuration.endswith("ex"):
@@ -106,7 +131,14 @@ def GetCustomActions(
             if CurrentShell.CategoryName == "Linux":
                 # If here, we are relying on tools that should be installed within the
                 # environment. Verify that these tools are available.
-                if not shutil.which("ld"):
+                registry = _test_executor_registry.Get()
+
+                if not registry["ld"] or not registry["c_runtime"]:
+                    # The tools may have been installed since the manifest was created
+                    registry = _test_executor_registry.Create()
+                    _test_executor_registry.Save(registry)
+
+                if not registry["ld"]:
                     raise Exception(
                         textwrap.dedent(
                             """\
@@ -120,7 +152,7 @@ def GetCustomActions(
                         ),
                     )
 
-                if not os.path.isfile("/usr/lib/x86_64-linux-gnu/crt1.o"):
+                if not registry["c_runtime"]:
                     raise Exception(
                         textwrap.dedent(
                             """\
@@ -150,12 +182,14 @@ def GetCustomActions(
                 ),
             ]
 
-            actions += DynamicPluginArchitecture.CreateRegistrationStatements(
-                "DEVELOPMENT_ENVIRONMENT_TEST_EXECUTORS",
-                os.path.join(_script_dir, "Scripts", "TestExecutors"),
-                lambda fullpath, name, ext: ext == ".py"
-                and name.endswith("TestExecutor"),
-            )
+            # The test executors were enumerated during setup (or a previous activation)
+            actions += [
+                CurrentShell.Commands.Augment(
+                    "DEVELOPMENT_ENVIRONMENT_TEST_EXECUTORS",
+                    fullpath,
+                )
+                for fullpath in _test_executor_registry.Get()["test_executors"]
+            ]
 
         if configuration.startswith("x86"):
             actions += [
@@ -215,3 +249,4 @@ def GetCustomScriptExtractors():
     """
 
     return
+
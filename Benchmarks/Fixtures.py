@@ -0,0 +1,354 @@
+# ----------------------------------------------------------------------
+# |
+# |  Fixtures.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-25 09:21:04
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Generates synthetic coverage artifacts used by the benchmarks.
+
+All content is generated from a seed so that results are reproducible across runs.
+.gcno and .gcda files are written in the format used by GCC 12.2 (which is also read by
+grcov and `CppClangCommon.GcovData`).
+"""
+
+import json
+import os
+import random
+import struct
+import sys
+
+from collections import namedtuple
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+
+from CppClangCommon import GcovData
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# "B22*" (GCC 12.2)
+GCOV_VERSION                                = 0x4232322A
+
+Function                                    = namedtuple("Function", ["ident", "name", "source_filename", "line", "num_lines"])
+
+# Each function is represented by this control flow graph (GCC always uses block 0 for the
+# entry block and block 1 for the exit block):
+#
+#     0 (entry) -> 2 (condition) -> 3 (body) -> 4 (join) -> 1 (exit)
+#                                \-------------/
+#
+# Only the arcs 2 -> 3 and 2 -> 4 have counters; all other arcs are on the spanning tree.
+_ARCS                                       = [
+    (0, [(2, GcovData.ARC_ON_TREE)]),
+    (2, [(3, 0), (4, 0)]),
+    (3, [(4, GcovData.ARC_ON_TREE)]),
+    (4, [(1, GcovData.ARC_ON_TREE)]),
+]
+
+# ----------------------------------------------------------------------
+def MangleName(namespace, class_name, method_name):
+    """Returns an Itanium-mangled name for `namespace::class_name::method_name()`"""
+
+    return "_ZN{}Ev".format(
+        "".join("{}{}".format(len(part), part) for part in [namespace, class_name, method_name]),
+    )
+
+
+# ----------------------------------------------------------------------
+def CreateFunctions(num_functions, source_filename, rng):
+    """Returns a list of Function objects"""
+
+    functions = []
+    line = 10
+
+    for index in range(num_functions):
+        num_lines = rng.randint(1, 12)
+
+        functions.append(
+            Function(
+                index + 1,
+                MangleName(
+                    "ns{}".format(index % 7),
+                    "Class{}".format(index // 10),
+                    "Method{}".format(index),
+                ),
+                source_filename,
+                line,
+                num_lines,
+            ),
+        )
+
+        line += num_lines + 4
+
+    return functions
+
+
+# ----------------------------------------------------------------------
+def WriteGcno(filename, functions, stamp):
+    content = [
+        struct.pack("<IIII", GcovData.NOTE_MAGIC, GCOV_VERSION, stamp, 0),
+        _String(os.path.dirname(filename)),
+        struct.pack("<I", 0),               # has_unexecuted_blocks
+    ]
+
+    for function in functions:
+        content.append(
+            _Record(
+                GcovData.TAG_FUNCTION,
+                b"".join(
+                    [
+                        struct.pack("<III", function.ident, 0, 0),
+                        _String(function.name),
+                        struct.pack("<I", 0), # artificial
+                        _String(function.source_filename),
+                        struct.pack("<III", function.line, 1, function.line + function.num_lines + 2),
+                    ],
+                ),
+            ),
+        )
+
+        content.append(_Record(GcovData.TAG_BLOCKS, struct.pack("<I", 5)))
+
+        for source_block, arcs in _ARCS:
+            content.append(
+                _Record(
+                    GcovData.TAG_ARCS,
+                    struct.pack("<I", source_block) + b"".join(struct.pack("<II", dest, flags) for dest, flags in arcs),
+                ),
+            )
+
+        for block, lines in [
+            (2, [function.line + 1]),
+            (3, list(range(function.line + 2, function.line + 2 + function.num_lines))),
+            (4, [function.line + 2 + function.num_lines]),
+        ]:
+            content.append(
+                _Record(
+                    GcovData.TAG_LINES,
+                    b"".join(
+                        [
+                            struct.pack("<II", block, 0),
+                            _String(function.source_filename),
+                            b"".join(struct.pack("<I", line) for line in lines),
+                            struct.pack("<II", 0, 0),
+                        ],
+                    ),
+                ),
+            )
+
+    _WriteFile(filename, b"".join(content))
+
+
+# ----------------------------------------------------------------------
+def WriteGcda(filename, functions, stamp, rng):
+    """Writes counters for the functions; roughly a third of the functions aren't executed and another third only partially"""
+
+    content = [struct.pack("<IIII", GcovData.DATA_MAGIC, GCOV_VERSION, stamp, 0)]
+
+    for function in functions:
+        value = rng.random()
+
+        if value < 0.33:
+            taken, not_taken = 0, 0
+        elif value < 0.66:
+            taken, not_taken = 0, rng.randint(1, 1000)
+        else:
+            taken, not_taken = rng.randint(1, 1000), rng.randint(0, 1000)
+
+        content.append(_Record(GcovData.TAG_FUNCTION, struct.pack("<III", function.ident, 0, 0)))
+        content.append(_Record(GcovData.TAG_COUNTER_ARCS, struct.pack("<QQ", taken, not_taken)))
+
+    _WriteFile(filename, b"".join(content))
+
+
+# ----------------------------------------------------------------------
+def CreateBinaries(
+    root,
+    num_binaries,
+    num_methods,
+    depth,
+    seed,
+):
+    """\
+    Creates binaries (along with .gcno files) in `root` and .gcda files in a directory
+    hierarchy `depth` levels deep beneath it; returns the binary filenames.
+    """
+
+    rng = random.Random(seed)
+
+    FileSystem.MakeDirs(root)
+
+    binaries = []
+
+    for index in range(num_binaries):
+        name = "Binary{:04}".format(index)
+
+        binary_filename = os.path.join(root, name)
+        _WriteFile(binary_filename, b"#!/bin/sh\n")
+        os.chmod(binary_filename, 0o755)
+
+        functions = CreateFunctions(
+            num_methods,
+            os.path.join(root, "src", "{}.cpp".format(name)),
+            rng,
+        )
+
+        stamp = rng.randint(1, 0xFFFFFFFF)
+
+        WriteGcno(os.path.join(root, "{}.gcno".format(name)), functions, stamp)
+
+        gcda_dir = os.path.join(
+            root,
+            "obj",
+            *["level{}_{}".format(level, index % (level + 2)) for level in range(depth)]
+        )
+
+        WriteGcda(os.path.join(gcda_dir, "{}.gcda".format(name)), functions, stamp, rng)
+
+        binaries.append(binary_filename)
+
+    return binaries
+
+
+# ----------------------------------------------------------------------
+def WriteAdeFile(filename, num_methods, seed):
+    """Writes a file in the format generated by `grcov -t ade`"""
+
+    rng = random.Random(seed)
+
+    FileSystem.MakeDirs(os.path.dirname(filename))
+
+    with open(filename, "w") as f:
+        for index in range(num_methods):
+            if index % 20 == 0:
+                f.write(
+                    "{}\n".format(
+                        json.dumps({"language": "c++", "file": {"name": "src/File{}.cpp".format(index // 20)}}),
+                    ),
+                )
+
+            covered = rng.randint(0, 20)
+
+            f.write(
+                "{}\n".format(
+                    json.dumps(
+                        {
+                            "method": {
+                                "name": MangleName("ns{}".format(index % 7), "Class{}".format(index // 10), "Method{}".format(index)),
+                                "covered": list(range(covered)),
+                                "uncovered": [],
+                                "total_covered": covered,
+                                "total_uncovered": rng.randint(0, 20),
+                                "percentage_covered": 0.0,
+                            },
+                        },
+                    ),
+                ),
+            )
+
+
+# ----------------------------------------------------------------------
+def WriteLcovFile(
+    filename,
+    num_files,
+    num_lines,
+    seed,
+):
+    rng = random.Random(seed)
+
+    FileSystem.MakeDirs(os.path.dirname(filename))
+
+    with open(filename, "w") as f:
+        for file_index in range(num_files):
+            f.write("TN:\nSF:/src/File{:05}.cpp\n".format(file_index))
+
+            num_functions = max(1, num_lines // 10)
+
+            for function_index in range(num_functions):
+                f.write("FN:{},Function{}\n".format(function_index * 10 + 1, function_index))
+
+            for function_index in range(num_functions):
+                f.write("FNDA:{},Function{}\n".format(rng.randint(0, 5), function_index))
+
+            f.write("FNF:{}\nFNH:{}\n".format(num_functions, num_functions))
+
+            for line in range(1, num_lines + 1):
+                f.write("DA:{},{}\n".format(line, rng.randint(0, 3)))
+
+            f.write("LF:{}\nLH:{}\nend_of_record\n".format(num_lines, num_lines))
+
+
+# ----------------------------------------------------------------------
+def WriteProfrawFiles(dirname, num_files, seed):
+    """Writes placeholder .profraw files (these are only meaningful to the stand-in tools)"""
+
+    rng = random.Random(seed)
+
+    filenames = []
+
+    for index in range(num_files):
+        filename = os.path.join(dirname, "shard_{:05}.profraw".format(index))
+        _WriteFile(filename, bytes(rng.getrandbits(8) for _ in range(256)))
+
+        filenames.append(filename)
+
+    return filenames
+
+
+# ----------------------------------------------------------------------
+def CreateStandInTools(dirname):
+    """\
+    Creates scripts in `dirname` that stand in for grcov, llvm-cov, and llvm-profdata so that
+    the benchmarks can run without those tools; `dirname` should be prepended to the path.
+    """
+
+    FileSystem.MakeDirs(dirname)
+
+    stand_in_script = os.path.join(_script_dir, "StandInTools.py")
+
+    for tool_name in ["grcov", "llvm-cov", "llvm-profdata"]:
+        if sys.platform.startswith("win"):
+            filename = os.path.join(dirname, "{}.cmd".format(tool_name))
+            content = '@"{}" "{}" {} %*\n'.format(sys.executable, stand_in_script, tool_name)
+        else:
+            filename = os.path.join(dirname, tool_name)
+            content = '#!/bin/sh\nexec "{}" "{}" {} "$@"\n'.format(sys.executable, stand_in_script, tool_name)
+
+        with open(filename, "w") as f:
+            f.write(content)
+
+        os.chmod(filename, 0o755)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _String(value):
+    content = value.encode("utf-8") + b"\0"
+    return struct.pack("<I", len(content)) + content
+
+
+# ----------------------------------------------------------------------
+def _Record(tag, content):
+    return struct.pack("<II", tag, len(content)) + content
+
+
+# ----------------------------------------------------------------------
+def _WriteFile(filename, content):
+    FileSystem.MakeDirs(os.path.dirname(filename))
+
+    with open(filename, "wb") as f:
+        f.write(content)
@@ -0,0 +1,643 @@
+# ----------------------------------------------------------------------
+# |
+# |  RunBenchmarks.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-25 11:14:37
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Benchmarks the phases of the coverage pipeline using synthetic fixtures.
+
+grcov, llvm-cov, and llvm-profdata are replaced by stand-ins (see StandInTools.py) so that
+the benchmarks run offline and produce comparable results across machines; results are
+written as JSON.
+"""
+
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+
+from collections import namedtuple, OrderedDict
+
+import CommonEnvironment
+from CommonEnvironment.CallOnExit import CallOnExit
+from CommonEnvironment import CommandLine
+from CommonEnvironment import FileSystem
+from CommonEnvironment import Process
+from CommonEnvironment.Shell.All import CurrentShell
+from CommonEnvironment.StreamDecorator import StreamDecorator
+
+from CppClangCommon import AdeParser
+from CppClangCommon.ArtifactStaging import ArtifactStager, GatherFiles
+from CppClangCommon.CodeCoverageExecutor import CodeCoverageExecutor
+from CppClangCommon import CoverageDiff
+from CppClangCommon import CoverageStore
+from CppClangCommon import CoverageTools
+from CppClangCommon.Demangler import Demangler
+from CppClangCommon.DirectoryIndex import DirectoryIndex
+from CppClangCommon import GcovData
+from CppClangCommon import IncrementalCoverage
+from CppClangCommon import Lcov
+from CppClangCommon import LlvmCovExport
+from CppClangCommon.MethodFilter import DemangledMethodFilter, MethodFilter
+from CppClangCommon import ProfileData
+
+import Fixtures
+import StandInTools
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+RESULTS_VERSION                             = 1
+
+Scale                                       = namedtuple(
+    "Scale",
+    [
+        "num_binaries",
+        "num_methods",                      # Per binary
+        "depth",                            # Of the .gcda directory hierarchy
+        "num_lcov_files",                   # Source files in each LCOV shard
+        "num_lines",                        # Per source file
+        "num_profraw_files",
+    ],
+)
+
+SCALES                                      = OrderedDict(
+    [
+        ("small", Scale(5, 100, 3, 200, 100, 16)),
+        ("medium", Scale(25, 500, 6, 2000, 200, 128)),
+        ("large", Scale(100, 2000, 10, 10000, 400, 1024)),
+    ],
+)
+
+NUM_LCOV_SHARDS                             = 4
+
+# ----------------------------------------------------------------------
+@CommandLine.EntryPoint()
+@CommandLine.Constraints(
+    scale=CommandLine.EnumTypeInfo(
+        list(SCALES.keys()),
+        arity="*",
+    ),
+    phase=CommandLine.EnumTypeInfo(
+        [
+            "directory_scan",
+            "artifact_staging",
+            "gcov_parse",
+            "ade_parse",
+            "lcov_parse",
+            "lcov_merge",
+            "coverage_store",
+            "method_filter",
+            "profdata_merge",
+            "export_parse",
+            "stop_coverage",
+            "extract_coverage_info",
+            "invocation_overhead",
+        ],
+        arity="*",
+    ),
+    iterations=CommandLine.IntTypeInfo(
+        min=1,
+        arity="?",
+    ),
+    output_filename=CommandLine.FilenameTypeInfo(
+        ensure_exists=False,
+        arity="?",
+    ),
+    working_dir=CommandLine.DirectoryTypeInfo(
+        ensure_exists=False,
+        arity="?",
+    ),
+    output_stream=None,
+)
+def Execute(
+    scale=None,
+    phase=None,
+    iterations=3,
+    output_filename=None,
+    working_dir=None,
+    preserve_working_dir=False,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Runs the benchmarks and writes the results as JSON to `output_filename` (or the output
+    stream if a filename isn't provided).
+
+    The 'invocation_overhead' phase invokes the ExtractCoverageInfo script and therefore
+    requires an activated environment; it is only included by default when the environment
+    is activated.
+    """
+
+    scales = scale or ["small", "medium"]
+    del scale
+
+    if phase:
+        phases = phase
+    else:
+        is_activated = bool(os.getenv("DEVELOPMENT_ENVIRONMENT_REPOSITORY"))
+
+        phases = [
+            phase_name for phase_name in _PHASES.keys()
+            if is_activated or phase_name != "invocation_overhead"
+        ]
+
+    del phase
+
+    if working_dir is None:
+        working_dir = CurrentShell.CreateTempDirectory()
+    else:
+        FileSystem.MakeDirs(working_dir)
+
+    # ----------------------------------------------------------------------
+    def Cleanup():
+        if not preserve_working_dir:
+            FileSystem.RemoveTree(working_dir)
+
+    # ----------------------------------------------------------------------
+
+    with CallOnExit(Cleanup):
+        # Use the stand-in tools
+        tools_dir = os.path.join(working_dir, "tools")
+        Fixtures.CreateStandInTools(tools_dir)
+
+        os.environ["PATH"] = "{}{}{}".format(tools_dir, os.pathsep, os.getenv("PATH", ""))
+
+        results = []
+
+        with StreamDecorator(output_stream).DoneManager(
+            line_prefix="",
+            prefix="\nResults: ",
+            suffix="\n",
+        ) as dm:
+            for scale_name in scales:
+                dm.stream.write("Creating '{}' fixtures...".format(scale_name))
+                with dm.stream.DoneManager():
+                    fixtures = _CreateFixtures(os.path.join(working_dir, scale_name), SCALES[scale_name])
+
+                for phase_name in phases:
+                    dm.stream.write("Running '{}' ({})...".format(phase_name, scale_name))
+                    with dm.stream.DoneManager(
+                        suffix="\n",
+                    ) as this_dm:
+                        for parameters, timings in _PHASES[phase_name](fixtures, iterations):
+                            results.append(
+                                OrderedDict(
+                                    [
+                                        ("scale", scale_name),
+                                        ("phase", phase_name),
+                                        ("parameters", parameters),
+                                        ("iterations", timings),
+                                        ("min", min(timings)),
+                                        ("median", statistics.median(timings)),
+                                        ("mean", statistics.mean(timings)),
+                                    ],
+                                ),
+                            )
+
+                            if verbose:
+                                this_dm.stream.write(
+                                    "{:<40} {:>10.4f}s\n".format(
+                                        json.dumps(parameters, sort_keys=True),
+                                        results[-1]["median"],
+                                    ),
+                                )
+
+            content = json.dumps(
+                OrderedDict(
+                    [
+                        ("version", RESULTS_VERSION),
+                        (
+                            "environment",
+                            OrderedDict(
+                                [
+                                    ("python", platform.python_version()),
+                                    ("platform", platform.platform()),
+                                    ("cpu_count", multiprocessing.cpu_count()),
+                                ],
+                            ),
+                        ),
+                        ("scales", OrderedDict([(name, SCALES[name]._asdict()) for name in scales])),
+                        ("results", results),
+                    ],
+                ),
+                indent=2,
+            )
+
+            if output_filename:
+                FileSystem.MakeDirs(os.path.dirname(os.path.abspath(output_filename)))
+
+                with open(output_filename, "w") as f:
+                    f.write(content)
+
+                dm.stream.write("Results have been written to '{}'.\n".format(output_filename))
+            else:
+                dm.stream.write("\n{}\n".format(content))
+
+            return dm.result
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_FixtureInfo                                = namedtuple(
+    "_FixtureInfo",
+    [
+        "root",
+        "scale",
+        "bin_dir",
+        "binaries",
+        "gcda_filenames",                   # { binary: nested .gcda filename, ... }
+        "method_names",
+        "ade_filename",
+        "lcov_filenames",
+        "profraw_filenames",
+    ],
+)
+
+# ----------------------------------------------------------------------
+def _CreateFixtures(root, scale):
+    bin_dir = os.path.join(root, "bin")
+
+    binaries = Fixtures.CreateBinaries(bin_dir, scale.num_binaries, scale.num_methods, scale.depth, seed=1)
+
+    gcda_filenames = {}
+
+    for dirname, _, filenames in os.walk(os.path.join(bin_dir, "obj")):
+        for filename in filenames:
+            gcda_filenames[os.path.join(bin_dir, os.path.splitext(filename)[0])] = os.path.join(dirname, filename)
+
+    method_names = []
+
+    for binary in binaries:
+        method_names += GcovData.ReadNoteFunctionNames("{}.gcno".format(binary))
+
+    ade_filename = os.path.join(root, "ade", "lcov.info")
+    Fixtures.WriteAdeFile(ade_filename, scale.num_binaries * scale.num_methods, seed=2)
+
+    lcov_filenames = []
+
+    for index in range(NUM_LCOV_SHARDS):
+        filename = os.path.join(root, "lcov", "shard_{}.info".format(index))
+        Fixtures.WriteLcovFile(filename, scale.num_lcov_files, scale.num_lines, seed=3 + index)
+
+        lcov_filenames.append(filename)
+
+    profraw_dir = os.path.join(root, "profraw")
+    FileSystem.MakeDirs(profraw_dir)
+
+    profraw_filenames = Fixtures.WriteProfrawFiles(profraw_dir, scale.num_profraw_files, seed=10)
+
+    return _FixtureInfo(
+        root,
+        scale,
+        bin_dir,
+        binaries,
+        gcda_filenames,
+        method_names,
+        ade_filename,
+        lcov_filenames,
+        profraw_filenames,
+    )
+
+
+# ----------------------------------------------------------------------
+def _Time(func, iterations, setup_func=None):
+    """Returns the number of seconds required to invoke `func` for each iteration"""
+
+    timings = []
+
+    for _ in range(iterations):
+        if setup_func is not None:
+            setup_func()
+
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+# ----------------------------------------------------------------------
+def _ResetOutput(fixtures):
+    """Removes content generated by previous runs"""
+
+    for item in os.scandir(fixtures.bin_dir):
+        if item.is_file() and os.path.splitext(item.name)[1] in [".gcda", ".info"]:
+            os.remove(item.path)
+
+    for name in [IncrementalCoverage.MANIFEST_FILENAME]:
+        filename = os.path.join(fixtures.bin_dir, name)
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+    FileSystem.RemoveTree(os.path.join(fixtures.bin_dir, IncrementalCoverage.PARTIALS_DIRNAME))
+
+
+# ----------------------------------------------------------------------
+def _VerifyResult(result, output):
+    if result != 0 and not isinstance(result, tuple):
+        raise Exception("The operation failed ({}):\n{}".format(result, output.getvalue()))
+
+
+# ----------------------------------------------------------------------
+def _DirectoryScan(fixtures, iterations):
+    # ----------------------------------------------------------------------
+    def Impl(directory_index):
+        for binary in fixtures.binaries:
+            assert directory_index.Lookup(binary, ".gcno") is not None
+
+    # ----------------------------------------------------------------------
+
+    yield {"state": "cold"}, _Time(lambda: Impl(DirectoryIndex()), iterations)
+
+    directory_index = DirectoryIndex()
+    Impl(directory_index)
+
+    yield {"state": "warm"}, _Time(lambda: Impl(directory_index), iterations)
+
+
+# ----------------------------------------------------------------------
+def _ArtifactStaging(fixtures, iterations):
+    # ----------------------------------------------------------------------
+    def Impl():
+        GatherFiles(fixtures.bin_dir, ".gcda", ArtifactStager())
+
+    # ----------------------------------------------------------------------
+
+    yield {"state": "cold"}, _Time(Impl, iterations, lambda: _ResetOutput(fixtures))
+
+    # The files are now staged
+    yield {"state": "up-to-date"}, _Time(Impl, iterations)
+
+
+# ----------------------------------------------------------------------
+def _GcovParse(fixtures, iterations):
+    # ----------------------------------------------------------------------
+    def Impl():
+        for binary in fixtures.binaries:
+            GcovData.ComputeFunctionCoverage("{}.gcno".format(binary), fixtures.gcda_filenames[binary])
+
+    # ----------------------------------------------------------------------
+
+    yield {}, _Time(Impl, iterations)
+
+
+# ----------------------------------------------------------------------
+def _AdeParse(fixtures, iterations):
+    yield {}, _Time(lambda: AdeParser.AggregateByMethod(fixtures.ade_filename), iterations)
+
+
+# ----------------------------------------------------------------------
+def _LcovParse(fixtures, iterations):
+    # ----------------------------------------------------------------------
+    def Impl():
+        with open(fixtures.lcov_filenames[0]) as f:
+            for source_filename, lines in Lcov.EnumRecords(f):
+                Lcov.FileCoverage(source_filename).Add(lines)
+
+    # ----------------------------------------------------------------------
+
+    yield {}, _Time(Impl, iterations)
+
+
+# ----------------------------------------------------------------------
+def _LcovMerge(fixtures, iterations):
+    output_filename = os.path.join(fixtures.root, "lcov", "merged.info")
+
+    yield {"num_inputs": len(fixtures.lcov_filenames)}, _Time(
+        lambda: Lcov.Merge(fixtures.lcov_filenames, output_filename),
+        iterations,
+    )
+
+
+# ----------------------------------------------------------------------
+def _CoverageStore(fixtures, iterations):
+    store_filename = os.path.join(fixtures.root, "lcov", "shard_0.ccov")
+    CoverageStore.Write(store_filename, CoverageDiff.Load(fixtures.lcov_filenames[0]))
+
+    # Query a file near the end of the store
+    source_filename = "/src/File{:05}.cpp".format(fixtures.scale.num_lcov_files - 1)
+
+    # ----------------------------------------------------------------------
+    def LoadText():
+        CoverageDiff.Load(fixtures.lcov_filenames[0])[source_filename].GetLineCoverage()
+
+    # ----------------------------------------------------------------------
+    def LoadStore():
+        with CoverageStore.CoverageStore(store_filename) as store:
+            store[source_filename].GetLineCoverage()
+
+    # ----------------------------------------------------------------------
+
+    yield {"format": "lcov"}, _Time(LoadText, iterations)
+    yield {"format": "store"}, _Time(LoadStore, iterations)
+
+
+# ----------------------------------------------------------------------
+def _MethodFilter(fixtures, iterations):
+    includes = ["ns1::*", "ns2::Class1::*", "*::Method1*"]
+    excludes = ["ns2::Class10::*", "*::Method12*"]
+
+    # Filters cache results by name, so a new filter is created for each iteration
+    yield {"filter": "mangled"}, _Time(
+        lambda: MethodFilter(includes, excludes).Filter(fixtures.method_names),
+        iterations,
+    )
+
+    demangler = Demangler.Create()
+    if demangler is None:
+        return
+
+    try:
+        yield {"filter": "demangled"}, _Time(
+            lambda: DemangledMethodFilter(includes, excludes, demangler).Filter(fixtures.method_names),
+            iterations,
+        )
+
+    finally:
+        demangler.Close()
+
+
+# ----------------------------------------------------------------------
+def _ProfdataMerge(fixtures, iterations):
+    output_filename = os.path.join(fixtures.root, "profraw", "merged.profdata")
+
+    for fan_in in [ProfileData.DEFAULT_FAN_IN, 8]:
+        output = io.StringIO()
+
+        # ----------------------------------------------------------------------
+        def Impl():
+            _VerifyResult(
+                ProfileData.Merge(fixtures.profraw_filenames, output_filename, output, fan_in=fan_in),
+                output,
+            )
+
+        # ----------------------------------------------------------------------
+
+        yield {"num_inputs": len(fixtures.profraw_filenames), "fan_in": fan_in}, _Time(Impl, iterations)
+
+
+# ----------------------------------------------------------------------
+def _ExportParse(fixtures, iterations):
+    os.environ[StandInTools.NUM_FILES_ENVIRONMENT_VAR] = str(fixtures.scale.num_lcov_files)
+
+    for include_functions in [False, True]:
+        # ----------------------------------------------------------------------
+        def Impl():
+            result, output, _, _, _ = LlvmCovExport.Summarize(
+                fixtures.binaries[:1],
+                os.path.join(fixtures.root, "default.profdata"),
+                include_functions=include_functions,
+            )
+
+            if result != 0:
+                raise Exception("The operation failed ({}):\n{}".format(result, output))
+
+        # ----------------------------------------------------------------------
+
+        yield {"functions": include_functions}, _Time(Impl, iterations)
+
+
+# ----------------------------------------------------------------------
+def _StopCoverage(fixtures, iterations):
+    for parameters in [
+        {"incremental": False},
+        {"incremental": True},
+    ]:
+        output = io.StringIO()
+
+        # ----------------------------------------------------------------------
+        def Impl():
+            executor = CodeCoverageExecutor(cache_results=False, demangle=False, **parameters)
+
+            for binary in fixtures.binaries:
+                executor.PreprocessBinary(binary, output)
+
+            executor.StartCoverage(os.path.join(fixtures.bin_dir, "lcov.info"), output)
+
+            _VerifyResult(executor.StopCoverage(output), output)
+
+        # ----------------------------------------------------------------------
+
+        yield dict(parameters, state="cold"), _Time(Impl, iterations, lambda: _ResetOutput(fixtures))
+
+        if parameters["incremental"]:
+            yield dict(parameters, state="unchanged"), _Time(Impl, iterations)
+
+
+# ----------------------------------------------------------------------
+def _ExtractCoverageInfo(fixtures, iterations):
+    _ResetOutput(fixtures)
+    GatherFiles(fixtures.bin_dir, ".gcda", ArtifactStager())
+
+    coverage_filename = os.path.join(fixtures.bin_dir, "lcov.info")
+
+    includes = ["ns1::*"]
+    excludes = ["*::Method12*"]
+
+    for parameters in [
+        {"mode": "grcov"},
+        {"mode": "single_pass"},
+        {"mode": "native"},
+    ]:
+        output = io.StringIO()
+
+        # ----------------------------------------------------------------------
+        def Impl():
+            executor = CodeCoverageExecutor(
+                single_pass=parameters["mode"] == "single_pass",
+                native=parameters["mode"] == "native",
+                cache_results=False,
+                demangle=False,
+            )
+
+            for binary in fixtures.binaries:
+                executor.PreprocessBinary(binary, output)
+
+            executor.StartCoverage(coverage_filename, output)
+
+            for binary in fixtures.binaries:
+                _VerifyResult(
+                    executor.ExtractCoverageInfo(coverage_filename, binary, includes, excludes, output),
+                    output,
+                )
+
+        # ----------------------------------------------------------------------
+
+        yield parameters, _Time(Impl, iterations)
+
+
+# ----------------------------------------------------------------------
+def _InvocationOverhead(fixtures, iterations):
+    # grcov has very little to do for an empty directory, so the timings are dominated by
+    # the cost of invoking it.
+    bin_dir = os.path.join(fixtures.root, "empty")
+    FileSystem.MakeDirs(bin_dir)
+
+    output = io.StringIO()
+
+    # ----------------------------------------------------------------------
+    def Script():
+        _VerifyResult(
+            Process.Execute(
+                '{} Lcov "/bin_dir={}"'.format(
+                    CurrentShell.CreateScriptName("ExtractCoverageInfo"),
+                    bin_dir,
+                ),
+                output,
+            ),
+            output,
+        )
+
+    # ----------------------------------------------------------------------
+    def InProcess():
+        _VerifyResult(CoverageTools.Lcov([bin_dir], output_stream=output), output)
+
+    # ----------------------------------------------------------------------
+
+    yield {"mode": "script"}, _Time(Script, iterations)
+    yield {"mode": "in_process"}, _Time(InProcess, iterations)
+
+
+# ----------------------------------------------------------------------
+_PHASES                                     = OrderedDict(
+    [
+        ("directory_scan", _DirectoryScan),
+        ("artifact_staging", _ArtifactStaging),
+        ("gcov_parse", _GcovParse),
+        ("ade_parse", _AdeParse),
+        ("lcov_parse", _LcovParse),
+        ("lcov_merge", _LcovMerge),
+        ("coverage_store", _CoverageStore),
+        ("method_filter", _MethodFilter),
+        ("profdata_merge", _ProfdataMerge),
+        ("export_parse", _ExportParse),
+        ("stop_coverage", _StopCoverage),
+        ("extract_coverage_info", _ExtractCoverageInfo),
+        ("invocation_overhead", _InvocationOverhead),
+    ],
+)
+
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(CommandLine.Main())
+    except KeyboardInterrupt:
+        pass
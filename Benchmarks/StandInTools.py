@@ -0,0 +1,275 @@
+# ----------------------------------------------------------------------
+# |
+# |  StandInTools.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-25 10:02:48
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Stand-ins for grcov, llvm-cov, and llvm-profdata used when running the benchmarks.
+
+The output is derived from the synthetic artifacts (so it is structurally similar to the
+output of the real tools), but the tools don't attempt to be complete. Invoke as:
+
+    python StandInTools.py <grcov|llvm-cov|llvm-profdata> <args>...
+"""
+
+import json
+import os
+import sys
+
+import CommonEnvironment
+
+from CppClangCommon import GcovData
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# The number of source files reported by `llvm-cov export` and `llvm-cov show`
+NUM_FILES_ENVIRONMENT_VAR                   = "DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_BENCHMARK_NUM_FILES"
+
+# ----------------------------------------------------------------------
+def Grcov(args):
+    dirs = []
+    output_filename = None
+    output_type = "lcov"
+
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        index += 1
+
+        if arg == "-o":
+            output_filename = args[index]
+            index += 1
+        elif arg == "-t":
+            output_type = args[index]
+            index += 1
+        elif not arg.startswith("-"):
+            dirs.append(arg)
+
+    output = open(output_filename, "w") if output_filename else sys.stdout
+
+    try:
+        for dirname in dirs:
+            for root, _, filenames in os.walk(dirname):
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1] != ".gcno":
+                        continue
+
+                    gcno_filename = os.path.join(root, filename)
+                    gcda_filename = "{}.gcda".format(os.path.splitext(gcno_filename)[0])
+
+                    _WriteGcnoContent(output, output_type, gcno_filename, gcda_filename)
+
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+def LlvmProfdata(args):
+    if not args or args[0] != "merge":
+        sys.stderr.write("Unsupported command\n")
+        return -1
+
+    if "--help" in args:
+        sys.stdout.write("  --input-files=<string>\n  --num-threads=<uint>\n  --sparse\n")
+        return 0
+
+    output_filename = None
+    inputs = []
+
+    index = 1
+    while index < len(args):
+        arg = args[index]
+        index += 1
+
+        if arg == "-o":
+            output_filename = args[index]
+            index += 1
+        elif arg.startswith("--input-files="):
+            with open(arg[len("--input-files="):]) as f:
+                inputs += [line.strip() for line in f if line.strip()]
+        elif not arg.startswith("-"):
+            inputs.append(arg)
+
+    total_size = 0
+
+    for input in inputs:
+        total_size += os.path.getsize(input)
+
+    with open(output_filename, "w") as f:
+        f.write("{} {}\n".format(len(inputs), total_size))
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+def LlvmCov(args):
+    num_files = int(os.getenv(NUM_FILES_ENVIRONMENT_VAR, "100"))
+
+    if args and args[0] == "export":
+        summary_only = "-summary-only" in args
+
+        sys.stdout.write('{"data":[{"files":[')
+
+        for index in range(num_files):
+            content = {
+                "filename": "/src/File{:05}.cpp".format(index),
+                "summary": _CreateSummary(index),
+            }
+
+            if not summary_only:
+                content["segments"] = [[line, 1, index % 3, True, True, False] for line in range(1, 200)]
+
+            sys.stdout.write("{}{}".format("," if index else "", json.dumps(content)))
+
+        sys.stdout.write('],"functions":[')
+
+        if not summary_only:
+            for index in range(num_files * 10):
+                sys.stdout.write(
+                    '{}{}'.format(
+                        "," if index else "",
+                        json.dumps(
+                            {
+                                "name": "_Z8Functionv{}".format(index),
+                                "count": index % 3,
+                                "regions": [[1, 1, 5, 2, index % 3, 0, 0, 0], [2, 1, 3, 2, 0, 0, 0, 0]],
+                                "filenames": ["/src/File{:05}.cpp".format(index // 10)],
+                            },
+                        ),
+                    ),
+                )
+
+        sys.stdout.write(
+            '],"totals":{}}}],"type":"llvm.coverage.json.export","version":"2.0.1"}}'.format(
+                json.dumps(_CreateSummary(num_files)),
+            ),
+        )
+
+        return 0
+
+    if args and args[0] == "show":
+        output_dir = None
+
+        for arg in args:
+            if arg.startswith("-output-dir="):
+                output_dir = arg[len("-output-dir="):]
+
+        page = "<html><body>{}</body></html>\n".format("<pre>line</pre>" * 200)
+
+        if output_dir is None:
+            for _ in range(num_files):
+                sys.stdout.write(page)
+
+            return 0
+
+        for index in range(num_files):
+            filename = os.path.join(output_dir, "coverage", "src", "File{:05}.cpp.html".format(index))
+
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+
+            with open(filename, "w") as f:
+                f.write(page)
+
+        with open(os.path.join(output_dir, "index.html"), "w") as f:
+            f.write(page)
+
+        return 0
+
+    sys.stderr.write("Unsupported command\n")
+    return -1
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _WriteGcnoContent(output, output_type, gcno_filename, gcda_filename):
+    coverage = GcovData.ComputeFunctionCoverage(gcno_filename, gcda_filename)
+
+    if output_type == "ade":
+        source_filenames = {name: source_filename for _, name, source_filename, _ in GcovData.EnumNoteFunctions(gcno_filename)}
+
+        for name, (covered, uncovered) in coverage.items():
+            output.write(
+                "{}\n".format(
+                    json.dumps(
+                        {
+                            "file": {
+                                "name": source_filenames[name],
+                            },
+                            "method": {
+                                "name": name,
+                                "total_covered": covered,
+                                "total_uncovered": uncovered,
+                            },
+                        },
+                    ),
+                ),
+            )
+
+        return
+
+    functions = list(GcovData.EnumNoteFunctions(gcno_filename))
+    if not functions:
+        return
+
+    output.write("TN:\nSF:{}\n".format(functions[0][2]))
+
+    for _, name, _, line in functions:
+        output.write("FN:{},{}\n".format(line, name))
+
+    for _, name, _, _ in functions:
+        output.write("FNDA:{},{}\n".format(1 if coverage.get(name, (0, 0))[0] else 0, name))
+
+    num_lines = 0
+    num_covered = 0
+
+    for _, name, _, line in functions:
+        covered, uncovered = coverage.get(name, (0, 0))
+
+        for offset in range(covered + uncovered):
+            output.write("DA:{},{}\n".format(line + offset + 1, 1 if offset < covered else 0))
+
+        num_lines += covered + uncovered
+        num_covered += covered
+
+    output.write("LF:{}\nLH:{}\nend_of_record\n".format(num_lines, num_covered))
+
+
+# ----------------------------------------------------------------------
+def _CreateSummary(seed):
+    return {
+        name: {"count": 100, "covered": (seed * multiplier) % 101, "percent": 0.0}
+        for name, multiplier in [("lines", 7), ("functions", 3), ("regions", 5), ("branches", 11)]
+    }
+
+
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    tools = {
+        "grcov": Grcov,
+        "llvm-cov": LlvmCov,
+        "llvm-profdata": LlvmProfdata,
+    }
+
+    if len(sys.argv) < 2 or sys.argv[1] not in tools:
+        sys.stderr.write("Usage: {} <{}> <args>...\n".format(sys.argv[0], "|".join(sorted(tools))))
+        sys.exit(-1)
+
+    sys.exit(tools[sys.argv[1]](sys.argv[2:]))
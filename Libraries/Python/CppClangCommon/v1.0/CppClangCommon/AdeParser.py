@@ -0,0 +1,146 @@
+# ----------------------------------------------------------------------
+# |
+# |  AdeParser.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-15 13:05:52
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Streaming parser for files generated by `grcov -t ade`.
+
+Each line in these files is a JSON object; only those that contain "method" records
+are interesting here. Lines are read lazily and those that can't contain a method
+record are skipped before they are decoded, so memory usage stays flat regardless
+of the size of the file.
+"""
+
+import os
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Use the fastest JSON decoder available
+try:
+    import orjson
+
+    _JsonLoads                              = orjson.loads
+
+except ImportError:
+    try:
+        import ujson
+
+        _JsonLoads                          = ujson.loads
+
+    except ImportError:
+        import json
+
+        _JsonLoads                          = json.loads
+
+# ----------------------------------------------------------------------
+def EnumMethods(filename):
+    """Yields (name, total_covered, total_uncovered) for each method record in the file"""
+
+    for _, name, total_covered, total_uncovered in EnumFileMethods(filename):
+        yield name, total_covered, total_uncovered
+
+
+# ----------------------------------------------------------------------
+def EnumFileMethods(filename):
+    """\
+    Yields (source_filename, name, total_covered, total_uncovered) for each method record in
+    the file; `source_filename` is None if the record isn't associated with a file.
+    """
+
+    with open(filename, "rb") as f:
+        for line in f:
+            # Avoid the cost of decoding lines that can't possibly contain method info
+            if b'"method"' not in line:
+                continue
+
+            content = _JsonLoads(line)
+
+            method_content = content.get("method", None)
+            if method_content is None:
+                continue
+
+            name = method_content.get("name", None)
+            total_covered = method_content.get("total_covered", None)
+            total_uncovered = method_content.get("total_uncovered", None)
+
+            if name is None or total_covered is None or total_uncovered is None:
+                continue
+
+            file_content = content.get("file", None) or {}
+
+            yield file_content.get("name", None), name, total_covered, total_uncovered
+
+
+# ----------------------------------------------------------------------
+def Aggregate(
+    filename,
+    should_include_func=None,
+):
+    """Returns (covered, not_covered) for all of the methods in the file"""
+
+    covered = 0
+    not_covered = 0
+
+    for name, total_covered, total_uncovered in EnumMethods(filename):
+        if should_include_func is not None and not should_include_func(name):
+            continue
+
+        covered += total_covered
+        not_covered += total_uncovered
+
+    return covered, not_covered
+
+
+# ----------------------------------------------------------------------
+def AggregateByMethod(filename):
+    """Returns a dict of method name -> (covered, not_covered) for all of the methods in the file"""
+
+    results = {}
+
+    for name, total_covered, total_uncovered in EnumMethods(filename):
+        existing = results.get(name, None)
+        if existing is not None:
+            total_covered += existing[0]
+            total_uncovered += existing[1]
+
+        results[name] = (total_covered, total_uncovered)
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def AggregateByFileAndMethod(filename):
+    """\
+    Returns a dict of (source filename, method name) -> (covered, not_covered) for all of the
+    methods in the file.
+    """
+
+    results = {}
+
+    for source_filename, name, total_covered, total_uncovered in EnumFileMethods(filename):
+        key = (source_filename, name)
+
+        existing = results.get(key, None)
+        if existing is not None:
+            total_covered += existing[0]
+            total_uncovered += existing[1]
+
+        results[key] = (total_covered, total_uncovered)
+
+    return results
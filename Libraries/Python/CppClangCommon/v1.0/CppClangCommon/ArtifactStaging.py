@@ -0,0 +1,339 @@
+# ----------------------------------------------------------------------
+# |
+# |  ArtifactStaging.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-15 08:21:37
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Contains the ArtifactStager object and GatherFiles function"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+import CommonEnvironment
+
+from CppClangCommon import Caching
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class ArtifactStager(object):
+    """\
+    Makes coverage artifacts available in another directory without copying them (when possible).
+
+    Files are hard linked when the source and destination are on the same device, symlinked
+    when they are not, and only copied when neither type of link can be created.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self.num_linked                     = 0
+        self.num_symlinked                  = 0
+        self.num_copied                     = 0
+        self.bytes_copied                   = 0
+        self.bytes_saved                    = 0
+
+        self._lock                          = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def __str__(self):
+        return "{} linked, {} symlinked, {} copied ({} bytes saved)".format(
+            self.num_linked,
+            self.num_symlinked,
+            self.num_copied,
+            self.bytes_saved,
+        )
+
+    # ----------------------------------------------------------------------
+    @property
+    def NumStaged(self):
+        return self.num_linked + self.num_symlinked + self.num_copied
+
+    # ----------------------------------------------------------------------
+    def Stage(self, source_filename, dest_filename, allow_links=True):
+        """\
+        Stages the file, replacing `dest_filename` if it already exists.
+
+        The file is always copied when `allow_links` is False.
+        """
+
+        if os.path.lexists(dest_filename):
+            os.remove(dest_filename)
+
+        file_size = os.path.getsize(source_filename)
+
+        if not allow_links:
+            self._Copy(source_filename, dest_filename, file_size)
+            return
+
+        try:
+            os.link(source_filename, dest_filename)
+
+            with self._lock:
+                self.num_linked += 1
+                self.bytes_saved += file_size
+
+            return
+
+        except OSError:
+            # Different devices, a file system that doesn't support hard links, etc.
+            pass
+
+        try:
+            os.symlink(os.path.realpath(source_filename), dest_filename)
+
+            with self._lock:
+                self.num_symlinked += 1
+                self.bytes_saved += file_size
+
+            return
+
+        except (OSError, NotImplementedError):
+            pass
+
+        self._Copy(source_filename, dest_filename, file_size)
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Copy(self, source_filename, dest_filename, file_size):
+        # Preserve the modification time so that up-to-date checks are possible
+        shutil.copy2(source_filename, dest_filename)
+
+        with self._lock:
+            self.num_copied += 1
+            self.bytes_copied += file_size
+
+
+# ----------------------------------------------------------------------
+def GatherFiles(
+    root,
+    ext,
+    stager,
+    max_workers=None,
+    record_dir=None,
+):
+    """\
+    Stages files with the extension found in descendants of `root` into `root` itself.
+
+    Files that are already up-to-date in `root` are skipped. Files in different directories
+    with the same name but different content can't both be staged; in this case, the file
+    whose path sorts first is staged and the collision is reported. Files in `root` that
+    weren't staged by a previous call are never replaced; if their content is different,
+    the collision is reported. A collision is only reported by the first call that
+    encounters it.
+
+    The files staged and the collisions reported are recorded in `record_dir` (which
+    defaults to a cache directory, see `Caching.GetCacheDirectory`) rather than in `root`.
+
+    Returns (num_staged, num_skipped, collisions), where `collisions` is a list of
+    (dest_filename, [source_filename, ...]) for collisions that weren't reported by a previous
+    call.
+    """
+
+    root = os.path.realpath(root)
+
+    # Find the files
+    sources = {}
+
+    dirs = [root]
+
+    while dirs:
+        this_dir = dirs.pop()
+
+        for item in os.scandir(this_dir):
+            if item.is_dir(follow_symlinks=False):
+                dirs.append(item.path)
+            elif this_dir != root and item.name.endswith(ext) and item.is_file():
+                sources.setdefault(item.name, []).append(item.path)
+
+    if not sources:
+        return 0, 0, []
+
+    # Names of the files in root that were staged by previous calls (and may be replaced) and
+    # the collisions that have already been reported
+    record_filename = os.path.join(
+        record_dir or Caching.GetCacheDirectory("ArtifactStaging"),
+        "{}.json".format(hashlib.sha256(json.dumps([root, ext]).encode("utf-8")).hexdigest()),
+    )
+
+    record = _LoadRecord(record_filename, root)
+
+    staged = set(record["staged"])
+    reported_collisions = set(tuple(collision) for collision in record["collisions"])
+
+    # Determine which files need to be staged
+    to_stage = []
+    collisions = []
+    num_skipped = 0
+
+    for name in sorted(sources):
+        filenames = sorted(sources[name])
+        dest_filename = os.path.join(root, name)
+
+        if (
+            os.path.lexists(dest_filename)
+            and name not in staged
+            and not os.path.islink(dest_filename)
+        ):
+            # The file wasn't staged, so it is preserved
+            if not _AreIdentical([dest_filename] + filenames):
+                collisions.append((dest_filename, [dest_filename] + filenames))
+
+            num_skipped += 1
+            continue
+
+        if len(filenames) > 1 and not _AreIdentical(filenames):
+            collisions.append((dest_filename, filenames))
+
+        source_filename = filenames[0]
+
+        if _IsUpToDate(source_filename, dest_filename):
+            num_skipped += 1
+        else:
+            # Copy rather than link when replacing a file, so that a file that may still be
+            # in use doesn't become an alias of the source.
+            to_stage.append((source_filename, dest_filename, not os.path.lexists(dest_filename)))
+
+    if to_stage:
+        max_workers = min(max_workers or multiprocessing.cpu_count(), len(to_stage))
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            for future in [
+                executor.submit(stager.Stage, source_filename, dest_filename, allow_links)
+                for source_filename, dest_filename, allow_links in to_stage
+            ]:
+                future.result()
+
+        staged |= set(os.path.basename(dest_filename) for _, dest_filename, _ in to_stage)
+
+    # Collisions that are no longer present are forgotten, so that they are reported again if
+    # they reappear
+    current_collisions = set(
+        _CreateCollisionKey(dest_filename, source_filenames)
+        for dest_filename, source_filenames in collisions
+    )
+
+    collisions = [
+        collision
+        for collision in collisions
+        if _CreateCollisionKey(*collision) not in reported_collisions
+    ]
+
+    if staged != set(record["staged"]) or current_collisions != reported_collisions:
+        _SaveRecord(record_filename, root, staged, current_collisions)
+
+    return len(to_stage), num_skipped, collisions
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _GetDirectoryId(directory):
+    # A directory that is deleted and recreated has a different id, in which case the files
+    # within it weren't staged by a previous call.
+    stat = os.stat(directory)
+    return [stat.st_dev, stat.st_ino]
+
+
+# ----------------------------------------------------------------------
+def _CreateCollisionKey(dest_filename, source_filenames):
+    return (os.path.basename(dest_filename),) + tuple(source_filenames)
+
+
+# ----------------------------------------------------------------------
+def _LoadRecord(filename, root):
+    try:
+        with open(filename, encoding="utf-8", errors="surrogateescape") as f:
+            record = json.load(f)
+
+        if record["root"] == root and record["root_id"] == _GetDirectoryId(root):
+            return record
+
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        pass
+
+    return {"staged": [], "collisions": []}
+
+
+# ----------------------------------------------------------------------
+def _SaveRecord(filename, root, staged, collisions):
+    # Write to a temp file first so that concurrent readers never see partial content
+    temp_filename = "{}.{}.tmp".format(filename, uuid.uuid4().hex)
+
+    with open(temp_filename, "w", encoding="utf-8", errors="surrogateescape") as f:
+        json.dump(
+            {
+                "root": root,
+                "root_id": _GetDirectoryId(root),
+                "staged": sorted(staged),
+                "collisions": sorted(collisions),
+            },
+            f,
+        )
+
+    os.replace(temp_filename, filename)
+
+
+# ----------------------------------------------------------------------
+def _IsUpToDate(source_filename, dest_filename):
+    try:
+        dest_stat = os.stat(dest_filename)
+    except OSError:
+        return False
+
+    source_stat = os.stat(source_filename)
+
+    # Linked
+    if os.path.samestat(source_stat, dest_stat):
+        return True
+
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+
+    if source_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+
+    return _HashFile(source_filename) == _HashFile(dest_filename)
+
+
+# ----------------------------------------------------------------------
+def _AreIdentical(filenames):
+    sizes = set(os.path.getsize(filename) for filename in filenames)
+    if len(sizes) != 1:
+        return False
+
+    return len(set(_HashFile(filename) for filename in filenames)) == 1
+
+
+# ----------------------------------------------------------------------
+def _HashFile(filename):
+    hasher = hashlib.sha256()
+
+    with open(filename, "rb") as f:
+        while True:
+            content = f.read(1024 * 1024)
+            if not content:
+                break
+
+            hasher.update(content)
+
+    return hasher.digest()
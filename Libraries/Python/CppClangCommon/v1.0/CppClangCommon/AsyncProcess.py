@@ -0,0 +1,236 @@
+# ----------------------------------------------------------------------
+# |
+# |  AsyncProcess.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-30 10:12:37
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Runs multiple tool processes concurrently with asyncio.
+
+The output of each process is captured in its own buffer. An optional callback is invoked
+(on a worker thread) as soon as each process exits, so that its output can be processed
+while other processes are still running.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import CommonEnvironment
+
+from CppClangCommon import Tracing
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# The maximum number of processes that run at the same time (defaults to the number of CPUs)
+MAX_PROCESSES_ENVIRONMENT_VAR               = "DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_MAX_PROCESSES"
+
+JobResult                                   = namedtuple(
+    "JobResult",
+    [
+        "result",                           # The process' exit code
+        "output",                           # stdout and stderr
+        "value",                            # The value returned by `on_complete` (if provided)
+    ],
+)
+
+# ----------------------------------------------------------------------
+def GetMaxConcurrency(max_concurrency=None):
+    if max_concurrency:
+        return max_concurrency
+
+    value = os.getenv(MAX_PROCESSES_ENVIRONMENT_VAR)
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            pass
+
+    return multiprocessing.cpu_count()
+
+
+# ----------------------------------------------------------------------
+def Execute(
+    command_lines,
+    on_complete=None,
+    max_concurrency=None,
+):
+    """\
+    Invokes the command lines, with at most `max_concurrency` processes running at a time;
+    returns a list of JobResult objects in the same order as `command_lines`.
+
+    `on_complete(index, result, output)` is invoked on a worker thread as soon as the process
+    for `command_lines[index]` exits (regardless of its exit code). Other processes continue
+    to run while it executes.
+    """
+
+    if not command_lines:
+        return []
+
+    max_concurrency = GetMaxConcurrency(max_concurrency)
+
+    with Tracing.Span(
+        "AsyncProcess",
+        measure_subprocesses=True,
+        num_processes=len(command_lines),
+        max_concurrency=max_concurrency,
+    ):
+        loop = _CreateEventLoop()
+
+        try:
+            # Child processes can only be monitored by an asyncio loop running on the main
+            # thread prior to python 3.8; wait for them on worker threads in that scenario.
+            use_threads = (
+                sys.version_info < (3, 8)
+                and sys.platform != "win32"
+                and threading.current_thread() is not threading.main_thread()
+            )
+
+            if sys.version_info < (3, 8) and not use_threads and sys.platform != "win32":
+                asyncio.get_child_watcher().attach_loop(loop)
+
+            with ThreadPoolExecutor(max_concurrency) as executor:
+                return loop.run_until_complete(
+                    _ExecuteAsync(
+                        loop,
+                        executor,
+                        command_lines,
+                        on_complete,
+                        max_concurrency,
+                        use_threads,
+                    ),
+                )
+
+        finally:
+            loop.close()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_READ_CHUNK_SIZE                            = 64 * 1024
+
+# ----------------------------------------------------------------------
+def _CreateEventLoop():
+    if sys.platform == "win32":
+        # Subprocesses are only supported by the proactor loop on Windows
+        return asyncio.ProactorEventLoop()
+
+    return asyncio.new_event_loop()
+
+
+# ----------------------------------------------------------------------
+async def _ExecuteAsync(
+    loop,
+    executor,
+    command_lines,
+    on_complete,
+    max_concurrency,
+    use_threads,
+):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    failed = False
+
+    # ----------------------------------------------------------------------
+    async def Impl(index, command_line):
+        nonlocal failed
+
+        try:
+            async with semaphore:
+                # Don't start new processes once a job has failed, as the results will be discarded
+                if failed:
+                    return None
+
+                if use_threads:
+                    result, output = await loop.run_in_executor(executor, _ExecuteBlocking, command_line)
+                else:
+                    result, output = await _ExecuteProcess(command_line)
+
+            # The semaphore has been released so that the next process can start while this
+            # output is being processed.
+            output = bytes(output).decode("utf-8", "replace")
+
+            value = None
+
+            if on_complete is not None:
+                value = await loop.run_in_executor(executor, on_complete, index, result, output)
+
+            return JobResult(result, output, value)
+
+        except Exception:
+            failed = True
+            raise
+
+    # ----------------------------------------------------------------------
+
+    # Wait for every job (and its `on_complete` callback) to finish before raising, so that
+    # no processes or callbacks are still running once this function returns.
+    results = await asyncio.gather(
+        *[Impl(index, command_line) for index, command_line in enumerate(command_lines)],
+        return_exceptions=True
+    )
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    return results
+
+
+# ----------------------------------------------------------------------
+async def _ExecuteProcess(command_line):
+    process = await asyncio.create_subprocess_shell(
+        command_line,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+
+    try:
+        output = bytearray()
+
+        while True:
+            content = await process.stdout.read(_READ_CHUNK_SIZE)
+            if not content:
+                break
+
+            output += content
+
+        return await process.wait(), output
+
+    except BaseException:
+        # Don't leave the process running if reading its output failed or was cancelled
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+        raise
+
+
+# ----------------------------------------------------------------------
+def _ExecuteBlocking(command_line):
+    result = subprocess.run(
+        command_line,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+
+    return result.returncode, result.stdout
@@ -0,0 +1,256 @@
+# ----------------------------------------------------------------------
+# |
+# |  Caching.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-17 11:02:26
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Functionality used to persist information across coverage runs"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import uuid
+
+from contextlib import contextmanager
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+from CommonEnvironment import Process
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+CACHE_DIR_ENVIRONMENT_VAR                   = "DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_CACHE_DIR"
+
+# ----------------------------------------------------------------------
+def GetCacheDirectory(name):
+    """\
+    Returns a directory (that exists) used to persist `name` information.
+
+    The root directory can be customized by setting the environment variable
+    `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_CACHE_DIR`.
+    """
+
+    root = os.getenv(CACHE_DIR_ENVIRONMENT_VAR)
+
+    if not root:
+        root = os.getenv("LOCALAPPDATA") or os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        root = os.path.join(root, "CppClangCommon")
+
+    result = os.path.join(root, name)
+    FileSystem.MakeDirs(result)
+
+    return result
+
+
+# ----------------------------------------------------------------------
+def GetToolVersion(tool_name):
+    """\
+    Returns the output of `<tool_name> --version` (or None if the tool couldn't be invoked).
+    The tool is only invoked once per process.
+    """
+
+    with _tool_versions_lock:
+        if tool_name in _tool_versions:
+            return _tool_versions[tool_name]
+
+    output_stream = io.StringIO()
+
+    try:
+        result = Process.Execute('"{}" --version'.format(tool_name), output_stream)
+    except Exception:
+        result = -1
+
+    version = output_stream.getvalue().strip() if result == 0 else None
+
+    with _tool_versions_lock:
+        _tool_versions[tool_name] = version
+
+    return version
+
+
+# ----------------------------------------------------------------------
+@contextmanager
+def LockFile(filename):
+    """\
+    Holds an exclusive lock on `filename` that is shared across processes. The lock is taken
+    on a separate `<filename>.lock` file so that `filename` itself can be replaced while the
+    lock is held.
+    """
+
+    with open("{}.lock".format(filename), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds
+                    pass
+
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# ----------------------------------------------------------------------
+class ResultCache(object):
+    """\
+    Persists results keyed by the content of files and other values.
+
+    Each result is stored in its own file. The number of results is bounded; the least
+    recently used results (as tracked by file modification times) are evicted when the
+    number of results exceeds the maximum.
+    """
+
+    DEFAULT_MAX_ENTRIES                     = 20000
+
+    # Check for eviction after this many results have been added
+    EVICTION_INTERVAL                       = 500
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        name,
+        max_entries=None,
+        cache_dir=None,
+    ):
+        self.cache_dir                      = cache_dir or GetCacheDirectory(name)
+        self.max_entries                    = max_entries or self.DEFAULT_MAX_ENTRIES
+
+        self._num_added                     = 0
+        self._lock                          = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def CreateKey(filenames, values, tool_names=None):
+        """\
+        Returns a key based on the contents of the files, the (json-serializable) values, and
+        the versions of the tools (see `GetToolVersion`).
+        """
+
+        hasher = hashlib.sha256()
+
+        for filename in filenames:
+            file_hasher = hashlib.sha256()
+
+            with open(filename, "rb") as f:
+                while True:
+                    content = f.read(1024 * 1024)
+                    if not content:
+                        break
+
+                    file_hasher.update(content)
+
+            hasher.update(file_hasher.digest())
+
+        hasher.update(json.dumps(values, sort_keys=True).encode("utf-8"))
+
+        for tool_name in tool_names or []:
+            hasher.update(json.dumps([tool_name, GetToolVersion(tool_name)]).encode("utf-8"))
+
+        return hasher.hexdigest()
+
+    # ----------------------------------------------------------------------
+    def Get(self, key):
+        """Returns the result associated with the key or None"""
+
+        filename = self._GetFilename(key)
+
+        try:
+            with open(filename) as f:
+                result = json.load(f)
+
+            # Update the modification time so that this is considered recently used
+            os.utime(filename, None)
+
+        except (IOError, OSError, ValueError):
+            return None
+
+        return result
+
+    # ----------------------------------------------------------------------
+    def Set(self, key, value):
+        filename = self._GetFilename(key)
+        FileSystem.MakeDirs(os.path.dirname(filename))
+
+        # Write to a temp file first so that concurrent readers never see partial content
+        temp_filename = "{}.{}.tmp".format(filename, uuid.uuid4().hex)
+
+        with open(temp_filename, "w") as f:
+            json.dump(value, f)
+
+        os.replace(temp_filename, filename)
+
+        with self._lock:
+            self._num_added += 1
+            should_evict = self._num_added % self.EVICTION_INTERVAL == 1
+
+        if should_evict:
+            self.Evict()
+
+    # ----------------------------------------------------------------------
+    def Evict(self):
+        """Removes the least recently used results when the cache is too large"""
+
+        entries = []
+
+        for dir_item in os.scandir(self.cache_dir):
+            if not dir_item.is_dir():
+                continue
+
+            for item in os.scandir(dir_item.path):
+                if item.name.endswith(".json"):
+                    entries.append((item.stat().st_mtime, item.path))
+
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort()
+
+        for _, filename in entries[: len(entries) - self.max_entries]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _GetFilename(self, key):
+        return os.path.join(self.cache_dir, key[:2], "{}.json".format(key))
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_tool_versions                              = {}
+_tool_versions_lock                         = threading.Lock()
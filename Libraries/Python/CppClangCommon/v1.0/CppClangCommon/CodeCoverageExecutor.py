@@ -15,9 +15,10 @@
 # ----------------------------------------------------------------------
 """Contains the CodeCoverageExecutor object"""
 
-import json
 import os
-import shutil
+import threading
+
+from collections import namedtuple
 
 import CommonEnvironment
 from CommonEnvironment.CallOnExit import CallOnExit
@@ -30,6 +31,19 @@ from CppCommon.CodeCoverageExecutor import (
     CodeCoverageExecutor as CodeCoverageExecutorBase,
 )
 
+from CppClangCommon import AdeParser
+from CppClangCommon import CoverageDaemon
+from CppClangCommon import CoverageTools
+from CppClangCommon import GcovData
+from CppClangCommon import IncrementalCoverage
+from CppClangCommon import Tracing
+from CppClangCommon.ArtifactStaging import ArtifactStager, GatherFiles
+from CppClangCommon.Caching import ResultCache
+from CppClangCommon.CoverageIndex import CoverageIndex
+from CppClangCommon.Demangler import Demangler
+from CppClangCommon.DirectoryIndex import DirectoryIndex
+from CppClangCommon.MethodFilter import DemangledMethodFilter, MethodFilter
+
 # ----------------------------------------------------------------------
 _script_fullpath                            = CommonEnvironment.ThisFullpath()
 _script_dir, _script_name                   = os.path.split(_script_fullpath)
@@ -46,22 +60,132 @@ class CodeCoverageExecutor(CodeCoverageExecutorBase):
 
     # ----------------------------------------------------------------------
     # |  Methods
-    def __init__(self):
+    def __init__(
+        self,
+        single_pass=None,
+        demangle=None,
+        cache_results=None,
+        native=None,
+        incremental=None,
+        daemon=None,
+    ):
+        """\
+        When `single_pass` is True, coverage data for all binaries is parsed once and
+        per-binary information is extracted from the resulting index (rather than
+        invoking grcov for each binary). The index is created from the LCOV file generated by
+        `StopCoverage` when it is available. The default value is read from the environment
+        variable `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_SINGLE_PASS`.
+
+        When `demangle` is True, include and exclude filters are matched against demangled
+        method names (if a demangling tool is available). The default value is read from
+        the environment variable `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DEMANGLE`.
+
+        When `cache_results` is True, per-binary results are cached based on the contents of
+        the binary's coverage files, the filters applied, and the versions of the tools and of
+        this executor. Results are not cached when
+        `single_pass` is True, as those results depend upon the coverage files of all binaries.
+        The default value is read from the environment variable
+        `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_CACHE_RESULTS`.
+
+        When `native` is True, per-binary results are calculated by reading the .gcno and .gcda
+        files directly rather than invoking grcov. This mode is experimental: its results have
+        been compared against grcov for files written by GCC, but not yet for files written by
+        clang. The default value is read from the environment variable
+        `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_NATIVE`.
+
+        When `incremental` is True, the final LCOV file is assembled from partial results for
+        each object file, and only those object files whose coverage data has changed since
+        the previous run are processed. The default value is read from the environment
+        variable `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_INCREMENTAL`.
+
+        When `daemon` is True, work is sent to the coverage daemon (see `ExtractCoverageInfo.py
+        Daemon`) when it is running and done in-process when it is not. An error is returned
+        (rather than doing the work in-process) when the daemon accepts a request but doesn't
+        respond within `CoverageDaemon.GetTimeout()` seconds, as it may still be processing that
+        request. The default value is read from the environment variable
+        `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DAEMON`.
+        """
+
+        if single_pass is None:
+            single_pass = os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_SINGLE_PASS") == "1"
+
+        if demangle is None:
+            demangle = os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DEMANGLE") == "1"
+
+        if cache_results is None:
+            cache_results = os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_CACHE_RESULTS") == "1"
+
+        if native is None:
+            native = os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_NATIVE") == "1"
+
+        if incremental is None:
+            incremental = os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_INCREMENTAL") == "1"
+
+        if daemon is None:
+            daemon = os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DAEMON") == "1"
+
+        self._single_pass                   = single_pass
+        self._demangle                      = demangle
+        self._native                        = native
+        self._incremental                   = incremental
+
         self._coverage_filename             = None
         self._dirs                          = set()
 
+        self._directory_index               = DirectoryIndex()
+
+        # The LCOV file generated by `StopCoverage`, which is used to create the coverage index
+        # in single pass mode (rather than invoking grcov a second time).
+        self._lcov_filename                 = None
+
+        self._coverage_index                = None
+        self._coverage_index_lock           = threading.Lock()
+
+        self._demangler                     = None
+        self._method_filters                = {}
+        self._method_filters_lock           = threading.Lock()
+
+        # Single pass results are calculated from an index that merges counts for functions
+        # shared across binaries (for example, inline and template functions), so they can
+        # change when another binary's coverage files change.
+        self._result_cache                  = ResultCache("Results") if cache_results and not single_pass else None
+
+        # The daemon creates executors with the same options
+        self._options                       = {
+            "single_pass": single_pass,
+            "demangle": demangle,
+            "cache_results": cache_results,
+            "native": native,
+            "incremental": incremental,
+        }
+
+        self._daemon_client                 = CoverageDaemon.Client() if daemon and CoverageDaemon.IsSupported() else None
+
     # ----------------------------------------------------------------------
     @Interface.override
     def PreprocessBinary(self, binary_filename, output_stream):
-        self._dirs.add(os.path.dirname(binary_filename))
-        return 0
+        with Tracing.Span("PreprocessBinary", binary=binary_filename):
+            self.AddDirectory(os.path.dirname(binary_filename))
+            return 0
+
+    # ----------------------------------------------------------------------
+    def AddDirectory(self, dirname):
+        """Adds a directory that contains binaries (and their coverage data)"""
+
+        self._dirs.add(dirname)
 
     # ----------------------------------------------------------------------
     @Interface.override
     def StartCoverage(self, coverage_filename, output_stream):
-        # Preserve the final coverage filename
-        self._coverage_filename = coverage_filename
-        return 0
+        with Tracing.Span("StartCoverage", coverage_filename=coverage_filename):
+            # Preserve the final coverage filename
+            self._coverage_filename = coverage_filename
+
+            # Any previously indexed coverage data is now stale
+            self._lcov_filename = None
+            self._coverage_index = None
+
+            return 0
 
     # ----------------------------------------------------------------------
     @Interface.override
@@ -69,28 +193,70 @@ class CodeCoverageExecutor(CodeCoverageExecutorBase):
         if not self._dirs:
             return 0
 
-        # Move coverage data to this dir
-        output_dir = os.path.dirname(self._coverage_filename)
-
-        for filename in FileSystem.WalkFiles(
-            output_dir,
-            include_file_extensions=[".gcda"],
-        ):
-            dest_filename = os.path.join(output_dir, os.path.basename(filename))
-            if dest_filename == filename:
-                continue
-
-            if not os.path.isfile(dest_filename):
-                shutil.copyfile(filename, dest_filename)
-
-        return Process.Execute(
-            '{script} Lcov {dirs} "/output_dir={output}"'.format(
-                script=CurrentShell.CreateScriptName("ExtractCoverageInfo"),
-                dirs=" ".join(['"/bin_dir={}"'.format(dir) for dir in self._dirs]),
-                output=output_dir,
-            ),
-            output_stream,
-        )
+        with Tracing.Span("StopCoverage", num_dirs=len(self._dirs)):
+            result = self._RequestDaemon(
+                "StopCoverage",
+                output_stream,
+                coverage_filename=os.path.abspath(self._coverage_filename),
+            )
+
+            if result is not None:
+                return result
+
+            # Move coverage data to this dir
+            output_dir = os.path.dirname(self._coverage_filename)
+
+            stager = ArtifactStager()
+
+            with Tracing.Span("GatherFiles") as span:
+                num_staged, num_skipped, collisions = GatherFiles(output_dir, ".gcda", stager)
+
+                span.Set(
+                    num_staged=num_staged,
+                    num_skipped=num_skipped,
+                    num_collisions=len(collisions),
+                    bytes_copied=stager.bytes_copied,
+                    bytes_saved=stager.bytes_saved,
+                )
+
+            if num_staged or num_skipped:
+                output_stream.write(
+                    "Gathered coverage data: {} staged, {} up-to-date; {}\n".format(
+                        num_staged,
+                        num_skipped,
+                        stager,
+                    ),
+                )
+
+            for dest_filename, source_filenames in collisions:
+                output_stream.write(
+                    "WARNING: Different coverage data named '{}' was found in multiple directories; '{}' was used.\n{}".format(
+                        os.path.basename(dest_filename),
+                        source_filenames[0],
+                        "".join("    {}\n".format(source_filename) for source_filename in source_filenames),
+                    ),
+                )
+
+            if self._incremental:
+                with Tracing.Span("IncrementalCoverage", measure_subprocesses=True):
+                    result = IncrementalCoverage.Generate(
+                        self._dirs,
+                        output_dir,
+                        output_stream,
+                        directory_index=self._directory_index,
+                    )
+            else:
+                with Tracing.Span("ExtractCoverageInfo Lcov", measure_subprocesses=True):
+                    result = CoverageTools.Lcov(
+                        sorted(self._dirs),
+                        output_dir=output_dir,
+                        output_stream=output_stream,
+                    )
+
+            if result == 0 and self._single_pass:
+                self._lcov_filename = os.path.join(output_dir, "lcov.info")
+
+            return result
 
     # ----------------------------------------------------------------------
     @Interface.override
@@ -102,97 +268,158 @@ class CodeCoverageExecutor(CodeCoverageExecutorBase):
         excludes,
         output_stream,
     ):
+        with Tracing.Span("ExtractCoverageInfo", binary=binary_filename) as span:
+            result = self._RequestDaemon(
+                "ExtractCoverageInfo",
+                output_stream,
+                coverage_filename=os.path.abspath(coverage_filename),
+                binary_filename=os.path.abspath(binary_filename),
+                includes=includes,
+                excludes=excludes,
+            )
 
-        # This is a hack. The names extracted from the coverage files are mangled
-        # while the names provided in includes and excludes are in the glob format.
-        # Split the glob and then determine matches by checking to see if each component
-        # is in the mangled name. There is a lot that could go wrong with this, but
-        # hopefully it is good enough.
+            if result is not None:
+                span.Set(daemon=True)
+                return tuple(result) if isinstance(result, list) else result
 
-        # ----------------------------------------------------------------------
-        def ProcessFilter(value):
-            return [part for part in value.split("::") if part != "*"]
+            result, pending = self._BeginExtraction(
+                binary_filename,
+                includes,
+                excludes,
+                output_stream,
+                span,
+            )
 
-        # ----------------------------------------------------------------------
-        def Matches(value, parts):
-            for part in parts:
-                if part not in value:
-                    return False
+            if pending is None:
+                return result
 
-            return True
+            with Tracing.Span("ExtractCoverageInfo Lcov", measure_subprocesses=True):
+                result = Process.Execute(pending.command_line, output_stream)
 
-        # ----------------------------------------------------------------------
+            return self._CompleteExtraction(pending, result)
 
-        if excludes:
-            excludes = [ProcessFilter(exclude) for exclude in excludes]
-            excludes_func = lambda method_name: any(
-                Matches(method_name, exclude) for exclude in excludes
-            )
-        else:
-            excludes_func = lambda method_name: False
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _GetMethodFilter(self, includes, excludes):
+        # Filters are shared across binaries so that cached results can be reused
+        key = (tuple(includes or []), tuple(excludes or []))
 
-        if includes:
-            includes = [ProcessFilter(include) for include in includes]
-            includes_func = lambda method_name: any(
-                Matches(method_name, include) for include in includes
-            )
-        else:
-            includes_func = lambda method_name: True
+        with self._method_filters_lock:
+            method_filter = self._method_filters.get(key, None)
+            if method_filter is None:
+                if self._demangle and self._demangler is None:
+                    self._demangler = Demangler.Create()
 
-        # ----------------------------------------------------------------------
-        def ShouldInclude(method_name):
-            return not excludes_func(method_name) and includes_func(method_name)
+                    # Fall back to matching mangled names if a demangling tool isn't available
+                    if self._demangler is None:
+                        self._demangle = False
 
-        # ----------------------------------------------------------------------
+                if self._demangler is not None:
+                    method_filter = DemangledMethodFilter(includes, excludes, self._demangler)
+                else:
+                    method_filter = MethodFilter(includes, excludes)
 
-        # grcov will parse every file in the directory which isn't what we want here. Move the coverage
-        # files for this binary to a temp dir, parse that dir, and then remove it.
-        temp_directory = CurrentShell.CreateTempDirectory()
+                self._method_filters[key] = method_filter
 
-        with CallOnExit(lambda: FileSystem.RemoveTree(temp_directory)):
-            # ----------------------------------------------------------------------
-            def GetCoverageFilename(ext):
-                dirname, basename = os.path.split(binary_filename)
-                basename = os.path.splitext(basename)[0]
+        return method_filter
 
-                for item in os.listdir(dirname):
-                    fullpath = os.path.join(dirname, item)
-                    if not os.path.isfile(fullpath):
-                        continue
+    # ----------------------------------------------------------------------
+    def _RequestDaemon(self, command, output_stream, **args):
+        """Returns the daemon's result or None if the daemon isn't available"""
+
+        if self._daemon_client is None:
+            return None
+
+        try:
+            result, output = self._daemon_client.Request(
+                command,
+                options=self._options,
+                dirs=sorted(os.path.abspath(dirname) for dirname in self._dirs),
+                **args
+            )
+        except CoverageDaemon.RequestError as ex:
+            # The daemon may still be processing the request (and writing its output), so
+            # don't do the same work here.
+            output_stream.write("ERROR: {}.\n".format(ex))
+            return -1
+        except (OSError, ValueError):
+            # The request wasn't processed; don't attempt to contact the daemon again
+            self._daemon_client = None
+            return None
 
-                    this_basename, this_ext = os.path.splitext(item)
-                    if this_ext == ext and this_basename.startswith(basename):
-                        return fullpath
+        output_stream.write(output)
 
-                return None
+        return result
 
-            # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _BeginExtraction(
+        self,
+        binary_filename,
+        includes,
+        excludes,
+        output_stream,
+        span,
+    ):
+        """\
+        Returns (result, None) if the result could be calculated in-process or (None,
+        _PendingExtraction) if the command line must be invoked and its result provided to
+        `_CompleteExtraction`.
+        """
+
+        method_filter = self._GetMethodFilter(includes, excludes)
+
+        gcno_filename = self._GetCoverageFilename(binary_filename, ".gcno")
+        assert gcno_filename and os.path.isfile(gcno_filename), (binary_filename, gcno_filename)
+
+        gcda_filename = self._GetCoverageFilename(binary_filename, ".gcda")
+        assert gcda_filename and os.path.isfile(gcda_filename), (binary_filename, gcda_filename)
+
+        cache_key = None
+
+        if self._result_cache is not None:
+            tool_names = ["grcov", "llvm-cov"]
+
+            if isinstance(method_filter, DemangledMethodFilter):
+                tool_names.append(self._demangler.tool)
+
+            cache_key = ResultCache.CreateKey(
+                [gcno_filename, gcda_filename],
+                [
+                    _RESULT_CACHE_VERSION,
+                    self._native,
+                    isinstance(method_filter, DemangledMethodFilter),
+                    sorted(set(includes or [])),
+                    sorted(set(excludes or [])),
+                ],
+                tool_names=tool_names,
+            )
 
-            gcno_filename = GetCoverageFilename(".gcno")
-            assert gcno_filename and os.path.isfile(gcno_filename), (binary_filename, gcno_filename)
+            result = self._result_cache.Get(cache_key)
+            if result is not None:
+                span.Set(cache="hit")
+                return tuple(result), None
 
-            shutil.copyfile(
-                gcno_filename,
-                os.path.join(temp_directory, os.path.basename(gcno_filename)),
-            )
+            span.Set(cache="miss")
 
-            gcda_filename = GetCoverageFilename(".gcda")
-            assert gcda_filename and os.path.isfile(gcda_filename), (binary_filename, gcda_filename)
+        result, pending = self._ExtractCoverageInfoImpl(
+            binary_filename,
+            gcno_filename,
+            gcda_filename,
+            method_filter,
+            output_stream,
+        )
 
-            shutil.copyfile(
-                gcda_filename,
-                os.path.join(temp_directory, os.path.basename(gcda_filename)),
-            )
+        if pending is not None:
+            return None, pending._replace(cache_key=cache_key)
 
-            # Convert the content
-            result = Process.Execute(
-                '{} Lcov "/bin_dir={}" /type=ade'.format(
-                    CurrentShell.CreateScriptName("ExtractCoverageInfo"),
-                    temp_directory,
-                ),
-                output_stream,
-            )
+        self._CacheResult(cache_key, result)
+
+        return result, None
 
+    # ----------------------------------------------------------------------
+    def _CompleteExtraction(self, pending, result):
+        with CallOnExit(lambda: FileSystem.RemoveTree(pending.temp_directory)):
             if result != 0:
                 return result
 
@@ -200,33 +427,149 @@ class CodeCoverageExecutor(CodeCoverageExecutorBase):
             # These coverage files are used to extract coverage percentages for display purposes.
             # Don't let the output name of the file fool you - these files are different from the
             # globally generated coverage file.
-            coverage_filename = os.path.join(temp_directory, "lcov.info")
+            coverage_filename = os.path.join(pending.temp_directory, "lcov.info")
             assert os.path.isfile(coverage_filename), coverage_filename
 
-            # Parse the file
-            covered = 0
-            not_covered = 0
+            with Tracing.Span("AggregateByMethod", bytes=lambda: os.path.getsize(coverage_filename)):
+                methods = AdeParser.AggregateByMethod(coverage_filename)
 
-            with open(coverage_filename) as f:
-                for line in f.readlines():
-                    content = json.loads(line)
+            result = self._SumMethods(methods, pending.method_filter)
 
-                    if "method" not in content:
-                        continue
+        self._CacheResult(pending.cache_key, result)
 
-                    content = content["method"]
+        return result
 
-                    if (
-                        "name" not in content
-                        or "total_covered" not in content
-                        or "total_uncovered" not in content
-                    ):
-                        continue
+    # ----------------------------------------------------------------------
+    def _ExtractCoverageInfoImpl(
+        self,
+        binary_filename,
+        gcno_filename,
+        gcda_filename,
+        method_filter,
+        output_stream,
+    ):
+        if self._native:
+            try:
+                with Tracing.Span("ComputeFunctionCoverage"):
+                    methods = GcovData.ComputeFunctionCoverage(gcno_filename, gcda_filename)
+
+                return self._SumMethods(methods, method_filter), None
+
+            except Exception as ex:
+                output_stream.write(
+                    "Unable to read '{}' ({}); falling back to grcov.\n".format(
+                        gcno_filename,
+                        ex,
+                    ),
+                )
+
+        if self._single_pass:
+            with self._coverage_index_lock:
+                if self._coverage_index is None:
+                    with Tracing.Span("CoverageIndex", measure_subprocesses=True):
+                        if self._lcov_filename is not None and os.path.isfile(self._lcov_filename):
+                            result = 0
+                            self._coverage_index = CoverageIndex.FromLcov(
+                                self._lcov_filename,
+                                self._dirs,
+                                directory_index=self._directory_index,
+                            )
+                        else:
+                            result, self._coverage_index = CoverageIndex.Create(
+                                self._dirs | set([os.path.dirname(binary_filename)]),
+                                output_stream,
+                                directory_index=self._directory_index,
+                            )
+
+                    if result != 0:
+                        return result, None
+
+                coverage_index = self._coverage_index
+
+            if gcno_filename in coverage_index:
+                with Tracing.Span("CoverageIndex.Query"):
+                    return coverage_index.Query(gcno_filename, method_filter), None
 
-                    if not ShouldInclude(content["name"]):
-                        continue
+        # grcov will parse every file in the directory which isn't what we want here. Move the coverage
+        # files for this binary to a temp dir, parse that dir, and then remove it.
+        temp_directory = CurrentShell.CreateTempDirectory()
+
+        try:
+            stager = ArtifactStager()
+
+            with Tracing.Span("Stage") as span:
+                stager.Stage(
+                    gcno_filename,
+                    os.path.join(temp_directory, os.path.basename(gcno_filename)),
+                )
+
+                stager.Stage(
+                    gcda_filename,
+                    os.path.join(temp_directory, os.path.basename(gcda_filename)),
+                )
+
+                span.Set(
+                    num_staged=stager.NumStaged,
+                    bytes_copied=stager.bytes_copied,
+                    bytes_saved=stager.bytes_saved,
+                )
+
+            output_stream.write("Staged coverage data: {}\n".format(stager))
+
+        except:
+            FileSystem.RemoveTree(temp_directory)
+            raise
+
+        return None, _PendingExtraction(
+            CoverageTools.CreateLcovCommandLine(
+                [temp_directory],
+                os.path.join(temp_directory, "lcov.info"),
+                type="ade",
+            ),
+            temp_directory,
+            method_filter,
+            None,
+        )
 
-                    covered += content["total_covered"]
-                    not_covered += content["total_uncovered"]
+    # ----------------------------------------------------------------------
+    def _CacheResult(self, cache_key, result):
+        if cache_key is not None and isinstance(result, tuple):
+            self._result_cache.Set(cache_key, result)
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _SumMethods(methods, method_filter):
+        """Returns (covered, not_covered) for the methods that pass the filter"""
+
+        with Tracing.Span("Filter", num_methods=len(methods)):
+            covered = 0
+            not_covered = 0
+
+            for name in method_filter.Filter(methods):
+                covered += methods[name][0]
+                not_covered += methods[name][1]
 
             return covered, not_covered
+
+    # ----------------------------------------------------------------------
+    def _GetCoverageFilename(self, binary_filename, ext):
+        return self._directory_index.Lookup(binary_filename, ext)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+
+# Increment this value when the way that per-binary results are calculated changes, so that
+# results cached by previous versions aren't used.
+_RESULT_CACHE_VERSION                       = 1
+
+_PendingExtraction                          = namedtuple(
+    "_PendingExtraction",
+    [
+        "command_line",
+        "temp_directory",
+        "method_filter",
+        "cache_key",
+    ],
+)
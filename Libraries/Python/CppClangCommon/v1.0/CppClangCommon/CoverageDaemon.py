@@ -0,0 +1,546 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageDaemon.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-01 13:26:09
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+A long-lived process that services coverage requests over a local Unix socket.
+
+The daemon keeps state that is expensive to recreate (directory indexes, demangled names,
+method filters, and per-binary results) warm across coverage runs. `CodeCoverageExecutor`
+sends its requests to the daemon when it is running and does the work in-process when it
+is not.
+
+Requests and responses are single lines of JSON:
+
+    Request:    {"command": "<name>", "args": {...}, "environment": "<id>"}
+    Response:   {"result": <result>, "output": "<output>", "environment": "<id>"}
+
+The environment id identifies the activated environment (this library, the python
+interpreter, and the path used to find tools); a daemon only services requests from
+clients in the same environment. By default, the socket is created in a directory that is
+only accessible by the current user, and clients only connect to sockets owned by the
+current user.
+"""
+
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from collections import OrderedDict
+
+import CommonEnvironment
+
+from CppClangCommon import CoverageTools
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+SOCKET_ENVIRONMENT_VAR                      = "DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DAEMON_SOCKET"
+
+# The daemon exits when it hasn't received a request in this many seconds
+DEFAULT_IDLE_TIMEOUT                        = 4 * 60 * 60
+
+# Clients stop waiting for a response after this many seconds (the default value can be
+# customized by setting the environment variable `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DAEMON_TIMEOUT`).
+TIMEOUT_ENVIRONMENT_VAR                     = "DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DAEMON_TIMEOUT"
+DEFAULT_TIMEOUT                             = 10 * 60
+
+# ----------------------------------------------------------------------
+def IsSupported():
+    return hasattr(socket, "AF_UNIX")
+
+
+# ----------------------------------------------------------------------
+def GetEnvironmentId():
+    """Returns a value that identifies the current environment"""
+
+    hasher = hashlib.sha256()
+
+    for value in [
+        _script_dir,
+        sys.executable,
+        os.getenv("PATH", ""),
+        os.getenv("DEVELOPMENT_ENVIRONMENT_REPOSITORY", ""),
+        os.getenv("DEVELOPMENT_ENVIRONMENT_REPOSITORY_CONFIGURATION", ""),
+    ]:
+        hasher.update(value.encode("utf-8", "surrogateescape"))
+        hasher.update(b"\0")
+
+    return hasher.hexdigest()[:16]
+
+
+# ----------------------------------------------------------------------
+def GetSocketFilename(socket_filename=None):
+    """\
+    Returns the socket used to communicate with the daemon. The default value can be
+    customized by setting the environment variable `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_DAEMON_SOCKET`.
+    """
+
+    if socket_filename:
+        return socket_filename
+
+    socket_filename = os.getenv(SOCKET_ENVIRONMENT_VAR)
+    if socket_filename:
+        return socket_filename
+
+    # Unix socket names are limited to roughly 100 characters, so use a short path
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        socket_dir = os.path.join(runtime_dir, "CppClangCoverage")
+    else:
+        socket_dir = os.path.join(tempfile.gettempdir(), "CppClangCoverage-{}".format(os.getuid()))
+
+    return os.path.join(socket_dir, "{}.sock".format(GetEnvironmentId()))
+
+
+# ----------------------------------------------------------------------
+def GetTimeout():
+    value = os.getenv(TIMEOUT_ENVIRONMENT_VAR)
+    if value:
+        try:
+            return max(1.0, float(value))
+        except ValueError:
+            pass
+
+    return DEFAULT_TIMEOUT
+
+
+# ----------------------------------------------------------------------
+class RequestError(Exception):
+    """\
+    Raised when a request was sent to the daemon but a response wasn't received. The daemon
+    may still be processing the request.
+    """
+
+
+# ----------------------------------------------------------------------
+class Client(object):
+    """Sends requests to the daemon"""
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        socket_filename=None,
+        timeout=None,
+    ):
+        self.socket_filename                = GetSocketFilename(socket_filename)
+        self.timeout                        = timeout or GetTimeout()
+        self.environment_id                 = GetEnvironmentId()
+
+    # ----------------------------------------------------------------------
+    def IsRunning(self):
+        try:
+            self.Request("Ping", timeout=min(self.timeout, _PING_TIMEOUT))
+            return True
+        except RequestError:
+            # The daemon accepted the connection but is busy
+            return True
+        except (OSError, ValueError):
+            return False
+
+    # ----------------------------------------------------------------------
+    def Request(self, command, timeout=None, **args):
+        """\
+        Returns (result, output) for the request.
+
+        Raises OSError when the daemon isn't running, isn't owned by the current user, or the
+        request can't be sent (in which case the daemon didn't process it), RequestError when
+        the request was sent but a response wasn't received within the timeout (in which case
+        the daemon may still be processing it), and ValueError when the daemon was started in
+        a different environment (in which case the daemon didn't process it).
+        """
+
+        _VerifyOwnership(self.socket_filename)
+
+        timeout = timeout or self.timeout
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect(self.socket_filename)
+
+            # The daemon only processes complete lines, so nothing is processed if this fails
+            s.sendall(
+                "{}\n".format(
+                    json.dumps(
+                        {
+                            "command": command,
+                            "args": args,
+                            "environment": self.environment_id,
+                        },
+                    ),
+                ).encode("utf-8"),
+            )
+
+            try:
+                with s.makefile("rb") as f:
+                    content = f.readline()
+
+            except socket.timeout:
+                raise RequestError(
+                    "The daemon did not respond to '{}' within {} seconds ('{}')".format(
+                        command,
+                        timeout,
+                        self.socket_filename,
+                    ),
+                )
+
+            except OSError as ex:
+                raise RequestError(
+                    "The connection to the daemon failed while waiting for '{}' ({})".format(command, ex),
+                )
+
+        if not content:
+            raise RequestError("The daemon closed the connection while processing '{}'".format(command))
+
+        content = json.loads(content.decode("utf-8"))
+
+        if content.get("environment", None) != self.environment_id:
+            raise ValueError("The daemon was started in a different environment")
+
+        return content["result"], content["output"]
+
+
+# ----------------------------------------------------------------------
+def Serve(
+    socket_filename=None,
+    idle_timeout=None,
+    output_stream=sys.stdout,
+):
+    """\
+    Services requests until the daemon receives a 'Shutdown' request or hasn't received a
+    request in `idle_timeout` seconds; returns a result code.
+    """
+
+    socket_filename = GetSocketFilename(socket_filename)
+
+    if idle_timeout is None:
+        idle_timeout = DEFAULT_IDLE_TIMEOUT
+
+    socket_dir = os.path.dirname(os.path.abspath(socket_filename))
+
+    if not os.path.isdir(socket_dir):
+        # Only the current user may access the directory
+        os.makedirs(socket_dir, 0o700)
+
+    try:
+        _VerifyDirectory(socket_dir)
+
+        if os.path.lexists(socket_filename):
+            _VerifyOwnership(socket_filename)
+
+    except PermissionError as ex:
+        output_stream.write("ERROR: {}\n".format(ex))
+        return -1
+
+    if os.path.lexists(socket_filename):
+        if Client(socket_filename).IsRunning():
+            output_stream.write("ERROR: The daemon is already running ('{}').\n".format(socket_filename))
+            return -1
+
+        # The file was left behind by a daemon that didn't exit cleanly
+        os.remove(socket_filename)
+
+    state = _State()
+
+    server = _Server(socket_filename, state)
+
+    try:
+        # Only the current user may send requests
+        os.chmod(socket_filename, 0o600)
+
+        # ----------------------------------------------------------------------
+        def Watchdog():
+            while not state.shutdown_event.wait(min(idle_timeout, 60) if idle_timeout else None):
+                if idle_timeout and time.time() - state.last_request_time > idle_timeout:
+                    break
+
+            server.shutdown()
+
+        # ----------------------------------------------------------------------
+
+        watchdog_thread = threading.Thread(target=Watchdog)
+        watchdog_thread.daemon = True
+        watchdog_thread.start()
+
+        output_stream.write("Listening on '{}'.\n".format(socket_filename))
+
+        server.serve_forever()
+
+    finally:
+        server.server_close()
+
+        if os.path.exists(socket_filename):
+            os.remove(socket_filename)
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+def Launch(
+    command_line,
+    socket_filename=None,
+    timeout=30.0,
+    output_stream=sys.stdout,
+):
+    """\
+    Invokes `command_line` (a list of arguments that runs `Serve`) in a new session and waits
+    for the daemon to respond; returns a result code.
+    """
+
+    client = Client(socket_filename)
+
+    if client.IsRunning():
+        output_stream.write("The daemon is already running ('{}').\n".format(client.socket_filename))
+        return 0
+
+    process = subprocess.Popen(
+        command_line,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    start_time = time.time()
+
+    while not client.IsRunning():
+        if process.poll() is not None:
+            output_stream.write("ERROR: The daemon exited with the result code {}.\n".format(process.returncode))
+            return -1
+
+        if time.time() - start_time > timeout:
+            output_stream.write("ERROR: The daemon did not start within {} seconds.\n".format(timeout))
+            return -1
+
+        time.sleep(0.1)
+
+    output_stream.write("The daemon is listening on '{}' (pid {}).\n".format(client.socket_filename, process.pid))
+    return 0
+
+
+# ----------------------------------------------------------------------
+def Stop(
+    socket_filename=None,
+    output_stream=sys.stdout,
+):
+    """Stops a running daemon; returns a result code"""
+
+    client = Client(socket_filename)
+
+    try:
+        result, output = client.Request("Shutdown")
+    except RequestError as ex:
+        output_stream.write("ERROR: {}.\n".format(ex))
+        return -1
+    except (OSError, ValueError):
+        output_stream.write("The daemon is not running ('{}').\n".format(client.socket_filename))
+        return 0
+
+    output_stream.write(output)
+
+    if result == 0:
+        output_stream.write("The daemon has been stopped.\n")
+
+    return result
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_PING_TIMEOUT                               = 5.0
+
+# The maximum number of executors (each of which is specific to a set of options and
+# directories) that the daemon keeps
+_MAX_EXECUTORS                              = 16
+
+# ----------------------------------------------------------------------
+def _VerifyDirectory(directory):
+    """Raises PermissionError if users other than the current user can create files in the directory"""
+
+    directory_stat = os.stat(directory)
+
+    if directory_stat.st_uid != os.getuid() and not directory_stat.st_mode & stat.S_ISVTX:
+        raise PermissionError("'{}' is not owned by the current user".format(directory))
+
+    if directory_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and not directory_stat.st_mode & stat.S_ISVTX:
+        raise PermissionError("'{}' may be modified by other users".format(directory))
+
+
+# ----------------------------------------------------------------------
+def _VerifyOwnership(socket_filename):
+    """Raises PermissionError if the socket (or its directory) may have been created by another user"""
+
+    _VerifyDirectory(os.path.dirname(os.path.abspath(socket_filename)))
+
+    socket_stat = os.lstat(socket_filename)
+
+    if socket_stat.st_uid != os.getuid():
+        raise PermissionError("'{}' is not owned by the current user".format(socket_filename))
+
+    if not stat.S_ISSOCK(socket_stat.st_mode):
+        raise PermissionError("'{}' is not a socket".format(socket_filename))
+
+
+# ----------------------------------------------------------------------
+class _State(object):
+    """State that is preserved across requests"""
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self.last_request_time              = time.time()
+        self.shutdown_event                 = threading.Event()
+
+        self._executors                     = OrderedDict()     # Least recently used first
+        self._executors_lock                = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def Execute(self, command, args):
+        """Returns (result, output)"""
+
+        self.last_request_time = time.time()
+
+        output_stream = io.StringIO()
+
+        try:
+            if command == "Ping":
+                result = 0
+
+            elif command == "Shutdown":
+                self.shutdown_event.set()
+                result = 0
+
+            elif command == "Lcov":
+                result = CoverageTools.Lcov(output_stream=output_stream, **args)
+
+            elif command == "StopCoverage":
+                executor, lock = self._GetExecutor(args)
+
+                with lock:
+                    # Coverage data changes when coverage is stopped, so this also resets
+                    # information derived from the previous data.
+                    executor.StartCoverage(args["coverage_filename"], output_stream)
+                    result = executor.StopCoverage(output_stream)
+
+            elif command == "ExtractCoverageInfo":
+                result = self._GetExecutor(args)[0].ExtractCoverageInfo(
+                    args["coverage_filename"],
+                    args["binary_filename"],
+                    args["includes"],
+                    args["excludes"],
+                    output_stream,
+                )
+
+            else:
+                output_stream.write("ERROR: '{}' is not a valid command.\n".format(command))
+                result = -1
+
+        except:
+            output_stream.write(traceback.format_exc())
+            result = -1
+
+        return result, output_stream.getvalue()
+
+    # ----------------------------------------------------------------------
+    def _GetExecutor(self, args):
+        """Returns (executor, lock)"""
+
+        # Executors are specific to the options and directories that they were created with
+        key = (
+            tuple(sorted(args["options"].items())),
+            tuple(args["dirs"]),
+        )
+
+        with self._executors_lock:
+            result = self._executors.get(key, None)
+            if result is not None:
+                self._executors.move_to_end(key)
+            else:
+                # Imported here, as the executor uses this module to communicate with the daemon
+                from CppClangCommon.CodeCoverageExecutor import CodeCoverageExecutor
+
+                executor = CodeCoverageExecutor(
+                    daemon=False,
+                    **args["options"]
+                )
+
+                for dirname in args["dirs"]:
+                    executor.AddDirectory(dirname)
+
+                result = (executor, threading.Lock())
+                self._executors[key] = result
+
+                # Evict the least recently used executors (but not those that are stopping coverage)
+                for existing_key, (_, lock) in list(self._executors.items()):
+                    if len(self._executors) <= _MAX_EXECUTORS:
+                        break
+
+                    if existing_key != key and not lock.locked():
+                        del self._executors[existing_key]
+
+        return result
+
+
+# ----------------------------------------------------------------------
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads                          = True
+
+    # ----------------------------------------------------------------------
+    def __init__(self, socket_filename, state):
+        self.state                          = state
+        self.environment_id                 = GetEnvironmentId()
+
+        super(_Server, self).__init__(socket_filename, _RequestHandler)
+
+
+# ----------------------------------------------------------------------
+class _RequestHandler(socketserver.StreamRequestHandler):
+    # ----------------------------------------------------------------------
+    def handle(self):
+        for content in self.rfile:
+            try:
+                content = json.loads(content.decode("utf-8"))
+
+                if content.get("environment", None) != self.server.environment_id:
+                    result, output = -1, "ERROR: The request was sent from a different environment.\n"
+                else:
+                    result, output = self.server.state.Execute(content["command"], content.get("args", {}))
+
+            except (ValueError, KeyError) as ex:
+                result, output = -1, "ERROR: The request is not valid ({}).\n".format(ex)
+
+            self.wfile.write(
+                "{}\n".format(
+                    json.dumps(
+                        {
+                            "result": result,
+                            "output": output,
+                            "environment": self.server.environment_id,
+                        },
+                    ),
+                ).encode("utf-8"),
+            )
+
+            self.wfile.flush()
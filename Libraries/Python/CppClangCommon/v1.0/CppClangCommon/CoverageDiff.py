@@ -0,0 +1,393 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageDiff.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-28 09:05:51
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Compares the coverage information in two files (LCOV, `grcov -t ade`, or coverage store files).
+
+Each file is loaded into a compact index of source filename -> FileInfo, where line hits
+are stored in an array indexed by line number. Building the index is linear in the size
+of the input, and comparing indexes is linear in the number of lines.
+"""
+
+import array
+import json
+import mmap
+import os
+import re
+
+from collections import namedtuple
+
+import CommonEnvironment
+
+from CppClangCommon import CoverageStore
+from CppClangCommon import Lcov
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Value in `FileInfo.line_hits` for lines that aren't instrumented
+NOT_INSTRUMENTED                            = CoverageStore.NOT_INSTRUMENTED
+
+FileDelta                                   = namedtuple(
+    "FileDelta",
+    [
+        "filename",
+        "before",                           # (covered, total) or None
+        "after",                            # (covered, total) or None
+        "lines_gained",                     # [line, ...]
+        "lines_lost",                       # [line, ...]
+        "functions_gained",                 # [name, ...]
+        "functions_lost",                   # [name, ...]
+    ],
+)
+
+# ----------------------------------------------------------------------
+class FileInfo(object):
+    """Line and function hits for a single source file"""
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self.line_hits                      = array.array("q")  # line -> hits or NOT_INSTRUMENTED
+        self.function_hits                  = {}                # name -> hits
+
+    # ----------------------------------------------------------------------
+    def AddLine(self, line, hits):
+        line_hits = self._GetLineHits(line)
+
+        existing = line_hits[line]
+        line_hits[line] = hits if existing == NOT_INSTRUMENTED else existing + hits
+
+    # ----------------------------------------------------------------------
+    def AddLines(self, lines, hits):
+        """Adds the hits for each line in the (parallel) sequences"""
+
+        if not lines:
+            return
+
+        if not self.line_hits:
+            # Lines are rarely repeated, so assign the values directly and only add them when a
+            # line was repeated (which is detected by the number of lines assigned).
+            line_hits = self._GetLineHits(max(lines))
+
+            for line, count in zip(lines, hits):
+                line_hits[line] = count
+
+            if len(line_hits) - line_hits.count(NOT_INSTRUMENTED) == len(lines):
+                return
+
+            self.line_hits = array.array("q")
+
+        line_hits = self._GetLineHits(max(lines))
+
+        for line, count in zip(lines, hits):
+            existing = line_hits[line]
+            line_hits[line] = count if existing == NOT_INSTRUMENTED else existing + count
+
+    # ----------------------------------------------------------------------
+    def SetLine(self, line, hits):
+        """Sets the hits for a line unless it has already been set to a larger value"""
+
+        line_hits = self._GetLineHits(line)
+
+        if hits > line_hits[line]:
+            line_hits[line] = hits
+
+    # ----------------------------------------------------------------------
+    def AddFunction(self, name, hits):
+        self.function_hits[name] = self.function_hits.get(name, 0) + hits
+
+    # ----------------------------------------------------------------------
+    def GetLineCoverage(self):
+        """Returns (covered, total)"""
+
+        # Hits are never negative, so this can be calculated without iterating in python
+        total = len(self.line_hits) - self.line_hits.count(NOT_INSTRUMENTED)
+        covered = total - self.line_hits.count(0)
+
+        return covered, total
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _GetLineHits(self, line):
+        """Returns `line_hits`, grown (if necessary) so that `line` is a valid index"""
+
+        line_hits = self.line_hits
+
+        if line >= len(line_hits):
+            line_hits.extend(array.array("q", [NOT_INSTRUMENTED]) * (line + 1 - len(line_hits)))
+
+        return line_hits
+
+
+# ----------------------------------------------------------------------
+def Load(filename):
+    """\
+    Returns a dict of source filename -> FileInfo for an LCOV or ade file (or a read-only
+    CoverageStore for a store file)
+    """
+
+    if CoverageStore.IsStoreFile(filename):
+        return CoverageStore.CoverageStore(filename)
+
+    with open(filename, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                break
+        else:
+            return {}
+
+    if line.startswith(b"{"):
+        return LoadAde(filename)
+
+    return LoadLcov(filename)
+
+
+# ----------------------------------------------------------------------
+def LoadLcov(filename):
+    results = {}
+
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return results
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            for source_filename, _, start, end in Lcov.IndexRecords(content):
+                source_filename = source_filename.decode("utf-8", "surrogateescape")
+
+                file_info = results.get(source_filename, None)
+                if file_info is None:
+                    file_info = FileInfo()
+                    results[source_filename] = file_info
+
+                record = content[start:end]
+
+                numbers = _ParseLineHits(record)
+                file_info.AddLines(numbers[0::2], numbers[1::2])
+
+                for hits, name in _FUNCTION_REGEX.findall(record):
+                    file_info.AddFunction(name.rstrip(b"\r").decode("utf-8", "surrogateescape"), _ToCount(hits))
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def LoadAde(filename):
+    results = {}
+    file_info = None
+
+    with open(filename, "rb") as f:
+        for line in f:
+            # Avoid the cost of decoding lines that can't contain coverage information
+            if b'"file"' not in line and b'"method"' not in line:
+                continue
+
+            content = json.loads(line)
+
+            # Method records are associated with the most recent file
+            file_content = content.get("file", None)
+            if file_content is not None and "name" in file_content:
+                file_info = results.get(file_content["name"], None)
+                if file_info is None:
+                    file_info = FileInfo()
+                    results[file_content["name"]] = file_info
+
+            if file_info is None:
+                continue
+
+            # File records also contain an (empty) method record, so check for them first
+            if content.get("is_file", False):
+                line_content = file_content
+            else:
+                method_content = content.get("method", None)
+                if method_content is None:
+                    continue
+
+                if "name" in method_content:
+                    file_info.AddFunction(method_content["name"], method_content.get("total_covered", 0))
+
+                line_content = method_content
+
+            # ade files only indicate whether a line was executed (and lines may be reported
+            # by both methods and files), so hits are either 0 or 1.
+            for line in line_content.get("uncovered", []):
+                file_info.SetLine(line, 0)
+
+            for line in line_content.get("covered", []):
+                file_info.SetLine(line, 1)
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def Compare(before, after):
+    """\
+    Compares two indexes created by `Load`, returning a list of FileDelta objects (sorted
+    by filename) for those files whose coverage is different.
+    """
+
+    results = []
+    empty = FileInfo()
+
+    for filename in sorted(set(before) | set(after)):
+        before_info = before.get(filename, None)
+        after_info = after.get(filename, None)
+
+        before_lines = (before_info or empty).line_hits
+        after_lines = (after_info or empty).line_hits
+
+        before_functions = (before_info or empty).function_hits
+        after_functions = (after_info or empty).function_hits
+
+        # Most files are the same in both indexes; these comparisons don't iterate in python
+        if (
+            before_info is not None
+            and after_info is not None
+            and before_lines == after_lines
+            and before_functions == after_functions
+        ):
+            continue
+
+        lines_gained = []
+        lines_lost = []
+
+        for line in range(max(len(before_lines), len(after_lines))):
+            was_hit = line < len(before_lines) and before_lines[line] > 0
+            is_hit = line < len(after_lines) and after_lines[line] > 0
+
+            if was_hit != is_hit:
+                (lines_gained if is_hit else lines_lost).append(line)
+
+        functions_gained = []
+        functions_lost = []
+
+        for name in sorted(set(before_functions) | set(after_functions)):
+            was_hit = before_functions.get(name, 0) > 0
+            is_hit = after_functions.get(name, 0) > 0
+
+            if was_hit != is_hit:
+                (functions_gained if is_hit else functions_lost).append(name)
+
+        before_coverage = before_info.GetLineCoverage() if before_info is not None else None
+        after_coverage = after_info.GetLineCoverage() if after_info is not None else None
+
+        if (
+            lines_gained
+            or lines_lost
+            or functions_gained
+            or functions_lost
+            or before_coverage != after_coverage
+        ):
+            results.append(
+                FileDelta(
+                    filename,
+                    before_coverage,
+                    after_coverage,
+                    lines_gained,
+                    lines_lost,
+                    functions_gained,
+                    functions_lost,
+                ),
+            )
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def CreateRanges(lines):
+    """Returns a compact string for a sorted list of line numbers ("1-3, 7, 9-10")"""
+
+    ranges = []
+
+    for line in lines:
+        if ranges and ranges[-1][1] == line - 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+
+    return ", ".join(
+        str(start) if start == end else "{}-{}".format(start, end)
+        for start, end in ranges
+    )
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_LINE_REGEX                                 = re.compile(br"^DA:(\d+),([^,\r\n]+)", re.MULTILINE)
+_FUNCTION_REGEX                             = re.compile(br"^FNDA:([^,\r\n]+),([^\n]*)", re.MULTILINE)
+
+# ----------------------------------------------------------------------
+def _ParseLineHits(record):
+    """Returns [line, hits, line, hits, ...] for the "DA:<line>,<hits>" lines in an LCOV record"""
+
+    # The "DA:" lines are usually contiguous (they are in files written by grcov, lcov, and
+    # llvm-cov). When they are, the block is converted into a json array so that all of the
+    # values are parsed at once, which is much faster than parsing each line individually.
+    if record.startswith(b"DA:"):
+        start = 3
+    else:
+        start = record.find(b"\nDA:")
+        if start != -1:
+            start += 4
+
+    if start == -1:
+        return []
+
+    end = record.find(b"\n", max(record.rfind(b"\nDA:"), 0) + 1)
+    if end == -1:
+        end = len(record)
+
+    block = record[start:end]
+
+    if b"\r" in block:
+        block = block.replace(b"\r", b"")
+
+    num_lines = block.count(b"\n") + 1
+    block = block.replace(b"\nDA:", b",")
+
+    # Every line in the block must be a "DA:" line with exactly 2 values (lines may also
+    # contain a checksum)
+    if block.count(b"\n") == 0 and block.count(b",") == num_lines * 2 - 1:
+        try:
+            numbers = json.loads(b"[" + block + b"]")
+        except ValueError:
+            numbers = None
+
+        if numbers is not None:
+            # Some tools write counts as floating point values
+            if block.translate(None, b"0123456789,"):
+                numbers = [int(number) for number in numbers]
+
+            return numbers
+
+    numbers = []
+
+    for line, hits in _LINE_REGEX.findall(record):
+        numbers += [int(line), _ToCount(hits)]
+
+    return numbers
+
+
+# ----------------------------------------------------------------------
+def _ToCount(value):
+    # Some tools write counts as floating point values
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
@@ -0,0 +1,158 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageIndex.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-14 10:47:02
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Contains the CoverageIndex object"""
+
+import os
+
+import CommonEnvironment
+from CommonEnvironment.CallOnExit import CallOnExit
+from CommonEnvironment import FileSystem
+from CommonEnvironment.Shell.All import CurrentShell
+
+from CppClangCommon import AdeParser
+from CppClangCommon import CoverageTools
+from CppClangCommon import GcovData
+from CppClangCommon import Lcov
+from CppClangCommon.DirectoryIndex import DirectoryIndex
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class CoverageIndex(object):
+    """\
+    Method coverage information for many object files, created with a single grcov pass.
+
+    grcov merges the information for all object files that it parses, so the results
+    are attributed to individual object files based on the source filenames and names of the
+    functions defined in each object file's .gcno file. Functions shared by multiple object
+    files (inline functions, template instantiations, static functions in a source file
+    compiled into multiple binaries, etc.) report their merged coverage for each of those
+    object files.
+    """
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def Create(
+        cls,
+        dirs,
+        output_stream,
+        directory_index=None,
+    ):
+        """Returns (result, CoverageIndex)"""
+
+        dirs = sorted(set(dirs))
+
+        temp_directory = CurrentShell.CreateTempDirectory()
+
+        with CallOnExit(lambda: FileSystem.RemoveTree(temp_directory)):
+            result = CoverageTools.Lcov(
+                dirs,
+                output_dir=temp_directory,
+                type="ade",
+                output_stream=output_stream,
+            )
+
+            if result != 0:
+                return result, None
+
+            coverage_filename = os.path.join(temp_directory, "lcov.info")
+            assert os.path.isfile(coverage_filename), coverage_filename
+
+            methods = AdeParser.AggregateByFileAndMethod(coverage_filename)
+
+        return 0, cls.FromMethods(methods, dirs, directory_index)
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def FromLcov(
+        cls,
+        lcov_filename,
+        dirs,
+        directory_index=None,
+    ):
+        """Returns a CoverageIndex for an LCOV file that was already generated for `dirs`"""
+
+        return cls.FromMethods(Lcov.AggregateByFileAndMethod(lcov_filename), dirs, directory_index)
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def FromMethods(
+        cls,
+        methods,
+        dirs,
+        directory_index=None,
+    ):
+        """\
+        Returns a CoverageIndex for `methods`, a dict of (source filename, method name) ->
+        (covered, not_covered)
+        """
+
+        directory_index = directory_index or DirectoryIndex()
+
+        object_functions = {}
+
+        for dir in sorted(set(dirs)):
+            for fullpath in directory_index.GetFilenames(dir, ".gcno"):
+                object_functions[os.path.realpath(fullpath)] = set(
+                    (os.path.normpath(source_filename), name)
+                    for _, name, source_filename, _ in GcovData.EnumNoteFunctions(fullpath)
+                )
+
+        return cls(
+            {
+                (os.path.normpath(source_filename or ""), name): value
+                for (source_filename, name), value in methods.items()
+            },
+            object_functions,
+        )
+
+    # ----------------------------------------------------------------------
+    def __init__(self, methods, object_functions):
+        self._methods                       = methods               # (source filename, name) -> (covered, not_covered)
+        self._object_functions              = object_functions      # object filename -> set((source filename, name))
+
+    # ----------------------------------------------------------------------
+    def __contains__(self, gcno_filename):
+        return os.path.realpath(gcno_filename) in self._object_functions
+
+    # ----------------------------------------------------------------------
+    def Query(self, gcno_filename, method_filter):
+        """Returns (covered, not_covered) for the methods defined in the object file"""
+
+        keys = [
+            key
+            for key in self._object_functions[os.path.realpath(gcno_filename)]
+            if key in self._methods
+        ]
+
+        names = set(method_filter.Filter(set(name for _, name in keys)))
+
+        covered = 0
+        not_covered = 0
+
+        for key in keys:
+            if key[1] not in names:
+                continue
+
+            value = self._methods[key]
+
+            covered += value[0]
+            not_covered += value[1]
+
+        return covered, not_covered
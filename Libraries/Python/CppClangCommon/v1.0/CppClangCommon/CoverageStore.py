@@ -0,0 +1,375 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageStore.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-29 08:47:16
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Binary, memory-mappable storage for coverage information.
+
+File layout (all values are little-endian and sections are 8-byte aligned):
+
+    Header              magic, version, num_files, num_strings, string index offset, file index offset
+    String index        (num_strings + 1) uint64 offsets into the string data
+    String data         utf-8 encoded strings (filenames and function names; each is stored once)
+    File index          num_files entries sorted by filename:
+                            filename string id, line hits offset, num line hits,
+                            functions offset, num functions, covered lines, total lines
+    Data                per file: int64 line hits (indexed by line number, -1 for lines that
+                        aren't instrumented) followed by (function name string id, hits) int64 pairs
+
+Opening a store only reads the header; line hits are returned as views into the mapped
+file, so the cost of a query is proportional to the size of its result rather than the
+size of the store.
+"""
+
+import array
+import mmap
+import os
+import struct
+import sys
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+MAGIC                                       = b"CCOV"
+VERSION                                     = 1
+
+# Value in line hits for lines that aren't instrumented
+NOT_INSTRUMENTED                            = -1
+
+# ----------------------------------------------------------------------
+def IsStoreFile(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+# ----------------------------------------------------------------------
+def Write(filename, files):
+    """\
+    Writes a store for `files`, a dict of source filename -> object with `line_hits` (a
+    sequence of hits indexed by line number) and `function_hits` (a dict of name -> hits)
+    attributes (for example, `CoverageDiff.FileInfo`).
+    """
+
+    strings = {}
+
+    # ----------------------------------------------------------------------
+    def Intern(value):
+        string_id = strings.get(value, None)
+        if string_id is None:
+            string_id = len(strings)
+            strings[value] = string_id
+
+        return string_id
+
+    # ----------------------------------------------------------------------
+
+    source_filenames = sorted(files)
+
+    filename_ids = [Intern(source_filename) for source_filename in source_filenames]
+    function_ids = [
+        [(Intern(name), hits) for name, hits in sorted(files[source_filename].function_hits.items())]
+        for source_filename in source_filenames
+    ]
+
+    # Strings
+    string_data = [value.encode("utf-8", "surrogateescape") for value in strings]
+
+    string_index_offset = _HEADER.size
+    string_data_offset = string_index_offset + (len(string_data) + 1) * 8
+
+    string_offsets = array.array("Q")
+    offset = string_data_offset
+
+    for value in string_data:
+        string_offsets.append(offset)
+        offset += len(value)
+
+    string_offsets.append(offset)
+
+    file_index_offset = _Align(offset)
+    data_offset = file_index_offset + len(source_filenames) * _FILE_ENTRY.size
+
+    # Entries and data
+    entries = []
+    data = []
+
+    offset = data_offset
+
+    for source_filename, filename_id, functions in zip(source_filenames, filename_ids, function_ids):
+        line_hits = array.array("q", files[source_filename].line_hits)
+
+        covered = 0
+        total = 0
+
+        for hits in line_hits:
+            if hits != NOT_INSTRUMENTED:
+                total += 1
+
+                if hits:
+                    covered += 1
+
+        function_data = array.array("q")
+
+        for function_id, hits in functions:
+            function_data.append(function_id)
+            function_data.append(hits)
+
+        entries.append(
+            _FILE_ENTRY.pack(
+                filename_id,
+                offset,
+                len(line_hits),
+                offset + len(line_hits) * 8,
+                len(functions),
+                covered,
+                total,
+            ),
+        )
+
+        data += [line_hits, function_data]
+        offset += (len(line_hits) + len(function_data)) * 8
+
+    FileSystem.MakeDirs(os.path.dirname(os.path.abspath(filename)))
+
+    temp_filename = "{}.tmp".format(filename)
+
+    with open(temp_filename, "wb") as f:
+        f.write(
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(source_filenames),
+                len(string_data),
+                string_index_offset,
+                file_index_offset,
+            ),
+        )
+
+        f.write(_ToBytes(string_offsets))
+        f.write(b"".join(string_data))
+        f.write(b"\0" * (file_index_offset - string_offsets[-1]))
+        f.write(b"".join(entries))
+
+        for content in data:
+            f.write(_ToBytes(content))
+
+    os.replace(temp_filename, filename)
+
+
+# ----------------------------------------------------------------------
+class StoredFile(object):
+    """Coverage information for a single source file within a CoverageStore"""
+
+    # ----------------------------------------------------------------------
+    def __init__(
+        self,
+        filename,
+        line_hits,
+        function_hits,
+        covered,
+        total,
+    ):
+        self.filename                       = filename
+        self.line_hits                      = line_hits         # line -> hits or NOT_INSTRUMENTED
+        self.function_hits                  = function_hits     # name -> hits
+        self.covered                        = covered
+        self.total                          = total
+
+    # ----------------------------------------------------------------------
+    def GetLineCoverage(self):
+        """Returns (covered, total)"""
+
+        return self.covered, self.total
+
+
+# ----------------------------------------------------------------------
+class CoverageStore(object):
+    """\
+    Read-only access to a store written by `Write`; the object behaves like a dict of
+    source filename -> StoredFile.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, filename):
+        self.filename                       = filename
+
+        with open(filename, "rb") as f:
+            self._mmap                      = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _HEADER.size:
+            self._mmap.close()
+            raise Exception("'{}' is not a coverage store".format(filename))
+
+        (
+            magic,
+            version,
+            self._num_files,
+            num_strings,
+            string_index_offset,
+            self._file_index_offset,
+        ) = _HEADER.unpack_from(self._mmap, 0)
+
+        if magic != MAGIC:
+            self._mmap.close()
+            raise Exception("'{}' is not a coverage store".format(filename))
+
+        if version != VERSION:
+            self._mmap.close()
+            raise Exception("'{}' was created with an unsupported version ({})".format(filename, version))
+
+        self._string_offsets                = _View(self._mmap, "Q", string_index_offset, num_strings + 1)
+
+    # ----------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    # ----------------------------------------------------------------------
+    def __exit__(self, *args):
+        self.Close()
+
+    # ----------------------------------------------------------------------
+    def Close(self):
+        """Closes the store; views returned by the store may not be used after it is closed"""
+
+        if self._mmap is None:
+            return
+
+        self._string_offsets = None
+
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views into the store are still alive; the mapping will be released when they are
+            pass
+
+        self._mmap = None
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        return self._num_files
+
+    # ----------------------------------------------------------------------
+    def __iter__(self):
+        for index in range(self._num_files):
+            yield self.GetString(self._GetEntry(index)[0])
+
+    # ----------------------------------------------------------------------
+    def __contains__(self, source_filename):
+        return self._FindEntry(source_filename) is not None
+
+    # ----------------------------------------------------------------------
+    def __getitem__(self, source_filename):
+        result = self.get(source_filename)
+        if result is None:
+            raise KeyError(source_filename)
+
+        return result
+
+    # ----------------------------------------------------------------------
+    def get(self, source_filename, default=None):
+        entry = self._FindEntry(source_filename)
+        if entry is None:
+            return default
+
+        (
+            _,
+            lines_offset,
+            num_lines,
+            functions_offset,
+            num_functions,
+            covered,
+            total,
+        ) = entry
+
+        function_data = _View(self._mmap, "q", functions_offset, num_functions * 2)
+
+        return StoredFile(
+            source_filename,
+            _View(self._mmap, "q", lines_offset, num_lines),
+            {
+                self.GetString(function_data[index]): function_data[index + 1]
+                for index in range(0, len(function_data), 2)
+            },
+            covered,
+            total,
+        )
+
+    # ----------------------------------------------------------------------
+    def GetString(self, string_id):
+        return self._mmap[self._string_offsets[string_id] : self._string_offsets[string_id + 1]].decode("utf-8", "surrogateescape")
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _GetEntry(self, index):
+        return _FILE_ENTRY.unpack_from(self._mmap, self._file_index_offset + index * _FILE_ENTRY.size)
+
+    # ----------------------------------------------------------------------
+    def _FindEntry(self, source_filename):
+        # Entries are sorted by filename
+        low = 0
+        high = self._num_files
+
+        while low < high:
+            mid = (low + high) // 2
+
+            entry = self._GetEntry(mid)
+            value = self.GetString(entry[0])
+
+            if value == source_filename:
+                return entry
+
+            if value < source_filename:
+                low = mid + 1
+            else:
+                high = mid
+
+        return None
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_HEADER                                     = struct.Struct("<4sIIIQQ")
+_FILE_ENTRY                                 = struct.Struct("<QQQQQQQ")
+
+# ----------------------------------------------------------------------
+def _Align(offset):
+    return (offset + 7) & ~7
+
+
+# ----------------------------------------------------------------------
+def _ToBytes(content):
+    if sys.byteorder != "little":
+        content = array.array(content.typecode, content)
+        content.byteswap()
+
+    return content.tobytes()
+
+
+# ----------------------------------------------------------------------
+def _View(content, typecode, offset, count):
+    if sys.byteorder != "little":
+        result = array.array(typecode)
+        result.frombytes(content[offset : offset + count * 8])
+        result.byteswap()
+
+        return result
+
+    return memoryview(content)[offset : offset + count * 8].cast(typecode)
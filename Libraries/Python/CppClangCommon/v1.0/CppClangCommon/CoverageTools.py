@@ -0,0 +1,793 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageTools.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-31 09:18:44
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Functionality invoked by the ExtractCoverageInfo script.
+
+These functions can be called directly (rather than by invoking the script) to avoid the
+cost of launching a shell and python interpreter for each invocation.
+"""
+
+import gzip
+import multiprocessing
+import os
+import shutil
+import sys
+import textwrap
+
+from concurrent.futures import ThreadPoolExecutor
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+from CommonEnvironment import Process
+from CommonEnvironment.Shell.All import CurrentShell
+from CommonEnvironment.StreamDecorator import StreamDecorator
+
+from CppClangCommon import CoverageDiff
+from CppClangCommon import CoverageStore
+from CppClangCommon.Demangler import Demangler
+from CppClangCommon import Lcov as LcovFile
+from CppClangCommon import LlvmCovExport
+from CppClangCommon import ProfileData
+from CppClangCommon import Tracing
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+def CreateLcovCommandLine(
+    bin_dirs,
+    output_filename,
+    type=None,
+    not_llvm=False,
+):
+    """Returns the grcov command line used to generate an LCOV (or `type`) file"""
+
+    return 'grcov {dirs} -o "{output_filename}"{llvm}{type}'.format(
+        dirs=" ".join(['"{}"'.format(dir) for dir in bin_dirs]),
+        output_filename=output_filename,
+        llvm="" if not_llvm else " --llvm",
+        type="" if type is None else " -t {}".format(type),
+    )
+
+
+# ----------------------------------------------------------------------
+def Lcov(
+    bin_dirs,
+    output_dir=None,
+    output_filename="lcov.info",
+    type=None,
+    not_llvm=False,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """Generates a LCOV file based on *.gcno files"""
+
+    assert bin_dirs
+    assert output_dir or len(bin_dirs) == 1
+
+    if not output_dir:
+        output_dir = bin_dirs[0]
+
+    with StreamDecorator(output_stream).DoneManager(
+        line_prefix="",
+        prefix="\nResults: ",
+        suffix="\n",
+    ) as dm:
+        output_filename = os.path.join(output_dir, output_filename)
+
+        dm.stream.write("Creating '{}'...".format(output_filename))
+        with dm.stream.DoneManager() as this_dm:
+            FileSystem.MakeDirs(output_dir)
+
+            command_line = CreateLcovCommandLine(
+                bin_dirs,
+                output_filename,
+                type=type,
+                not_llvm=not_llvm,
+            )
+
+            if verbose:
+                this_dm.stream.write(
+                    textwrap.dedent(
+                        """\
+                        Command Line:
+                            {}
+
+                        """,
+                    ).format(command_line),
+                )
+
+            with Tracing.Span("grcov", measure_subprocesses=True, num_bin_dirs=len(bin_dirs), type=type):
+                this_dm.result = Process.Execute(command_line, this_dm.stream)
+
+            if this_dm.result != 0:
+                return this_dm.result
+
+        return dm.result
+
+
+# ----------------------------------------------------------------------
+def Html(
+    bin_dir=None,
+    profraw_filenames=None,
+    profdata_filename="default.profdata",
+    executables=None,
+    source_dirs=None,
+    output_filename="code_coverage.html",
+    output_dir=None,
+    num_threads=None,
+    compress=False,
+    force=False,
+    no_sparse=False,
+    merge_fan_in=None,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Generates a HTML file based on *.profdata files.
+
+    `profraw_filename` may be a filename, a directory (searched recursively for *.profraw
+    files), or a glob pattern. Many profraw files are merged in parallel.
+
+    When `output_dir` is provided, a page is written for each source file (along with an
+    index) using multiple threads rather than writing everything to `output_filename`;
+    `compress` writes a gzipped copy of each page (other than the index) alongside the page
+    once it has been rendered, for use by web servers that serve precompressed content.
+    """
+
+    assert output_dir or not compress
+
+    profraw_filenames = profraw_filenames or ["default.profraw"]
+
+    if bin_dir is None:
+        bin_dir = os.getcwd()
+
+    with StreamDecorator(output_stream).DoneManager(
+        line_prefix="",
+        prefix="\nResults: ",
+        suffix="\n",
+    ) as dm:
+        # Generate the profdata file (if necessary)
+        profdata_filename = os.path.join(bin_dir, profdata_filename)
+
+        dm.result = _CreateProfdata(
+            dm.stream,
+            bin_dir,
+            profraw_filenames,
+            profdata_filename,
+            force,
+            no_sparse,
+            merge_fan_in,
+            verbose,
+        )
+        if dm.result != 0:
+            return dm.result
+
+        # Generate the html
+        if output_dir:
+            output_dir = os.path.join(bin_dir, output_dir)
+            output_name = output_dir
+        else:
+            output_filename = os.path.join(bin_dir, output_filename)
+            output_name = output_filename
+
+        dm.stream.write("Creating '{}'...".format(output_name))
+        with dm.stream.DoneManager(
+            suffix="\n",
+        ) as this_dm:
+            if not executables:
+                executables = _FindExecutables(this_dm.stream, bin_dir)
+
+            if output_dir:
+                FileSystem.MakeDirs(output_dir)
+
+                output = '"-output-dir={}" -num-threads={}'.format(
+                    output_dir,
+                    num_threads or multiprocessing.cpu_count(),
+                )
+            else:
+                FileSystem.MakeDirs(os.path.dirname(output_filename))
+
+                output = '> "{}"'.format(output_filename)
+
+            command_line = 'llvm-cov show {executables} "-instr-profile={profdata}" -use-color --format html {sources} {output}'.format(
+                executables=" ".join(
+                    ['"{}"'.format(executable) for executable in executables],
+                ),
+                profdata=profdata_filename,
+                sources=" ".join(
+                    ['"{}"'.format(source_dir) for source_dir in source_dirs],
+                ) if source_dirs else "",
+                output=output,
+            )
+
+            if verbose:
+                this_dm.stream.write(
+                    textwrap.dedent(
+                        """\
+                        Command Line:
+                            {}
+
+                        """,
+                    ).format(command_line),
+                )
+
+            with Tracing.Span(
+                "llvm-cov show",
+                measure_subprocesses=True,
+                num_executables=len(executables),
+                output_dir=bool(output_dir),
+            ):
+                this_dm.result = Process.Execute(command_line, this_dm.stream)
+
+            if this_dm.result != 0:
+                return this_dm.result
+
+            if compress:
+                compressed_filenames = []
+
+                this_dm.stream.write("Compressing pages...")
+                with this_dm.stream.DoneManager(
+                    done_suffix=lambda: "{} compressed".format(
+                        _GetInflect().no("page", len(compressed_filenames)),
+                    ),
+                ), Tracing.Span("Compress") as span:
+                    # The index is not compressed, so that the report can always be opened
+                    index_filename = os.path.join(output_dir, "index.html")
+
+                    compressed_filenames += _CompressFiles(
+                        [
+                            filename
+                            for filename in FileSystem.WalkFiles(
+                                output_dir,
+                                include_file_extensions=[".html"],
+                            )
+                            if filename != index_filename
+                        ],
+                        num_threads,
+                    )
+
+                    span.Set(num_files=len(compressed_filenames))
+
+        return dm.result
+
+
+# ----------------------------------------------------------------------
+def Summary(
+    bin_dir=None,
+    profraw_filenames=None,
+    profdata_filename="default.profdata",
+    executables=None,
+    source_dirs=None,
+    output_filename=None,
+    functions=False,
+    num_threads=None,
+    force=False,
+    no_sparse=False,
+    merge_fan_in=None,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Displays per-file (and optionally per-function) coverage information based on *.profdata files.
+
+    The information is written to `output_filename` if provided.
+    """
+
+    profraw_filenames = profraw_filenames or ["default.profraw"]
+
+    if bin_dir is None:
+        bin_dir = os.getcwd()
+
+    with StreamDecorator(output_stream).DoneManager(
+        line_prefix="",
+        prefix="\nResults: ",
+        suffix="\n",
+    ) as dm:
+        # Generate the profdata file (if necessary)
+        profdata_filename = os.path.join(bin_dir, profdata_filename)
+
+        dm.result = _CreateProfdata(
+            dm.stream,
+            bin_dir,
+            profraw_filenames,
+            profdata_filename,
+            force,
+            no_sparse,
+            merge_fan_in,
+            verbose,
+        )
+        if dm.result != 0:
+            return dm.result
+
+        # Extract the information
+        dm.stream.write("Extracting coverage information...")
+        with dm.stream.DoneManager(
+            suffix="\n",
+        ) as this_dm:
+            if not executables:
+                executables = _FindExecutables(this_dm.stream, bin_dir)
+
+                if not executables:
+                    this_dm.stream.write("ERROR: No executables were found.\n")
+                    this_dm.result = -1
+
+                    return this_dm.result
+
+            with Tracing.Span("llvm-cov export", measure_subprocesses=True, functions=functions) as span:
+                this_dm.result, output, file_summaries, function_summaries, totals = LlvmCovExport.Summarize(
+                    executables,
+                    profdata_filename,
+                    source_dirs=source_dirs,
+                    include_functions=functions,
+                    num_threads=num_threads,
+                )
+
+                span.Set(
+                    num_files=len(file_summaries),
+                    num_functions=len(function_summaries),
+                )
+
+            if this_dm.result != 0 or verbose:
+                this_dm.stream.write(output)
+
+            if this_dm.result != 0:
+                return this_dm.result
+
+        content = _CreateSummaryContent(file_summaries, function_summaries, totals)
+
+        if output_filename:
+            output_filename = os.path.join(bin_dir, output_filename)
+
+            FileSystem.MakeDirs(os.path.dirname(output_filename))
+
+            with open(output_filename, "w") as f:
+                f.write(content)
+
+            dm.stream.write("The summary has been written to '{}'.\n".format(output_filename))
+        else:
+            dm.stream.write("\n{}".format(content))
+
+        return dm.result
+
+
+# ----------------------------------------------------------------------
+def Merge(
+    input_filenames,
+    output_filename,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Merges LCOV files (for example, those generated by different shards of a test suite)
+    into a single file, summing line, function, and branch hits for each source file.
+    """
+
+    with StreamDecorator(output_stream).DoneManager(
+        line_prefix="",
+        prefix="\nResults: ",
+        suffix="\n",
+    ) as dm:
+        dm.stream.write(
+            "Merging {} into '{}'...".format(
+                _GetInflect().no("file", len(input_filenames)),
+                output_filename,
+            ),
+        )
+        with dm.stream.DoneManager() as this_dm, Tracing.Span(
+            "Merge",
+            num_files=len(input_filenames),
+            bytes=lambda: sum(os.path.getsize(filename) for filename in input_filenames),
+        ):
+            if verbose:
+                this_dm.stream.write(
+                    "".join("{}\n".format(filename) for filename in input_filenames),
+                )
+
+            FileSystem.MakeDirs(os.path.dirname(os.path.abspath(output_filename)))
+
+            LcovFile.Merge(input_filenames, output_filename)
+
+        return dm.result
+
+
+# ----------------------------------------------------------------------
+def Diff(
+    before_filename,
+    after_filename,
+    output_filename=None,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Displays the per-file and per-function coverage differences between two LCOV, ade
+    (`grcov -t ade`), or coverage store (see `Store`) files.
+    """
+
+    with StreamDecorator(output_stream).DoneManager(
+        line_prefix="",
+        prefix="\nResults: ",
+        suffix="\n",
+    ) as dm:
+        indexes = []
+
+        for filename in [before_filename, after_filename]:
+            dm.stream.write("Loading '{}'...".format(filename))
+            with dm.stream.DoneManager(
+                done_suffix=lambda: "{} loaded".format(_GetInflect().no("file", len(indexes[-1]))),
+            ), Tracing.Span(
+                "Diff.Load",
+                filename=filename,
+                bytes=lambda: os.path.getsize(filename),
+            ):
+                indexes.append(CoverageDiff.Load(filename))
+
+        dm.stream.write("Comparing...")
+        with dm.stream.DoneManager(
+            done_suffix=lambda: "{} changed".format(_GetInflect().no("file", len(deltas))),
+        ), Tracing.Span("Diff.Compare"):
+            deltas = CoverageDiff.Compare(*indexes)
+
+        content = _CreateDiffContent(deltas, verbose)
+
+        if output_filename:
+            FileSystem.MakeDirs(os.path.dirname(os.path.abspath(output_filename)))
+
+            with open(output_filename, "w") as f:
+                f.write(content)
+
+            dm.stream.write("The differences have been written to '{}'.\n".format(output_filename))
+        else:
+            dm.stream.write("\n{}".format(content))
+
+        return dm.result
+
+
+# ----------------------------------------------------------------------
+def Store(
+    input_filename,
+    output_filename,
+    output_stream=sys.stdout,
+):
+    """\
+    Converts an LCOV or ade (`grcov -t ade`) file into a binary coverage store that can be
+    opened without parsing (and used with `Diff`).
+    """
+
+    with StreamDecorator(output_stream).DoneManager(
+        line_prefix="",
+        prefix="\nResults: ",
+        suffix="\n",
+    ) as dm:
+        dm.stream.write("Loading '{}'...".format(input_filename))
+        with dm.stream.DoneManager(
+            done_suffix=lambda: "{} loaded".format(_GetInflect().no("file", len(files))),
+        ), Tracing.Span(
+            "Store.Load",
+            filename=input_filename,
+            bytes=lambda: os.path.getsize(input_filename),
+        ):
+            files = CoverageDiff.Load(input_filename)
+
+        dm.stream.write("Writing '{}'...".format(output_filename))
+        with dm.stream.DoneManager(), Tracing.Span("Store.Write") as span:
+            CoverageStore.Write(output_filename, files)
+
+            span.Set(
+                bytes=lambda: os.path.getsize(output_filename),
+            )
+
+        return dm.result
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _CreateProfdata(
+    output_stream,
+    bin_dir,
+    profraw_filenames,
+    profdata_filename,
+    force,
+    no_sparse,
+    merge_fan_in,
+    verbose,
+):
+    """Generates the profdata file if it doesn't exist or its inputs have changed"""
+
+    input_filenames = ProfileData.ExpandInputs(profraw_filenames, bin_dir)
+
+    # An existing .profdata file is reused when there aren't any inputs (for example, when
+    # .profraw files are removed after they have been merged).
+    if (
+        force
+        or not os.path.isfile(profdata_filename)
+        or (
+            input_filenames
+            and not ProfileData.IsUpToDate(profdata_filename, ProfileData.CreateFingerprint(input_filenames))
+        )
+    ):
+        if not input_filenames:
+            output_stream.write(
+                "ERROR: No profraw files were found in {}.\n".format(
+                    ", ".join(["'{}'".format(value) for value in profraw_filenames]),
+                ),
+            )
+
+            return -1
+
+        output_stream.write(
+            "Creating '{}' from {}...".format(
+                profdata_filename,
+                _GetInflect().no("profraw file", len(input_filenames)),
+            ),
+        )
+        with output_stream.DoneManager(
+            suffix="\n",
+        ) as this_dm:
+            FileSystem.MakeDirs(os.path.dirname(profdata_filename))
+
+            with Tracing.Span(
+                "llvm-profdata merge",
+                measure_subprocesses=True,
+                num_files=len(input_filenames),
+                bytes=lambda: sum(os.path.getsize(filename) for filename in input_filenames),
+            ):
+                this_dm.result = ProfileData.Merge(
+                    input_filenames,
+                    profdata_filename,
+                    this_dm.stream,
+                    sparse=not no_sparse,
+                    fan_in=merge_fan_in,
+                    verbose=verbose,
+                )
+
+            return this_dm.result
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+def _FindExecutables(output_stream, bin_dir):
+    executables = []
+
+    output_stream.write("Finding executables...")
+    with output_stream.DoneManager(
+        done_suffix=lambda: "{} found".format(
+            _GetInflect().no("executable", len(executables)),
+        ),
+    ):
+        if CurrentShell.ExecutableExtension:
+            executables = list(
+                FileSystem.WalkFiles(
+                    bin_dir,
+                    include_file_extensions=[
+                        CurrentShell.ExecutableExtension
+                    ],
+                    recurse=False,
+                ),
+            )
+        else:
+            for filename in FileSystem.WalkFiles(
+                bin_dir,
+                recurse=False,
+            ):
+                if os.access(filename, os.X_OK):
+                    executables.append(filename)
+
+    return executables
+
+
+# ----------------------------------------------------------------------
+def _CreateSummaryContent(file_summaries, function_summaries, totals):
+    # ----------------------------------------------------------------------
+    def FormatCoverage(value):
+        if value is None:
+            return "-"
+
+        covered, total = value
+
+        return "{}/{} ({:.2f}%)".format(
+            covered,
+            total,
+            (covered / total * 100.0) if total else 100.0,
+        )
+
+    # ----------------------------------------------------------------------
+    def CreateTable(headers, rows):
+        widths = [len(header) for header in headers]
+
+        for row in rows:
+            for index, value in enumerate(row):
+                widths[index] = max(widths[index], len(value))
+
+        lines = [
+            "  ".join(value.ljust(width) for value, width in zip(headers, widths)).rstrip(),
+            "  ".join("-" * width for width in widths),
+        ]
+
+        for row in rows:
+            lines.append("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+        return "\n".join(lines) + "\n"
+
+    # ----------------------------------------------------------------------
+
+    headers = ["Filename", "Lines", "Functions", "Regions", "Branches"]
+
+    rows = [
+        [
+            summary.filename,
+            FormatCoverage(summary.lines),
+            FormatCoverage(summary.functions),
+            FormatCoverage(summary.regions),
+            FormatCoverage(summary.branches),
+        ]
+        for summary in sorted(file_summaries, key=lambda summary: summary.filename)
+    ]
+
+    if totals is not None:
+        rows.append(
+            [
+                "TOTAL",
+                FormatCoverage(totals.lines),
+                FormatCoverage(totals.functions),
+                FormatCoverage(totals.regions),
+                FormatCoverage(totals.branches),
+            ],
+        )
+
+    content = CreateTable(headers, rows)
+
+    if function_summaries:
+        names = {}
+
+        demangler = Demangler.Create()
+        if demangler is not None:
+            try:
+                names = demangler.Demangle(list(set(summary.name for summary in function_summaries)))
+            finally:
+                demangler.Close()
+
+        rows = [
+            [
+                names.get(summary.name, summary.name),
+                str(summary.count),
+                FormatCoverage(summary.regions),
+                summary.filename,
+            ]
+            for summary in sorted(function_summaries, key=lambda summary: (summary.filename, summary.name))
+        ]
+
+        content += "\n" + CreateTable(["Function", "Count", "Regions", "Filename"], rows)
+
+    return content
+
+
+# ----------------------------------------------------------------------
+def _CreateDiffContent(deltas, verbose):
+    if not deltas:
+        return "No differences.\n"
+
+    # ----------------------------------------------------------------------
+    def CoverageToString(coverage):
+        if coverage is None:
+            return "-"
+
+        covered, total = coverage
+
+        return "{} / {} ({:.2f}%)".format(
+            covered,
+            total,
+            (float(covered) / total * 100.0) if total else 0.0,
+        )
+
+    # ----------------------------------------------------------------------
+
+    names = {}
+
+    demangler = Demangler.Create()
+    if demangler is not None:
+        try:
+            names = demangler.Demangle(
+                set(
+                    name
+                    for delta in deltas
+                    for name in delta.functions_gained + delta.functions_lost
+                ),
+            )
+        finally:
+            demangler.Close()
+
+    lines = []
+
+    for delta in deltas:
+        lines.append(
+            "{}\n    Lines: {} -> {}\n".format(
+                delta.filename,
+                CoverageToString(delta.before),
+                CoverageToString(delta.after),
+            ),
+        )
+
+        for header, values in [
+            ("Lines gained", delta.lines_gained),
+            ("Lines lost", delta.lines_lost),
+        ]:
+            if values:
+                lines.append(
+                    "    {} ({}): {}\n".format(
+                        header,
+                        len(values),
+                        CoverageDiff.CreateRanges(values) if verbose else textwrap.shorten(
+                            CoverageDiff.CreateRanges(values),
+                            80,
+                            placeholder=" ...",
+                        ),
+                    ),
+                )
+
+        for header, values in [
+            ("Functions gained", delta.functions_gained),
+            ("Functions lost", delta.functions_lost),
+        ]:
+            if values:
+                lines.append("    {}:\n".format(header))
+                lines += ["        {}\n".format(names.get(name, name)) for name in values]
+
+        lines.append("\n")
+
+    return "".join(lines)
+
+
+# ----------------------------------------------------------------------
+def _CompressFiles(filenames, max_workers=None):
+    """\
+    Writes a gzipped version of each file alongside it, returning the names of the compressed
+    files. The original files are preserved so that links between them remain valid.
+    """
+
+    # ----------------------------------------------------------------------
+    def Impl(filename):
+        compressed_filename = "{}.gz".format(filename)
+
+        with open(filename, "rb") as source:
+            with gzip.open(compressed_filename, "wb", compresslevel=6) as dest:
+                shutil.copyfileobj(source, dest, 1024 * 1024)
+
+        return compressed_filename
+
+    # ----------------------------------------------------------------------
+
+    with ThreadPoolExecutor(max_workers or multiprocessing.cpu_count()) as executor:
+        return list(executor.map(Impl, filenames))
+
+
+# ----------------------------------------------------------------------
+_inflect                                    = None
+
+def _GetInflect():
+    # inflect is expensive to import, so it is only imported when it is needed
+    global _inflect
+
+    if _inflect is None:
+        import inflect
+
+        _inflect = inflect.engine()
+
+    return _inflect
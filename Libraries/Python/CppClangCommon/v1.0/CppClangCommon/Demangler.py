@@ -0,0 +1,227 @@
+# ----------------------------------------------------------------------
+# |
+# |  Demangler.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-17 11:18:50
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Contains the Demangler object"""
+
+import os
+import shutil
+import subprocess
+import threading
+
+import CommonEnvironment
+
+from CppClangCommon import Caching
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class Demangler(object):
+    """\
+    Demangles C++ names in bulk.
+
+    A single demangler process is fed names over a pipe for the lifetime of this object, and
+    results are persisted in an on-disk cache keyed by mangled name so that subsequent runs
+    don't need to demangle names that have been seen before. The cache file is shared by
+    concurrent processes (access is serialized with a file lock); when it grows too large, it is
+    compacted to the most recently added names that fit within half of the maximum size.
+    """
+
+    TOOL_NAMES                              = ["llvm-cxxfilt", "c++filt"]
+
+    MAX_CACHE_FILE_SIZE                     = 32 * 1024 * 1024
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def Create(
+        cls,
+        cache_filename=None,
+    ):
+        """Returns a Demangler or None if a demangling tool isn't available"""
+
+        for tool_name in cls.TOOL_NAMES:
+            tool = shutil.which(tool_name)
+            if tool:
+                break
+        else:
+            return None
+
+        if cache_filename is None:
+            cache_filename = os.path.join(Caching.GetCacheDirectory("Demangler"), "names.txt")
+
+        return cls(tool, cache_filename)
+
+    # ----------------------------------------------------------------------
+    def __init__(self, tool, cache_filename):
+        self.tool                           = tool
+        self.cache_filename                 = cache_filename
+
+        self._cache                         = {}
+        self._process                       = None
+        self._lock                          = threading.Lock()
+
+        if cache_filename and os.path.isfile(cache_filename):
+            with Caching.LockFile(cache_filename):
+                self._cache.update(_ReadCacheFile(cache_filename))
+
+    # ----------------------------------------------------------------------
+    def __del__(self):
+        self.Close()
+
+    # ----------------------------------------------------------------------
+    def Close(self):
+        process = getattr(self, "_process", None)
+        if process is None:
+            return
+
+        self._process = None
+
+        process.stdin.close()
+        process.wait()
+        process.stdout.close()
+
+    # ----------------------------------------------------------------------
+    def Demangle(self, names):
+        """Returns a dict of mangled name -> demangled name"""
+
+        names = list(names)
+
+        with self._lock:
+            results = {}
+            unknown = []
+
+            for name in names:
+                demangled = self._cache.get(name, None)
+                if demangled is None:
+                    unknown.append(name)
+                else:
+                    results[name] = demangled
+
+            if not unknown:
+                return results
+
+            # Names are written one per line
+            unknown = [name for name in set(unknown) if name and "\n" not in name]
+
+            if self._process is None:
+                self._process = subprocess.Popen(
+                    [self.tool],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    universal_newlines=True,
+                    encoding="utf-8",
+                )
+
+            process = self._process
+
+            # ----------------------------------------------------------------------
+            def Write():
+                try:
+                    for name in unknown:
+                        process.stdin.write("{}\n".format(name))
+
+                    process.stdin.flush()
+                except (OSError, ValueError):
+                    # The process terminated; this is detected when reading the results
+                    pass
+
+            # ----------------------------------------------------------------------
+
+            # Names are written on a separate thread while the results are read on this one;
+            # writing many (long) names before reading any results would block both this
+            # thread and the process once the pipes are full.
+            writer_thread = threading.Thread(target=Write)
+            writer_thread.daemon = True
+            writer_thread.start()
+
+            new_items = []
+
+            try:
+                for name in unknown:
+                    demangled = process.stdout.readline()
+                    if not demangled:
+                        raise Exception("'{}' terminated unexpectedly".format(self.tool))
+
+                    demangled = demangled.rstrip("\n")
+
+                    self._cache[name] = demangled
+                    results[name] = demangled
+
+                    new_items.append("{}\t{}\n".format(name, demangled))
+
+            finally:
+                writer_thread.join()
+
+            if self.cache_filename and new_items:
+                with Caching.LockFile(self.cache_filename):
+                    with open(self.cache_filename, "a", encoding="utf-8") as f:
+                        f.write("".join(new_items))
+                        cache_file_size = f.tell()
+
+                    if cache_file_size > self.MAX_CACHE_FILE_SIZE:
+                        self._CompactCacheFile()
+
+            # Names that couldn't be sent to the process are returned unchanged
+            for name in names:
+                if name not in results:
+                    results[name] = name
+
+            return results
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _CompactCacheFile(self):
+        """Removes duplicate and the oldest names from the cache file; the file lock must be held"""
+
+        lines = []
+        size = 0
+
+        for mangled, demangled in reversed(list(_ReadCacheFile(self.cache_filename).items())):
+            line = "{}\t{}\n".format(mangled, demangled)
+
+            size += len(line.encode("utf-8"))
+            if size > self.MAX_CACHE_FILE_SIZE // 2:
+                break
+
+            lines.append(line)
+
+        temp_filename = "{}.{}.tmp".format(self.cache_filename, os.getpid())
+
+        with open(temp_filename, "w", encoding="utf-8") as f:
+            f.write("".join(reversed(lines)))
+
+        os.replace(temp_filename, self.cache_filename)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _ReadCacheFile(filename):
+    """Returns the names in the order in which they were most recently added"""
+
+    results = {}
+
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            mangled, sep, demangled = line.rstrip("\n").partition("\t")
+            if sep:
+                # Concurrent processes may add the same name
+                results.pop(mangled, None)
+                results[mangled] = demangled
+
+    return results
@@ -0,0 +1,131 @@
+# ----------------------------------------------------------------------
+# |
+# |  DirectoryIndex.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-21 08:37:14
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Contains the DirectoryIndex object"""
+
+import bisect
+import os
+import threading
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class DirectoryIndex(object):
+    """\
+    Index of coverage artifacts (.gcno and .gcda files) within directories.
+
+    Each directory is scanned once and the results are shared by all lookups; a
+    directory is scanned again when its modification time changes.
+    """
+
+    EXTENSIONS                              = [".gcno", ".gcda"]
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self._entries                       = {}
+        self._lock                          = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def GetFilenames(self, dirname, ext):
+        """Returns all of the files in the directory with the extension"""
+
+        stems, stem_lookup = self._GetEntry(dirname).get(ext, ([], {}))
+        return [os.path.join(dirname, stem_lookup[stem]) for stem in stems]
+
+    # ----------------------------------------------------------------------
+    def Lookup(self, binary_filename, ext):
+        """\
+        Returns the artifact associated with the binary or None.
+
+        An artifact is associated with a binary if its name begins with the name
+        of the binary (without extension). When multiple artifacts match, the
+        first of these is returned:
+
+            1) An exact match ("Foo.gcno" for "Foo")
+            2) A match with an additional extension ("Foo.cpp.gcno" for "Foo")
+            3) Any other match ("FooBar.gcno" for "Foo")
+
+        Shorter names are preferred within each category, and ties are broken
+        alphabetically.
+        """
+
+        dirname, basename = os.path.split(binary_filename)
+        basename = os.path.splitext(basename)[0]
+
+        stems, stem_lookup = self._GetEntry(dirname).get(ext, ([], {}))
+
+        best = None
+
+        index = bisect.bisect_left(stems, basename)
+
+        while index < len(stems) and stems[index].startswith(basename):
+            stem = stems[index]
+            index += 1
+
+            if stem == basename:
+                priority = 0
+            elif stem[len(basename)] == ".":
+                priority = 1
+            else:
+                priority = 2
+
+            key = (priority, len(stem), stem)
+
+            if best is None or key < best:
+                best = key
+
+        if best is None:
+            return None
+
+        return os.path.join(dirname, stem_lookup[best[2]])
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _GetEntry(self, dirname):
+        """Returns a dict of ext -> (sorted stems, { stem: filename, ... })"""
+
+        key = os.path.realpath(dirname)
+
+        try:
+            mtime = os.stat(key).st_mtime_ns
+        except OSError:
+            return {}
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+        results = {}
+
+        for item in os.scandir(key):
+            stem, ext = os.path.splitext(item.name)
+            if ext not in self.EXTENSIONS or not item.is_file():
+                continue
+
+            results.setdefault(ext, {})[stem] = item.name
+
+        results = {ext: (sorted(stem_lookup), stem_lookup) for ext, stem_lookup in results.items()}
+
+        with self._lock:
+            self._entries[key] = (mtime, results)
+
+        return results
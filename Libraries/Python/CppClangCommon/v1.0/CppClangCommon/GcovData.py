@@ -0,0 +1,465 @@
+# ----------------------------------------------------------------------
+# |
+# |  GcovData.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-14 09:12:41
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Reads information from gcov note (.gcno) and data (.gcda) files.
+
+This makes it possible to calculate per-function line coverage in-process, without
+invoking grcov (which is still used to generate LCOV reports).
+"""
+
+import mmap
+import os
+import struct
+
+from collections import namedtuple
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+NOTE_MAGIC                                  = 0x67636E6F # "gcno"
+DATA_MAGIC                                  = 0x67636461 # "gcda"
+
+TAG_FUNCTION                                = 0x01000000
+TAG_BLOCKS                                  = 0x01410000
+TAG_ARCS                                    = 0x01430000
+TAG_LINES                                   = 0x01450000
+TAG_COUNTER_ARCS                            = 0x01A10000
+
+ARC_ON_TREE                                 = 0x1
+
+# ----------------------------------------------------------------------
+NoteFunction                                = namedtuple(
+    "NoteFunction",
+    [
+        "ident",
+        "name",
+        "source_filename",
+        "line",
+        "num_blocks",
+        "arcs",                             # [(source_block, dest_block, flags), ...]
+        "block_lines",                      # { block: [(source_filename, line), ...], ... }
+    ],
+)
+
+# ----------------------------------------------------------------------
+def ReadNoteFunctionNames(filename):
+    """Returns the (mangled) names of all functions defined in a .gcno file"""
+
+    return [name for _, name, _, _ in EnumNoteFunctions(filename)]
+
+
+# ----------------------------------------------------------------------
+def EnumNoteFunctions(filename):
+    """Yields (ident, name, source_filename, line) for each function in a .gcno file"""
+
+    with _MapFile(filename) as content:
+        reader = _Reader(content)
+
+        reader.ReadHeader(NOTE_MAGIC)
+
+        for tag, offset, _ in reader.EnumRecords():
+            if tag != TAG_FUNCTION:
+                continue
+
+            reader.offset = offset
+            yield _ReadFunctionHeader(reader)
+
+
+# ----------------------------------------------------------------------
+def ReadNotes(filename):
+    """Returns a list of NoteFunction objects for each function in a .gcno file"""
+
+    results = []
+
+    with _MapFile(filename) as content:
+        reader = _Reader(content)
+
+        reader.ReadHeader(NOTE_MAGIC)
+
+        function_info = None
+        num_blocks = None
+        arcs = None
+        block_lines = None
+
+        # ----------------------------------------------------------------------
+        def Commit():
+            if function_info is not None:
+                results.append(NoteFunction(*(function_info + (num_blocks, arcs, block_lines))))
+
+        # ----------------------------------------------------------------------
+
+        for tag, offset, length in reader.EnumRecords():
+            reader.offset = offset
+
+            if tag == TAG_FUNCTION:
+                Commit()
+
+                function_info = _ReadFunctionHeader(reader)
+                num_blocks = 0
+                arcs = []
+                block_lines = {}
+
+            elif function_info is None:
+                continue
+
+            elif tag == TAG_BLOCKS:
+                if reader.version >= 80:
+                    num_blocks = reader.ReadUInt32()
+                else:
+                    num_blocks = length // 4
+
+            elif tag == TAG_ARCS:
+                source_block = reader.ReadUInt32()
+
+                for dest_block, flags in struct.iter_unpack(
+                    reader.endian + "II",
+                    content[reader.offset : offset + length],
+                ):
+                    arcs.append((source_block, dest_block, flags))
+
+            elif tag == TAG_LINES:
+                block = reader.ReadUInt32()
+                source_filename = function_info[2]
+
+                lines = block_lines.setdefault(block, [])
+
+                while reader.offset < offset + length:
+                    line = reader.ReadUInt32()
+
+                    if line == 0:
+                        source_filename = reader.ReadString()
+                        if not source_filename:
+                            break
+
+                        continue
+
+                    lines.append((source_filename, line))
+
+        Commit()
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def ReadData(filename):
+    """Returns a dict of function ident -> [arc count, ...] for a .gcda file"""
+
+    results = {}
+
+    with _MapFile(filename) as content:
+        reader = _Reader(content)
+
+        reader.ReadHeader(DATA_MAGIC)
+
+        ident = None
+
+        for tag, offset, length in reader.EnumRecords():
+            if tag == TAG_FUNCTION:
+                if length:
+                    reader.offset = offset
+                    ident = reader.ReadUInt32()
+                else:
+                    ident = None
+
+            elif tag == TAG_COUNTER_ARCS and ident is not None:
+                if length < 0:
+                    # All of the counters are 0
+                    results[ident] = [0] * (-length // 8)
+
+                elif reader.endian == "<":
+                    results[ident] = [
+                        value for (value,) in struct.iter_unpack("<Q", content[offset : offset + length])
+                    ]
+
+                else:
+                    # Counters are written as 2 32-bit values, low word first
+                    results[ident] = [
+                        low | (high << 32)
+                        for low, high in struct.iter_unpack(">II", content[offset : offset + length])
+                    ]
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def ComputeFunctionCoverage(gcno_filename, gcda_filename):
+    """\
+    Returns a dict of function name -> (covered_lines, uncovered_lines).
+
+    Lines are attributed to the function's source file; lines from other files (for
+    example, those that are inlined from headers) are not included.
+    """
+
+    counters = ReadData(gcda_filename) if gcda_filename and os.path.isfile(gcda_filename) else {}
+
+    results = {}
+
+    for function in ReadNotes(gcno_filename):
+        block_counts = _SolveBlockCounts(function, counters.get(function.ident, None))
+
+        line_counts = {}
+
+        for block, lines in function.block_lines.items():
+            count = block_counts[block] if block < len(block_counts) else 0
+
+            for source_filename, line in lines:
+                if source_filename != function.source_filename:
+                    continue
+
+                line_counts[line] = max(line_counts.get(line, 0), count)
+
+        covered = sum(1 for count in line_counts.values() if count)
+
+        existing = results.get(function.name, (0, 0))
+
+        results[function.name] = (
+            existing[0] + covered,
+            existing[1] + len(line_counts) - covered,
+        )
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+class _Reader(object):
+    """\
+    Reads content in the format used by both GCC and LLVM.
+
+    The format has changed over time; `version` is a number (GCC 4.8 -> 48,
+    GCC 12.2 -> 122) that can be used to account for those differences:
+
+        >= 80:  The note header contains an "unexecuted blocks" flag, function records
+                contain an "artificial" flag, block records contain a count.
+        >= 90:  The note header contains the working directory.
+        >= 120: Headers contain a checksum, record lengths are in bytes rather than
+                words, strings are not padded.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, content):
+        self.content                        = content
+        self.offset                         = 0
+        self.version                        = None
+        self.endian                         = "<"
+
+    # ----------------------------------------------------------------------
+    def ReadHeader(self, expected_magic):
+        if len(self.content) < 12:
+            raise Exception("The content is not a valid gcov file")
+
+        magic = struct.unpack_from("<I", self.content, 0)[0]
+
+        if magic != expected_magic:
+            magic = struct.unpack_from(">I", self.content, 0)[0]
+            if magic != expected_magic:
+                raise Exception("The content is not a valid gcov file")
+
+            self.endian = ">"
+
+        self.offset = 4
+
+        version = self.ReadUInt32()
+        version = "".join(chr((version >> shift) & 0xFF) for shift in [24, 16, 8, 0])
+
+        if version[0] >= "A":
+            self.version = (ord(version[0]) - ord("A")) * 100 + (ord(version[1]) - ord("0")) * 10 + ord(version[2]) - ord("0")
+        else:
+            self.version = (ord(version[0]) - ord("0")) * 10 + ord(version[2]) - ord("0")
+
+        self.ReadUInt32()                   # stamp
+
+        if self.version >= 120:
+            self.ReadUInt32()               # checksum
+
+        if expected_magic == NOTE_MAGIC:
+            if self.version >= 90:
+                self.ReadString()           # cwd
+
+            if self.version >= 80:
+                self.ReadUInt32()           # has_unexecuted_blocks
+
+    # ----------------------------------------------------------------------
+    def EnumRecords(self):
+        """\
+        Yields (tag, offset, length_in_bytes) for each record.
+
+        A negative length indicates a counter record without content, where all
+        of the counters are 0.
+        """
+
+        content_length = len(self.content)
+
+        while self.offset + 8 <= content_length:
+            tag, length = struct.unpack_from(self.endian + "II", self.content, self.offset)
+            self.offset += 8
+
+            if tag == 0:
+                break
+
+            if self.version < 120:
+                length *= 4
+            elif length & 0x80000000:
+                length -= 0x100000000
+
+            offset = self.offset
+            yield tag, offset, length
+
+            self.offset = offset + max(length, 0)
+
+    # ----------------------------------------------------------------------
+    def ReadUInt32(self):
+        value = struct.unpack_from(self.endian + "I", self.content, self.offset)[0]
+        self.offset += 4
+
+        return value
+
+    # ----------------------------------------------------------------------
+    def ReadString(self):
+        length = self.ReadUInt32()
+        if length == 0:
+            return ""
+
+        if self.version < 120:
+            length *= 4
+
+        value = bytes(self.content[self.offset : self.offset + length])
+        self.offset += length
+
+        return value.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+
+# ----------------------------------------------------------------------
+class _MapFile(object):
+    """Provides a memoryview over the memory-mapped content of a file"""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, filename):
+        self._filename                      = filename
+
+        self._file                          = None
+        self._map                           = None
+        self._view                          = None
+
+    # ----------------------------------------------------------------------
+    def __enter__(self):
+        self._file = open(self._filename, "rb")
+
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._view = memoryview(b"")
+        else:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+        return self._view
+
+    # ----------------------------------------------------------------------
+    def __exit__(self, *args):
+        self._view.release()
+
+        if self._map is not None:
+            self._map.close()
+
+        self._file.close()
+
+
+# ----------------------------------------------------------------------
+def _ReadFunctionHeader(reader):
+    ident = reader.ReadUInt32()
+    reader.ReadUInt32()                     # lineno_checksum
+
+    if reader.version >= 47:
+        reader.ReadUInt32()                 # cfg_checksum
+
+    name = reader.ReadString()
+
+    if reader.version >= 80:
+        reader.ReadUInt32()                 # artificial
+
+    source_filename = reader.ReadString()
+    line = reader.ReadUInt32()
+
+    return ident, name, source_filename, line
+
+
+# ----------------------------------------------------------------------
+def _SolveBlockCounts(function, counters):
+    """\
+    Returns the execution count of each block in the function.
+
+    Counters are only recorded for arcs that aren't on the spanning tree; the remaining
+    arc counts (and therefore the block counts) are derived using flow conservation
+    (the sum of a block's incoming arcs is equal to the sum of its outgoing arcs).
+    """
+
+    num_blocks = function.num_blocks
+    for source, dest, _ in function.arcs:
+        num_blocks = max(num_blocks, source + 1, dest + 1)
+
+    if not counters:
+        return [0] * num_blocks
+
+    arc_counts = []
+    counter_index = 0
+
+    for _, _, flags in function.arcs:
+        if flags & ARC_ON_TREE or counter_index >= len(counters):
+            arc_counts.append(None)
+        else:
+            arc_counts.append(counters[counter_index])
+            counter_index += 1
+
+    in_arcs = [[] for _ in range(num_blocks)]
+    out_arcs = [[] for _ in range(num_blocks)]
+
+    for index, (source, dest, _) in enumerate(function.arcs):
+        out_arcs[source].append(index)
+        in_arcs[dest].append(index)
+
+    block_counts = [None] * num_blocks
+
+    changed = True
+    while changed:
+        changed = False
+
+        for block in range(num_blocks):
+            if block_counts[block] is None:
+                for arcs in [out_arcs[block], in_arcs[block]]:
+                    if arcs and all(arc_counts[arc] is not None for arc in arcs):
+                        block_counts[block] = sum(arc_counts[arc] for arc in arcs)
+                        changed = True
+                        break
+
+                if block_counts[block] is None:
+                    continue
+
+            for arcs in [out_arcs[block], in_arcs[block]]:
+                unknown = [arc for arc in arcs if arc_counts[arc] is None]
+                if len(unknown) != 1:
+                    continue
+
+                arc_counts[unknown[0]] = max(
+                    block_counts[block] - sum(arc_counts[arc] for arc in arcs if arc_counts[arc] is not None),
+                    0,
+                )
+                changed = True
+
+    return [count or 0 for count in block_counts]
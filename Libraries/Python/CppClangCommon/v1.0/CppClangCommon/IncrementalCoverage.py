@@ -0,0 +1,215 @@
+# ----------------------------------------------------------------------
+# |
+# |  IncrementalCoverage.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-22 15:48:09
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Generates LCOV files incrementally.
+
+A partial LCOV file is generated for each object file (.gcno/.gcda pair) and a manifest
+records the fingerprints of the artifacts used to generate it. Subsequent runs only
+regenerate partial results for object files whose artifacts have changed, and then
+merge all of the partial results into the final LCOV file.
+"""
+
+import hashlib
+import json
+import os
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+from CommonEnvironment.Shell.All import CurrentShell
+
+from CppClangCommon import AsyncProcess
+from CppClangCommon.ArtifactStaging import ArtifactStager
+from CppClangCommon import CoverageTools
+from CppClangCommon.DirectoryIndex import DirectoryIndex
+from CppClangCommon import Lcov
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+MANIFEST_FILENAME                           = ".coverage_manifest.json"
+PARTIALS_DIRNAME                            = ".coverage_partials"
+
+MANIFEST_VERSION                            = 1
+
+# ----------------------------------------------------------------------
+def Generate(
+    bin_dirs,
+    output_dir,
+    output_stream,
+    output_filename="lcov.info",
+    directory_index=None,
+    max_workers=None,
+):
+    """Generates `output_filename` in `output_dir`, reprocessing only what has changed since the last run"""
+
+    directory_index = directory_index or DirectoryIndex()
+
+    manifest_filename = os.path.join(output_dir, MANIFEST_FILENAME)
+    partials_dir = os.path.join(output_dir, PARTIALS_DIRNAME)
+
+    FileSystem.MakeDirs(partials_dir)
+
+    # Load the previous manifest
+    prev_units = {}
+
+    if os.path.isfile(manifest_filename):
+        try:
+            with open(manifest_filename) as f:
+                content = json.load(f)
+
+            if content.get("version", None) == MANIFEST_VERSION:
+                prev_units = content["units"]
+
+        except (IOError, OSError, ValueError, KeyError):
+            prev_units = {}
+
+    # Determine what has changed
+    units = {}
+    changed = []
+
+    for bin_dir in sorted(set(bin_dirs)):
+        for gcno_filename in directory_index.GetFilenames(bin_dir, ".gcno"):
+            gcno_filename = os.path.realpath(gcno_filename)
+
+            gcda_filename = "{}.gcda".format(os.path.splitext(gcno_filename)[0])
+            if not os.path.isfile(gcda_filename):
+                gcda_filename = None
+
+            unit = {
+                "fingerprint": _CreateFingerprint(gcno_filename, gcda_filename),
+                "partial": "{}.info".format(hashlib.sha256(gcno_filename.encode("utf-8")).hexdigest()),
+            }
+
+            units[gcno_filename] = unit
+
+            prev_unit = prev_units.get(gcno_filename, None)
+
+            if (
+                prev_unit is None
+                or prev_unit.get("fingerprint", None) != unit["fingerprint"]
+                or not os.path.isfile(os.path.join(partials_dir, unit["partial"]))
+            ):
+                changed.append((gcno_filename, gcda_filename, unit))
+
+    output_stream.write(
+        "Incremental coverage: {} of {} object files changed.\n".format(len(changed), len(units)),
+    )
+
+    # Remove partial results that are no longer used
+    for gcno_filename, prev_unit in prev_units.items():
+        if gcno_filename in units:
+            continue
+
+        partial_filename = os.path.join(partials_dir, prev_unit.get("partial", ""))
+        if os.path.isfile(partial_filename):
+            os.remove(partial_filename)
+
+    # Generate partial results for the changed units
+    result = 0
+
+    if changed:
+        temp_directories = []
+
+        try:
+            command_lines = []
+
+            for gcno_filename, gcda_filename, unit in changed:
+                temp_directory = CurrentShell.CreateTempDirectory()
+                temp_directories.append(temp_directory)
+
+                stager = ArtifactStager()
+
+                for filename in [gcno_filename, gcda_filename]:
+                    if filename is not None:
+                        stager.Stage(filename, os.path.join(temp_directory, os.path.basename(filename)))
+
+                command_lines.append(
+                    CoverageTools.CreateLcovCommandLine(
+                        [temp_directory],
+                        os.path.join(partials_dir, unit["partial"]),
+                    ),
+                )
+
+            # ----------------------------------------------------------------------
+            def OnComplete(index, result, output):
+                # Release the staged files while other units are still being processed
+                FileSystem.RemoveTree(temp_directories[index])
+
+            # ----------------------------------------------------------------------
+
+            job_results = AsyncProcess.Execute(
+                command_lines,
+                on_complete=OnComplete,
+                max_concurrency=max_workers,
+            )
+
+        finally:
+            for temp_directory in temp_directories:
+                if os.path.isdir(temp_directory):
+                    FileSystem.RemoveTree(temp_directory)
+
+        for (gcno_filename, _, _), job_result in zip(changed, job_results):
+            if job_result.result != 0:
+                output_stream.write(job_result.output)
+
+                # Don't record this unit so that it is processed again during the next run
+                units.pop(gcno_filename)
+
+                if result == 0:
+                    result = job_result.result
+
+    # Update the manifest. This is done before the partial results are merged so that
+    # successfully generated results aren't lost if the merge fails.
+    with open(manifest_filename, "w") as f:
+        json.dump(
+            {
+                "version": MANIFEST_VERSION,
+                "units": units,
+            },
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+
+    if result != 0:
+        return result
+
+    # Merge the partial results
+    Lcov.Merge(
+        [os.path.join(partials_dir, unit["partial"]) for _, unit in sorted(units.items())],
+        os.path.join(output_dir, output_filename),
+    )
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _CreateFingerprint(gcno_filename, gcda_filename):
+    results = []
+
+    for filename in [gcno_filename, gcda_filename]:
+        if filename is None:
+            results.append(None)
+            continue
+
+        stat = os.stat(filename)
+        results.append([stat.st_size, stat.st_mtime_ns])
+
+    return results
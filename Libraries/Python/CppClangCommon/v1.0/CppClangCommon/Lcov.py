@@ -0,0 +1,330 @@
+# ----------------------------------------------------------------------
+# |
+# |  Lcov.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-22 14:10:33
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Functionality for reading, merging, and writing LCOV tracefiles"""
+
+import bisect
+import contextlib
+import heapq
+import itertools
+import mmap
+import os
+import re
+import uuid
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+def Merge(input_filenames, output_filename):
+    """\
+    Merges the content of multiple LCOV files, summing hits for each source file.
+
+    Each input is memory mapped and indexed by source file, and the indexes are merged in
+    source file order; only the records for a single source file are parsed (and held in
+    memory) at any time, so inputs can be larger than the available memory.
+    """
+
+    with contextlib.ExitStack() as stack:
+        indexes = []
+
+        for input_filename in input_filenames:
+            f = stack.enter_context(open(input_filename, "rb"))
+
+            if os.fstat(f.fileno()).st_size == 0:
+                continue
+
+            content = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+            indexes.append(
+                [
+                    (source_filename, content, test_name_line, start, end)
+                    for source_filename, test_name_line, start, end in sorted(
+                        IndexRecords(content),
+                        # test_name_line is None for records without a "TN:" line, so it can't be compared
+                        key=lambda record: (record[0], record[2]),
+                    )
+                ],
+            )
+
+        # Write to a temp file, as the output may also be one of the inputs
+        temp_filename = "{}.{}.tmp".format(output_filename, uuid.uuid4().hex)
+
+        try:
+            with open(temp_filename, "w", encoding="utf-8", errors="surrogateescape") as f:
+                for source_filename, records in itertools.groupby(
+                    heapq.merge(*indexes, key=lambda record: record[0]),
+                    key=lambda record: record[0],
+                ):
+                    file_coverage = FileCoverage(source_filename.decode("utf-8", "surrogateescape"))
+
+                    for _, content, test_name_line, start, end in records:
+                        lines = content[start:end].decode("utf-8", "surrogateescape").splitlines()
+
+                        if test_name_line is not None:
+                            lines.insert(0, test_name_line.decode("utf-8", "surrogateescape"))
+
+                        file_coverage.Add(lines)
+
+                    file_coverage.Write(f)
+
+            os.replace(temp_filename, output_filename)
+
+        finally:
+            if os.path.isfile(temp_filename):
+                os.remove(temp_filename)
+
+
+# ----------------------------------------------------------------------
+def AggregateByFileAndMethod(filename):
+    """\
+    Returns a dict of (source filename, method name) -> (covered, not_covered) for all of the
+    methods in an LCOV file (see `FileCoverage.GetMethodCoverage`).
+    """
+
+    file_coverages = {}
+
+    with open(filename, encoding="utf-8", errors="surrogateescape") as f:
+        for source_filename, lines in EnumRecords(f):
+            file_coverage = file_coverages.get(source_filename, None)
+            if file_coverage is None:
+                file_coverage = FileCoverage(source_filename)
+                file_coverages[source_filename] = file_coverage
+
+            file_coverage.Add(lines)
+
+    results = {}
+
+    for source_filename, file_coverage in file_coverages.items():
+        for name, value in file_coverage.GetMethodCoverage().items():
+            results[(source_filename, name)] = value
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def EnumRecords(f):
+    """Yields (source_filename, [line, ...]) for each record in an LCOV file"""
+
+    source_filename = None
+    lines = []
+
+    # The test name precedes the source file
+    test_name_line = None
+
+    for line in f:
+        line = line.rstrip("\r\n")
+
+        if line.startswith("SF:"):
+            source_filename = line[3:]
+            lines = [test_name_line] if test_name_line is not None else []
+
+        elif line.startswith("TN:"):
+            test_name_line = line
+
+        elif line == "end_of_record":
+            if source_filename is not None:
+                yield source_filename, lines
+
+            source_filename = None
+            lines = []
+
+        elif source_filename is not None:
+            lines.append(line)
+
+
+# ----------------------------------------------------------------------
+def IndexRecords(content):
+    """\
+    Returns [(source_filename, test_name_line, start, end), ...] for each record in the content,
+    where `start` and `end` are the offsets of the lines between "SF:" and "end_of_record".
+    """
+
+    results = []
+
+    source_filename = None
+    test_name_line = None
+    start = None
+
+    for match in _RECORD_BOUNDARY_REGEX.finditer(content):
+        line_start = match.start()
+
+        line_end = content.find(b"\n", line_start)
+        if line_end == -1:
+            line_end = len(content)
+
+        line = content[line_start:line_end].rstrip(b"\r")
+
+        if line.startswith(b"SF:"):
+            source_filename = line[3:]
+            start = line_end + 1
+
+        elif line.startswith(b"TN:"):
+            test_name_line = line
+
+        elif line == b"end_of_record":
+            if source_filename is not None:
+                results.append((source_filename, test_name_line, start, line_start))
+
+            source_filename = None
+
+    return results
+
+
+# ----------------------------------------------------------------------
+class FileCoverage(object):
+    """Coverage information for a single source file, accumulated across records"""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, source_filename):
+        self.source_filename                = source_filename
+
+        self.test_name                      = None
+        self.function_lines                 = {}        # name -> line
+        self.function_hits                  = {}        # name -> count
+        self.branch_hits                    = {}        # (line, block, branch) -> count or None
+        self.line_hits                      = {}        # line -> count
+
+    # ----------------------------------------------------------------------
+    def Add(self, lines):
+        """Adds the content of a record (the lines between "SF:" and "end_of_record")"""
+
+        for line in lines:
+            tag, sep, value = line.partition(":")
+            if not sep:
+                continue
+
+            if tag == "DA":
+                parts = value.split(",")
+                line_number = int(parts[0])
+
+                self.line_hits[line_number] = self.line_hits.get(line_number, 0) + _ToCount(parts[1])
+
+            elif tag == "FNDA":
+                count, _, name = value.partition(",")
+
+                self.function_hits[name] = self.function_hits.get(name, 0) + _ToCount(count)
+
+            elif tag == "FN":
+                line_number, _, name = value.partition(",")
+
+                self.function_lines.setdefault(name, int(line_number))
+                self.function_hits.setdefault(name, 0)
+
+            elif tag == "BRDA":
+                line_number, block, branch, taken = value.split(",", 3)
+                key = (int(line_number), block, branch)
+
+                if taken == "-":
+                    self.branch_hits.setdefault(key, None)
+                else:
+                    self.branch_hits[key] = (self.branch_hits.get(key, None) or 0) + _ToCount(taken)
+
+            elif tag == "TN":
+                if self.test_name is None:
+                    self.test_name = value
+
+            # FNF, FNH, BRF, BRH, LF, and LH are calculated when written
+
+    # ----------------------------------------------------------------------
+    def GetMethodCoverage(self):
+        """\
+        Returns a dict of method name -> (covered, not_covered).
+
+        Lines are attributed to methods in the same way as `grcov -t ade`: a method includes the
+        lines from its first line up to (but not including) the first line of the next method.
+        """
+
+        line_numbers = sorted(self.line_hits)
+
+        # covered_counts[index] is the number of covered lines in line_numbers[:index]
+        covered_counts = [0]
+
+        for line_number in line_numbers:
+            covered_counts.append(covered_counts[-1] + (1 if self.line_hits[line_number] else 0))
+
+        starts = sorted(set(self.function_lines.values()))
+
+        results = {}
+
+        for name, start in self.function_lines.items():
+            start_index = bisect.bisect_left(line_numbers, start)
+
+            next_start_index = bisect.bisect_right(starts, start)
+            if next_start_index == len(starts):
+                end_index = len(line_numbers)
+            else:
+                end_index = bisect.bisect_left(line_numbers, starts[next_start_index])
+
+            covered = covered_counts[end_index] - covered_counts[start_index]
+
+            results[name] = (covered, end_index - start_index - covered)
+
+        return results
+
+    # ----------------------------------------------------------------------
+    def Write(self, f):
+        if self.test_name is not None:
+            f.write("TN:{}\n".format(self.test_name))
+
+        f.write("SF:{}\n".format(self.source_filename))
+
+        for name, line_number in sorted(self.function_lines.items(), key=lambda item: (item[1], item[0])):
+            f.write("FN:{},{}\n".format(line_number, name))
+
+        for name in sorted(self.function_hits):
+            f.write("FNDA:{},{}\n".format(self.function_hits[name], name))
+
+        if self.function_hits:
+            f.write("FNF:{}\n".format(len(self.function_hits)))
+            f.write("FNH:{}\n".format(sum(1 for count in self.function_hits.values() if count)))
+
+        for key in sorted(self.branch_hits, key=lambda key: (key[0], _SortKey(key[1]), _SortKey(key[2]))):
+            count = self.branch_hits[key]
+            f.write("BRDA:{},{},{},{}\n".format(key[0], key[1], key[2], "-" if count is None else count))
+
+        if self.branch_hits:
+            f.write("BRF:{}\n".format(len(self.branch_hits)))
+            f.write("BRH:{}\n".format(sum(1 for count in self.branch_hits.values() if count)))
+
+        for line_number in sorted(self.line_hits):
+            f.write("DA:{},{}\n".format(line_number, self.line_hits[line_number]))
+
+        f.write("LF:{}\n".format(len(self.line_hits)))
+        f.write("LH:{}\n".format(sum(1 for count in self.line_hits.values() if count)))
+        f.write("end_of_record\n")
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_RECORD_BOUNDARY_REGEX                      = re.compile(br"^(?:TN:|SF:|end_of_record)", re.MULTILINE)
+
+# ----------------------------------------------------------------------
+def _ToCount(value):
+    # Some tools write counts as floating point values
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+# ----------------------------------------------------------------------
+def _SortKey(value):
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
@@ -0,0 +1,335 @@
+# ----------------------------------------------------------------------
+# |
+# |  LlvmCovExport.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-24 14:02:17
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Streaming parser for the JSON generated by `llvm-cov export`.
+
+The export is a single JSON document that can be very large. Rather than loading it
+all at once, the document is read incrementally and each element of the "files" and
+"functions" arrays is decoded on its own, so memory usage is bounded by the size of
+the largest element.
+"""
+
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import tempfile
+
+from collections import namedtuple
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# The summary of a single source file; each value is a (covered, total) tuple or None
+FileSummary                                 = namedtuple("FileSummary", ["filename", "lines", "functions", "regions", "branches"])
+
+# The summary of a single function
+FunctionSummary                             = namedtuple("FunctionSummary", ["filename", "name", "count", "regions"])
+
+# Region kind used for code (as opposed to expansion, skipped, gap, and branch regions)
+_CODE_REGION_KIND                           = 0
+
+# ----------------------------------------------------------------------
+def EnumItems(f, chunk_size=1024 * 1024):
+    """\
+    Yields (type, content) for each item in the export, where type is one of:
+
+        "file":         An element of the "files" array
+        "function":     An element of the "functions" array
+        "totals":       The totals for all files
+    """
+
+    reader = _Reader(f, chunk_size)
+
+    reader.Expect("{")
+
+    for key in reader.EnumKeys():
+        if key != "data":
+            reader.ReadValue()
+            continue
+
+        for _ in reader.EnumArray():
+            reader.Expect("{")
+
+            for data_key in reader.EnumKeys():
+                if data_key == "files":
+                    for _ in reader.EnumArray():
+                        yield "file", reader.ReadValue()
+
+                elif data_key == "functions":
+                    for _ in reader.EnumArray():
+                        yield "function", reader.ReadValue()
+
+                elif data_key == "totals":
+                    yield "totals", reader.ReadValue()
+
+                else:
+                    reader.ReadValue()
+
+
+# ----------------------------------------------------------------------
+def CreateFileSummary(content):
+    """Converts a "file" item into a FileSummary"""
+
+    summary = content.get("summary", {})
+
+    # ----------------------------------------------------------------------
+    def Get(name):
+        value = summary.get(name, None)
+        if value is None:
+            return None
+
+        return value.get("covered", 0), value.get("count", 0)
+
+    # ----------------------------------------------------------------------
+
+    return FileSummary(
+        content.get("filename", ""),
+        Get("lines"),
+        Get("functions"),
+        Get("regions"),
+        Get("branches"),
+    )
+
+
+# ----------------------------------------------------------------------
+def CreateFunctionSummary(content):
+    """Converts a "function" item into a FunctionSummary"""
+
+    covered = 0
+    total = 0
+
+    # Each region is [line_start, col_start, line_end, col_end, count, file_id, expanded_file_id, kind]
+    for region in content.get("regions", []):
+        if len(region) < 8 or region[7] != _CODE_REGION_KIND:
+            continue
+
+        total += 1
+        if region[4]:
+            covered += 1
+
+    filenames = content.get("filenames", [])
+
+    return FunctionSummary(
+        filenames[0] if filenames else "",
+        content.get("name", ""),
+        content.get("count", 0),
+        (covered, total),
+    )
+
+
+# ----------------------------------------------------------------------
+def Summarize(
+    executables,
+    profdata_filename,
+    source_dirs=None,
+    include_functions=False,
+    num_threads=None,
+):
+    """\
+    Runs `llvm-cov export` and returns (result, output, [FileSummary, ...], [FunctionSummary, ...], FileSummary or None).
+
+    Per-function information requires the full export (which is much larger than the
+    summary-only export); the function list is empty if `include_functions` is False.
+    """
+
+    assert executables
+
+    command_line = ["llvm-cov", "export", executables[0]]
+
+    for executable in executables[1:]:
+        command_line.append("-object={}".format(executable))
+
+    command_line += [
+        "-instr-profile={}".format(profdata_filename),
+        "-num-threads={}".format(num_threads or multiprocessing.cpu_count()),
+    ]
+
+    if include_functions:
+        command_line.append("-skip-expansions")
+    else:
+        command_line.append("-summary-only")
+
+    command_line += source_dirs or []
+
+    # stderr is written to a file so that the process never blocks on a full stderr pipe
+    # while stdout is being read.
+    stderr_file = tempfile.TemporaryFile()
+
+    process = subprocess.Popen(
+        command_line,
+        stdout=subprocess.PIPE,
+        stderr=stderr_file,
+    )
+
+    files = []
+    functions = []
+    totals = None
+
+    try:
+        for item_type, content in EnumItems(io.TextIOWrapper(process.stdout, encoding="utf-8", errors="surrogateescape")):
+            if item_type == "file":
+                files.append(CreateFileSummary(content))
+            elif item_type == "function":
+                if include_functions:
+                    functions.append(CreateFunctionSummary(content))
+            elif item_type == "totals":
+                totals = CreateFileSummary({"summary": content})
+
+    except ValueError:
+        # The content will be invalid if the process failed; this is reported below
+        process.stdout.read()
+
+    result = process.wait()
+
+    with stderr_file:
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode("utf-8", errors="replace")
+
+    if result == 0 and totals is None:
+        result = -1
+        stderr += "The 'llvm-cov export' output was not valid.\n"
+
+    return result, stderr, files, functions, totals
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+class _Reader(object):
+    """Reads JSON content incrementally from a text stream"""
+
+    _WHITESPACE                             = " \t\r\n"
+
+    # ----------------------------------------------------------------------
+    def __init__(self, f, chunk_size):
+        self._f                             = f
+        self._chunk_size                    = chunk_size
+
+        self._decoder                       = json.JSONDecoder()
+        self._buffer                        = ""
+        self._pos                           = 0
+        self._is_eof                        = False
+
+    # ----------------------------------------------------------------------
+    def Expect(self, char):
+        if self._Peek() != char:
+            raise ValueError("'{}' was expected".format(char))
+
+        self._pos += 1
+
+    # ----------------------------------------------------------------------
+    def EnumKeys(self):
+        """Yields each key in an object whose opening brace has been consumed; the caller must consume the value"""
+
+        if self._Peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self.ReadValue()
+            if not isinstance(key, str):
+                raise ValueError("A key was expected")
+
+            self.Expect(":")
+
+            yield key
+
+            char = self._Peek()
+            self._pos += 1
+
+            if char == "}":
+                break
+            if char != ",":
+                raise ValueError("',' or '}' was expected")
+
+    # ----------------------------------------------------------------------
+    def EnumArray(self):
+        """Yields once for each element in an array; the caller must consume the element"""
+
+        self.Expect("[")
+
+        if self._Peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield
+
+            char = self._Peek()
+            self._pos += 1
+
+            if char == "]":
+                break
+            if char != ",":
+                raise ValueError("',' or ']' was expected")
+
+    # ----------------------------------------------------------------------
+    def ReadValue(self):
+        self._Peek()
+
+        read_size = self._chunk_size
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+
+                # A number at the end of the buffer may continue in content that hasn't been read yet
+                if end < len(self._buffer) or self._is_eof:
+                    self._pos = end
+                    return value
+
+            except json.JSONDecodeError:
+                if self._is_eof:
+                    raise
+
+            # Read more content; the amount read grows so that very large values are
+            # decoded a bounded number of times.
+            self._Fill(read_size)
+            read_size *= 2
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Peek(self):
+        """Returns the next non-whitespace character without consuming it"""
+
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self._WHITESPACE:
+                self._pos += 1
+
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+
+            if self._is_eof:
+                raise ValueError("Unexpected end of content")
+
+            self._Fill(self._chunk_size)
+
+    # ----------------------------------------------------------------------
+    def _Fill(self, size):
+        content = self._f.read(size)
+        if not content:
+            self._is_eof = True
+
+        # Discard content that has already been consumed
+        self._buffer = self._buffer[self._pos:] + content
+        self._pos = 0
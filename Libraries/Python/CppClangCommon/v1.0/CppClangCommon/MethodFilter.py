@@ -0,0 +1,430 @@
+# ----------------------------------------------------------------------
+# |
+# |  MethodFilter.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-16 09:44:18
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Contains the MethodFilter and DemangledMethodFilter objects"""
+
+import fnmatch
+import os
+import re
+
+from collections import deque
+
+import CommonEnvironment
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class MethodFilter(object):
+    """\
+    Determines if a (mangled) method name should be included based on include and exclude filters.
+
+    This is a hack. The names extracted from the coverage files are mangled while the names
+    provided in includes and excludes are in the glob format. Split the glob and then determine
+    matches by checking to see if each component is in the mangled name. There is a lot that
+    could go wrong with this, but hopefully it is good enough.
+
+    When there are many filter components, they are compiled into a single automaton so that
+    each method name is scanned once, regardless of the number of filters; with only a few
+    components, searching for each one individually is faster. Results are cached by name, as
+    the same names are encountered many times (especially with templates).
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, includes, excludes):
+        part_bits = {}
+
+        # ----------------------------------------------------------------------
+        def ToMask(value):
+            mask = 0
+
+            for part in value.split("::"):
+                if part == "*":
+                    continue
+
+                bit = part_bits.get(part, None)
+                if bit is None:
+                    bit = 1 << len(part_bits)
+                    part_bits[part] = bit
+
+                mask |= bit
+
+            return mask
+
+        # ----------------------------------------------------------------------
+
+        self._include_masks                 = [ToMask(include) for include in includes or []]
+        self._exclude_masks                 = [ToMask(exclude) for exclude in excludes or []]
+
+        if len(part_bits) > _MAX_SUBSTRING_PARTS:
+            self._search_func               = _Automaton(part_bits).Search
+        elif part_bits:
+            self._search_func               = _CreateSubstringSearch(part_bits)
+        else:
+            self._search_func               = lambda method_name: 0
+
+        self._cache                         = {}
+
+    # ----------------------------------------------------------------------
+    def __call__(self, method_name):
+        result = self._cache.get(method_name, None)
+        if result is None:
+            result = self._Evaluate(method_name)
+            self._cache[method_name] = result
+
+        return result
+
+    # ----------------------------------------------------------------------
+    def Filter(self, method_names):
+        """Returns the method names that should be included"""
+
+        return [method_name for method_name in method_names if self(method_name)]
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Evaluate(self, method_name):
+        found = self._search_func(method_name)
+
+        for mask in self._exclude_masks:
+            if found & mask == mask:
+                return False
+
+        if not self._include_masks:
+            return True
+
+        for mask in self._include_masks:
+            if found & mask == mask:
+                return True
+
+        return False
+
+
+# ----------------------------------------------------------------------
+class DemangledMethodFilter(object):
+    """\
+    Determines if a (mangled) method name should be included based on include and exclude filters.
+
+    Mangled names are demangled (in bulk) and the glob filters are matched against:
+
+        - The full demangled name (`int ns::Foo<int>::Method(char) const`)
+        - The qualified name (`ns::Foo<int>::Method`)
+        - The qualified name without template arguments (`ns::Foo::Method`)
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, includes, excludes, demangler):
+        self._include_regex                 = _CompileGlobs(includes)
+        self._exclude_regex                 = _CompileGlobs(excludes)
+        self._demangler                     = demangler
+
+        self._cache                         = {}
+
+    # ----------------------------------------------------------------------
+    def __call__(self, method_name):
+        result = self._cache.get(method_name, None)
+        if result is None:
+            self.Filter([method_name])
+            result = self._cache[method_name]
+
+        return result
+
+    # ----------------------------------------------------------------------
+    def Filter(self, method_names):
+        """Returns the method names that should be included"""
+
+        method_names = list(method_names)
+
+        unknown = [method_name for method_name in method_names if method_name not in self._cache]
+        if unknown:
+            for mangled, demangled in self._demangler.Demangle(unknown).items():
+                self._cache[mangled] = self._Evaluate(demangled)
+
+        return [method_name for method_name in method_names if self._cache[method_name]]
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Evaluate(self, demangled_name):
+        candidates = _CreateCandidates(demangled_name)
+
+        if self._exclude_regex is not None and any(self._exclude_regex.match(candidate) for candidate in candidates):
+            return False
+
+        if self._include_regex is None:
+            return True
+
+        return any(self._include_regex.match(candidate) for candidate in candidates)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_OPERATOR_CHARS                             = "<>[]-=!+*/%^&|~,"
+_OPERATOR_SUFFIX_REGEX                      = re.compile(r"operator\S*$")
+_LLVM_LAMBDA_SUFFIX_REGEX                   = re.compile(r"'lambda\d*'$")
+
+# Searching for each component with `in` is faster than the (pure python) automaton until
+# there are a few dozen components.
+_MAX_SUBSTRING_PARTS                        = 32
+
+# ----------------------------------------------------------------------
+def _CompileGlobs(globs):
+    if not globs:
+        return None
+
+    return re.compile("|".join("(?:{})".format(fnmatch.translate(glob)) for glob in globs))
+
+
+# ----------------------------------------------------------------------
+def _CreateSubstringSearch(value_bits):
+    """Returns a function that returns a bitmask of all of the values found in a string"""
+
+    value_bits = list(value_bits.items())
+
+    # ----------------------------------------------------------------------
+    def Search(value):
+        found = 0
+
+        for part, bit in value_bits:
+            if part in value:
+                found |= bit
+
+        return found
+
+    # ----------------------------------------------------------------------
+
+    return Search
+
+
+# ----------------------------------------------------------------------
+def _CreateCandidates(demangled_name):
+    qualified_name = _StripSignature(demangled_name)
+
+    results = [demangled_name, qualified_name]
+
+    unqualified_name = _StripTemplateArgs(qualified_name)
+    if unqualified_name != qualified_name:
+        results.append(unqualified_name)
+
+    return results
+
+
+# ----------------------------------------------------------------------
+def _EnumTopLevelChars(value):
+    """Yields (index, char) for chars that aren't nested within parens, braces, or template brackets"""
+
+    depth = 0
+    index = 0
+
+    while index < len(value):
+        c = value[index]
+
+        # Operators can contain chars that look like nesting
+        if value.startswith("operator", index):
+            end = index + len("operator")
+
+            if value.startswith("()", end):
+                end += 2
+            else:
+                while end < len(value) and value[end] in _OPERATOR_CHARS:
+                    end += 1
+
+            index = end
+            continue
+
+        if c in "(<{":
+            depth += 1
+        elif c in ")>}":
+            depth = max(depth - 1, 0)
+            if depth == 0:
+                yield index, c
+        elif depth == 0:
+            yield index, c
+
+        index += 1
+
+
+# ----------------------------------------------------------------------
+def _StripSignature(demangled_name):
+    """int ns::Foo<int>::Method(char) const -> ns::Foo<int>::Method"""
+
+    params_index = None
+    space_index = None
+
+    for index, c in _EnumTopLevelChars(demangled_name):
+        if c == ")":
+            # Find the matching open paren for this group
+            depth = 0
+
+            for open_index in range(index, -1, -1):
+                if demangled_name[open_index] == ")":
+                    depth += 1
+                elif demangled_name[open_index] == "(":
+                    depth -= 1
+                    if depth == 0:
+                        break
+
+            # Functions that return function pointers are nested within the return type
+            # (e.g. "void (*ns::Func(int))(char)")
+            if demangled_name.startswith(("(*", "(&"), open_index):
+                return _StripSignature(demangled_name[open_index + 2 : index])
+
+            if _IsParameterList(demangled_name, open_index):
+                params_index = open_index
+                break
+
+        elif c == " ":
+            # Spaces following operators are part of the name (e.g. "operator new", "operator< <int>")
+            if not _OPERATOR_SUFFIX_REGEX.search(demangled_name[:index]):
+                space_index = index
+
+    result = demangled_name if params_index is None else demangled_name[:params_index]
+
+    if space_index is not None and space_index < len(result):
+        result = result[space_index + 1 :]
+
+    return result.strip()
+
+
+# ----------------------------------------------------------------------
+def _IsParameterList(demangled_name, open_index):
+    """Returns True if the parenthesized group at `open_index` contains function parameters"""
+
+    if open_index == 0 or demangled_name.startswith("(anonymous namespace)", open_index):
+        return False
+
+    prefix = demangled_name[:open_index].rstrip()
+
+    # Return types (e.g. "decltype ((a+b)) ns::Func(int)") and llvm lambda names (e.g. "main::'lambda'(int)::operator()(int)")
+    if prefix.endswith("decltype") or _LLVM_LAMBDA_SUFFIX_REGEX.search(prefix):
+        return False
+
+    # Parameters follow the name directly, except for operators (e.g. "operator< (int)")
+    if len(prefix) != open_index:
+        return bool(_OPERATOR_SUFFIX_REGEX.search(prefix))
+
+    return True
+
+
+# ----------------------------------------------------------------------
+def _StripTemplateArgs(qualified_name):
+    """ns::Foo<int>::Method -> ns::Foo::Method"""
+
+    result = []
+    depth = 0
+    index = 0
+
+    while index < len(qualified_name):
+        c = qualified_name[index]
+
+        if qualified_name.startswith("operator", index):
+            end = index + len("operator")
+
+            if qualified_name.startswith("()", end):
+                end += 2
+            else:
+                while end < len(qualified_name) and qualified_name[end] in _OPERATOR_CHARS:
+                    end += 1
+
+            if depth == 0:
+                result.append(qualified_name[index:end])
+
+            index = end
+            continue
+
+        if c == "<":
+            depth += 1
+        elif c == ">":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            result.append(c)
+
+        index += 1
+
+    return "".join(result).strip()
+
+
+# ----------------------------------------------------------------------
+class _Automaton(object):
+    """Aho-Corasick automaton that returns a bitmask of all of the values found in a string"""
+
+    # ----------------------------------------------------------------------
+    def __init__(self, value_bits):
+        transitions = [{}]
+        outputs = [0]
+
+        for value, bit in value_bits.items():
+            state = 0
+
+            for c in value:
+                next_state = transitions[state].get(c, None)
+                if next_state is None:
+                    next_state = len(transitions)
+
+                    transitions.append({})
+                    outputs.append(0)
+
+                    transitions[state][c] = next_state
+
+                state = next_state
+
+            outputs[state] |= bit
+
+        # Calculate the failure transitions (breadth first)
+        failures = [0] * len(transitions)
+
+        queue = deque(transitions[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for c, next_state in transitions[state].items():
+                queue.append(next_state)
+
+                failure = failures[state]
+                while failure and c not in transitions[failure]:
+                    failure = failures[failure]
+
+                failure = transitions[failure].get(c, 0)
+                if failure == next_state:
+                    failure = 0
+
+                failures[next_state] = failure
+                outputs[next_state] |= outputs[failure]
+
+        self._transitions                   = transitions
+        self._failures                      = failures
+        self._outputs                       = outputs
+
+    # ----------------------------------------------------------------------
+    def Search(self, value):
+        transitions = self._transitions
+        failures = self._failures
+        outputs = self._outputs
+
+        found = outputs[0]
+        state = 0
+
+        for c in value:
+            while state and c not in transitions[state]:
+                state = failures[state]
+
+            state = transitions[state].get(c, 0)
+            found |= outputs[state]
+
+        return found
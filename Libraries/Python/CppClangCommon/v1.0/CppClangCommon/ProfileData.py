@@ -0,0 +1,243 @@
+# ----------------------------------------------------------------------
+# |
+# |  ProfileData.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-24 10:16:45
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Functionality for merging LLVM .profraw files into .profdata files"""
+
+import glob
+import hashlib
+import multiprocessing
+import os
+import subprocess
+import textwrap
+
+import CommonEnvironment
+from CommonEnvironment.CallOnExit import CallOnExit
+from CommonEnvironment import FileSystem
+from CommonEnvironment import Process
+from CommonEnvironment.Shell.All import CurrentShell
+
+from CppClangCommon import AsyncProcess
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# Maximum number of inputs processed by a single invocation of llvm-profdata
+DEFAULT_FAN_IN                              = 64
+
+# ----------------------------------------------------------------------
+def ExpandInputs(values, root_dir):
+    """\
+    Returns a sorted list of .profraw files based on the provided values.
+
+    Each value may be a filename, a directory (which is searched recursively for
+    .profraw files), or a glob pattern; relative values are relative to `root_dir`.
+    """
+
+    results = set()
+
+    for value in values:
+        if not os.path.isabs(value):
+            value = os.path.join(root_dir, value)
+
+        if os.path.isdir(value):
+            for root, _, filenames in os.walk(value):
+                for filename in filenames:
+                    if os.path.splitext(filename)[1] == ".profraw":
+                        results.add(os.path.join(root, filename))
+
+        elif any(c in value for c in "*?["):
+            results.update(filename for filename in glob.glob(value, recursive=True) if os.path.isfile(filename))
+
+        elif os.path.isfile(value):
+            results.add(value)
+
+    return sorted(results)
+
+
+# ----------------------------------------------------------------------
+def CreateFingerprint(filenames):
+    """Returns a value that changes when the set of files (or their contents) changes"""
+
+    hasher = hashlib.sha256()
+
+    for filename in sorted(filenames):
+        stat = os.stat(filename)
+        hasher.update("{}|{}|{}\n".format(filename, stat.st_size, stat.st_mtime_ns).encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+# ----------------------------------------------------------------------
+def IsUpToDate(profdata_filename, fingerprint):
+    """\
+    Returns True if the .profdata file was generated from inputs with the fingerprint.
+
+    .profdata files that weren't generated by `Merge` (and therefore don't have
+    fingerprint information) are considered to be up-to-date.
+    """
+
+    if not os.path.isfile(profdata_filename):
+        return False
+
+    fingerprint_filename = _GetFingerprintFilename(profdata_filename)
+    if not os.path.isfile(fingerprint_filename):
+        return True
+
+    with open(fingerprint_filename) as f:
+        return f.read().strip() == fingerprint
+
+
+# ----------------------------------------------------------------------
+def Merge(
+    input_filenames,
+    output_filename,
+    output_stream,
+    sparse=True,
+    fan_in=None,
+    max_workers=None,
+    verbose=False,
+):
+    """\
+    Merges the input files into the output file.
+
+    Inputs are merged in parallel shards of at most `fan_in` files, and the results of those
+    merges are merged again until a single file remains.
+    """
+
+    fan_in = max(fan_in or DEFAULT_FAN_IN, 2)
+    max_workers = max_workers or multiprocessing.cpu_count()
+
+    assert input_filenames
+
+    fingerprint = CreateFingerprint(input_filenames)
+
+    fingerprint_filename = _GetFingerprintFilename(output_filename)
+    if os.path.isfile(fingerprint_filename):
+        os.remove(fingerprint_filename)
+
+    supports_input_files, supports_num_threads = _GetToolCapabilities()
+
+    temp_directory = CurrentShell.CreateTempDirectory()
+
+    with CallOnExit(lambda: FileSystem.RemoveTree(temp_directory)):
+        # ----------------------------------------------------------------------
+        def CreateCommandLine(name, inputs, output, num_threads):
+            if supports_input_files:
+                input_list_filename = os.path.join(temp_directory, "{}.inputs".format(name))
+
+                with open(input_list_filename, "w") as f:
+                    f.write("".join("{}\n".format(input) for input in inputs))
+
+                input_args = '"--input-files={}"'.format(input_list_filename)
+            else:
+                input_args = " ".join('"{}"'.format(input) for input in inputs)
+
+            command_line = 'llvm-profdata merge {sparse}{threads} -o "{output}" {inputs}'.format(
+                sparse="-sparse" if sparse else "",
+                threads=" --num-threads={}".format(num_threads) if supports_num_threads else "",
+                output=output,
+                inputs=input_args,
+            )
+
+            if verbose:
+                output_stream.write(
+                    textwrap.dedent(
+                        """\
+                        Command Line:
+                            {}
+
+                        """,
+                    ).format(command_line),
+                )
+
+            return command_line
+
+        # ----------------------------------------------------------------------
+
+        level = 0
+        inputs = list(input_filenames)
+
+        while len(inputs) > fan_in:
+            shards = [inputs[index : index + fan_in] for index in range(0, len(inputs), fan_in)]
+
+            num_workers = min(max_workers, len(shards))
+            num_threads = max(1, max_workers // num_workers)
+
+            names = ["level_{}_shard_{}".format(level, index) for index in range(len(shards))]
+            outputs = [os.path.join(temp_directory, "{}.profdata".format(name)) for name in names]
+
+            job_results = AsyncProcess.Execute(
+                [
+                    CreateCommandLine(name, shard, output, num_threads)
+                    for name, shard, output in zip(names, shards, outputs)
+                ],
+                max_concurrency=num_workers,
+            )
+
+            for job_result in job_results:
+                output_stream.write(job_result.output)
+
+            for job_result in job_results:
+                if job_result.result != 0:
+                    return job_result.result
+
+            level += 1
+            inputs = outputs
+
+        result = Process.Execute(
+            CreateCommandLine("final", inputs, output_filename, max_workers),
+            output_stream,
+        )
+
+        if result != 0:
+            return result
+
+    with open(fingerprint_filename, "w") as f:
+        f.write(fingerprint)
+
+    return 0
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_tool_capabilities                          = None
+
+def _GetToolCapabilities():
+    """Returns (supports_input_files, supports_num_threads) for the installed version of llvm-profdata"""
+
+    global _tool_capabilities
+
+    if _tool_capabilities is None:
+        try:
+            output = subprocess.run(
+                ["llvm-profdata", "merge", "--help"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+            ).stdout
+        except OSError:
+            output = ""
+
+        _tool_capabilities = ("--input-files" in output, "--num-threads" in output)
+
+    return _tool_capabilities
+
+
+# ----------------------------------------------------------------------
+def _GetFingerprintFilename(profdata_filename):
+    return "{}.inputs_fingerprint".format(profdata_filename)
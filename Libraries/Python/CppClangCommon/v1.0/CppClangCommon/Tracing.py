@@ -0,0 +1,216 @@
+# ----------------------------------------------------------------------
+# |
+# |  Tracing.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-03-25 14:40:12
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Records the duration of operations (spans) and writes them as Chrome trace events.
+
+Tracing is enabled by setting the environment variable
+`DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_TRACE` to the name of the output file; "%p" in
+the name is replaced with the process id so that each process writes its own file (the
+process id is added before the file's extension if the name doesn't contain "%p"). The
+file can be viewed with chrome://tracing or https://ui.perfetto.dev.
+
+When tracing isn't enabled, `Span` returns a shared object whose methods do nothing.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+import CommonEnvironment
+from CommonEnvironment import FileSystem
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+TRACE_ENVIRONMENT_VAR                       = "DEVELOPMENT_ENVIRONMENT_CPP_CLANG_COVERAGE_TRACE"
+
+# ----------------------------------------------------------------------
+def IsEnabled():
+    return _trace is not None
+
+
+# ----------------------------------------------------------------------
+def Enable(filename):
+    """Enables tracing; events are written to `filename` when the process exits"""
+
+    global _trace
+
+    if _trace is None:
+        # Child processes inherit the environment, so each process must write to its own file
+        if "%p" not in filename:
+            filename = "{}.%p{}".format(*os.path.splitext(filename))
+
+        _trace = _Trace(filename.replace("%p", str(os.getpid())))
+        atexit.register(_trace.Write)
+
+
+# ----------------------------------------------------------------------
+def Span(
+    name,
+    category="coverage",
+    measure_subprocesses=False,
+    **args
+):
+    """\
+    Returns a context manager that records the duration of the code within it.
+
+    Additional information (for example, file counts or bytes moved) can be provided via
+    `args` or added to the span with `Set` before it completes. Values that are expensive
+    to calculate can be provided as callables, which are only invoked when tracing is
+    enabled.
+
+    When `measure_subprocesses` is True, the CPU time consumed by subprocesses that
+    completed while the span was active is recorded. This time is tracked per process
+    (not per thread), so concurrent spans that measure subprocesses will overlap.
+    """
+
+    if _trace is None:
+        return _NULL_SPAN
+
+    return _Span(name, category, measure_subprocesses, args)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+class _Trace(object):
+    # ----------------------------------------------------------------------
+    def __init__(self, filename):
+        self.filename                       = filename
+        self.pid                            = os.getpid()
+        self.start                          = time.perf_counter()
+
+        self._events                        = []
+        self._lock                          = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def Add(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    # ----------------------------------------------------------------------
+    def Write(self):
+        with self._lock:
+            events = list(self._events)
+
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            FileSystem.MakeDirs(dirname)
+
+        with open(self.filename, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": events,
+                    "displayTimeUnit": "ms",
+                },
+                f,
+            )
+
+
+# ----------------------------------------------------------------------
+class _Span(object):
+    __slots__ = ("_name", "_category", "_measure_subprocesses", "_args", "_start", "_start_times")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name, category, measure_subprocesses, args):
+        self._name                          = name
+        self._category                      = category
+        self._measure_subprocesses          = measure_subprocesses
+        self._args                          = args
+
+        self._start                         = None
+        self._start_times                   = None
+
+    # ----------------------------------------------------------------------
+    def __enter__(self):
+        _ResolveArgs(self._args)
+
+        self._start_times = os.times() if self._measure_subprocesses else None
+        self._start = time.perf_counter()
+
+        return self
+
+    # ----------------------------------------------------------------------
+    def __exit__(self, *args):
+        end = time.perf_counter()
+
+        if self._start_times is not None:
+            end_times = os.times()
+
+            self._args["subprocess_wall_seconds"] = end - self._start
+            self._args["subprocess_cpu_seconds"] = (
+                end_times.children_user
+                + end_times.children_system
+                - self._start_times.children_user
+                - self._start_times.children_system
+            )
+
+        trace = _trace
+        if trace is None:
+            return
+
+        trace.Add(
+            {
+                "name": self._name,
+                "cat": self._category,
+                "ph": "X",
+                "ts": (self._start - trace.start) * 1000000.0,
+                "dur": (end - self._start) * 1000000.0,
+                "pid": trace.pid,
+                "tid": threading.get_ident(),
+                "args": self._args,
+            },
+        )
+
+    # ----------------------------------------------------------------------
+    def Set(self, **args):
+        self._args.update(_ResolveArgs(args))
+
+
+# ----------------------------------------------------------------------
+class _NullSpan(object):
+    # ----------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    # ----------------------------------------------------------------------
+    def __exit__(self, *args):
+        pass
+
+    # ----------------------------------------------------------------------
+    def Set(self, **args):
+        pass
+
+
+# ----------------------------------------------------------------------
+def _ResolveArgs(args):
+    for key, value in args.items():
+        if callable(value):
+            args[key] = value()
+
+    return args
+
+
+# ----------------------------------------------------------------------
+_NULL_SPAN                                  = _NullSpan()
+_trace                                      = None
+
+if os.getenv(TRACE_ENVIRONMENT_VAR):
+    Enable(os.getenv(TRACE_ENVIRONMENT_VAR))
@@ -0,0 +1,182 @@
+# ----------------------------------------------------------------------
+# |
+# |  AdeParser_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-03 11:25:40
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for AdeParser.py"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon import AdeParser
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_EnumMethods(self):
+        filename = self._Write(
+            """\
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"covered":[3,4],"name":"_Z3Addii","total_covered":2,"total_uncovered":0,"uncovered":[]}}
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"covered":[],"name":"main","total_covered":0,"total_uncovered":5,"uncovered":[7,8,9,10,11]}}
+            """,
+        )
+
+        self.assertEqual(
+            list(AdeParser.EnumMethods(filename)),
+            [("_Z3Addii", 2, 0), ("main", 0, 5)],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_EnumMethodsSkipsIncompleteRecords(self):
+        filename = self._Write(
+            """\
+
+            {"file":{"name":"a.cpp"},"language":"c/c++"}
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":null}
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"total_covered":1,"total_uncovered":1}}
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"name":"NoCovered","total_uncovered":1}}
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"name":"NoUncovered","total_covered":1}}
+            {"file":{"covered":[1],"name":"a.cpp","total_covered":1,"total_uncovered":0,"uncovered":[]},"is_file":true,"language":"c/c++","method":{"covered":[],"total_covered":0,"total_uncovered":0,"uncovered":[]}}
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"name":"Valid","total_covered":3,"total_uncovered":4}}
+            """,
+        )
+
+        self.assertEqual(list(AdeParser.EnumMethods(filename)), [("Valid", 3, 4)])
+
+    # ----------------------------------------------------------------------
+    def test_EnumMethodsSkipsLinesWithoutMethodKey(self):
+        # Lines that can't contain a method record are skipped before they are decoded
+        filename = self._Write(
+            """\
+            this is not json
+            {"file":{"name":"a.cpp"}
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"name":"Valid","total_covered":1,"total_uncovered":0}}
+            """,
+        )
+
+        self.assertEqual(list(AdeParser.EnumMethods(filename)), [("Valid", 1, 0)])
+
+    # ----------------------------------------------------------------------
+    def test_EnumMethodsInvalidJson(self):
+        filename = self._Write(
+            """\
+            {"file":{"name":"a.cpp"},"language":"c/c++","method":{"name":"Truncated","total_co
+            """,
+        )
+
+        with self.assertRaises(ValueError):
+            list(AdeParser.EnumMethods(filename))
+
+    # ----------------------------------------------------------------------
+    def test_Aggregate(self):
+        filename = self._Write(
+            """\
+            {"method":{"name":"_Z3Fooi","total_covered":2,"total_uncovered":1}}
+            {"method":{"name":"_Z3Bari","total_covered":4,"total_uncovered":3}}
+            {"method":{"name":"_Z3Fooi","total_covered":1,"total_uncovered":0}}
+            """,
+        )
+
+        self.assertEqual(AdeParser.Aggregate(filename), (7, 4))
+        self.assertEqual(AdeParser.Aggregate(filename, lambda name: name == "_Z3Fooi"), (3, 1))
+        self.assertEqual(AdeParser.Aggregate(filename, lambda name: False), (0, 0))
+
+    # ----------------------------------------------------------------------
+    def test_AggregateByMethod(self):
+        filename = self._Write(
+            """\
+            {"method":{"name":"_Z3Fooi","total_covered":2,"total_uncovered":1}}
+            {"method":{"name":"_Z3Bari","total_covered":4,"total_uncovered":3}}
+            {"method":{"name":"_Z3Fooi","total_covered":1,"total_uncovered":0}}
+            """,
+        )
+
+        self.assertEqual(
+            AdeParser.AggregateByMethod(filename),
+            {
+                "_Z3Fooi": (3, 1),
+                "_Z3Bari": (4, 3),
+            },
+        )
+
+    # ----------------------------------------------------------------------
+    def test_AggregateByFileAndMethod(self):
+        filename = self._Write(
+            """\
+            {"file":{"name":"a.cpp"},"method":{"name":"main","total_covered":2,"total_uncovered":1}}
+            {"file":{"name":"b.cpp"},"method":{"name":"main","total_covered":4,"total_uncovered":3}}
+            {"file":{"name":"a.cpp"},"method":{"name":"main","total_covered":1,"total_uncovered":0}}
+            {"method":{"name":"main","total_covered":1,"total_uncovered":1}}
+            """,
+        )
+
+        self.assertEqual(
+            AdeParser.AggregateByFileAndMethod(filename),
+            {
+                ("a.cpp", "main"): (3, 1),
+                ("b.cpp", "main"): (4, 3),
+                (None, "main"): (1, 1),
+            },
+        )
+
+    # ----------------------------------------------------------------------
+    def test_Empty(self):
+        filename = self._Write("")
+
+        self.assertEqual(list(AdeParser.EnumMethods(filename)), [])
+        self.assertEqual(AdeParser.Aggregate(filename), (0, 0))
+        self.assertEqual(AdeParser.AggregateByMethod(filename), {})
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Write(self, content):
+        filename = os.path.join(self._temp_directory, "coverage.ade")
+
+        with open(filename, "w") as f:
+            f.write(textwrap.dedent(content))
+
+        return filename
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
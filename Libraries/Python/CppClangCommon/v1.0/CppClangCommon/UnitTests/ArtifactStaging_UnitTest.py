@@ -0,0 +1,261 @@
+# ----------------------------------------------------------------------
+# |
+# |  ArtifactStaging_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-05 13:52:19
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for ArtifactStaging.py"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+import CommonEnvironment
+
+from CppClangCommon.ArtifactStaging import ArtifactStager, GatherFiles
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+        self._root = os.path.join(self._temp_directory, "root")
+        self._record_dir = os.path.join(self._temp_directory, "records")
+
+        os.makedirs(self._root)
+        os.makedirs(self._record_dir)
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_StageLink(self):
+        source_filename = self._Write("source.gcda", "content")
+        dest_filename = os.path.join(self._temp_directory, "dest.gcda")
+
+        stager = ArtifactStager()
+        stager.Stage(source_filename, dest_filename)
+
+        self.assertTrue(os.path.samefile(source_filename, dest_filename))
+        self.assertEqual((stager.num_linked, stager.num_symlinked, stager.num_copied), (1, 0, 0))
+        self.assertEqual(stager.bytes_saved, len("content"))
+
+    # ----------------------------------------------------------------------
+    def test_StageSymlinkFallback(self):
+        source_filename = self._Write("source.gcda", "content")
+        dest_filename = os.path.join(self._temp_directory, "dest.gcda")
+
+        stager = ArtifactStager()
+
+        with mock.patch("os.link", side_effect=OSError("Cross-device link")):
+            stager.Stage(source_filename, dest_filename)
+
+        self.assertTrue(os.path.islink(dest_filename))
+        self.assertEqual(self._Read(dest_filename), "content")
+        self.assertEqual((stager.num_linked, stager.num_symlinked, stager.num_copied), (0, 1, 0))
+
+    # ----------------------------------------------------------------------
+    def test_StageCopyFallback(self):
+        source_filename = self._Write("source.gcda", "content")
+        dest_filename = os.path.join(self._temp_directory, "dest.gcda")
+
+        stager = ArtifactStager()
+
+        with mock.patch("os.link", side_effect=OSError("Cross-device link")):
+            with mock.patch("os.symlink", side_effect=OSError("Not supported")):
+                stager.Stage(source_filename, dest_filename)
+
+        self.assertFalse(os.path.islink(dest_filename))
+        self.assertFalse(os.path.samefile(source_filename, dest_filename))
+        self.assertEqual(self._Read(dest_filename), "content")
+        self.assertEqual(os.stat(source_filename).st_mtime_ns, os.stat(dest_filename).st_mtime_ns)
+
+        self.assertEqual((stager.num_linked, stager.num_symlinked, stager.num_copied), (0, 0, 1))
+        self.assertEqual((stager.bytes_copied, stager.bytes_saved), (len("content"), 0))
+
+    # ----------------------------------------------------------------------
+    def test_StageWithoutLinks(self):
+        source_filename = self._Write("source.gcda", "content")
+        dest_filename = self._Write("dest.gcda", "old content")
+
+        stager = ArtifactStager()
+        stager.Stage(source_filename, dest_filename, allow_links=False)
+
+        self.assertFalse(os.path.samefile(source_filename, dest_filename))
+        self.assertEqual(self._Read(dest_filename), "content")
+        self.assertEqual(stager.num_copied, 1)
+
+    # ----------------------------------------------------------------------
+    def test_GatherFiles(self):
+        self._Write(os.path.join("root", "a", "one.gcda"), "one")
+        self._Write(os.path.join("root", "a", "b", "two.gcda"), "two")
+        self._Write(os.path.join("root", "a", "ignored.gcno"), "ignored")
+
+        stager = ArtifactStager()
+
+        self.assertEqual(self._GatherFiles(stager), (2, 0, []))
+        self.assertEqual(stager.num_linked, 2)
+
+        self.assertEqual(self._Read(os.path.join(self._root, "one.gcda")), "one")
+        self.assertEqual(self._Read(os.path.join(self._root, "two.gcda")), "two")
+
+        # The staging record isn't written to the root
+        self.assertEqual(sorted(os.listdir(self._root)), ["a", "one.gcda", "two.gcda"])
+        self.assertEqual(len(os.listdir(self._record_dir)), 1)
+
+        # Everything is up-to-date
+        self.assertEqual(self._GatherFiles(ArtifactStager()), (0, 2, []))
+
+    # ----------------------------------------------------------------------
+    def test_ReplaceStagedFile(self):
+        source_filename = self._Write(os.path.join("root", "a", "one.gcda"), "one")
+        dest_filename = os.path.join(self._root, "one.gcda")
+
+        with mock.patch("os.link", side_effect=OSError("Cross-device link")):
+            with mock.patch("os.symlink", side_effect=OSError("Not supported")):
+                self.assertEqual(self._GatherFiles(ArtifactStager()), (1, 0, []))
+
+        # Something else has a reference to the staged file
+        alias_filename = os.path.join(self._temp_directory, "alias.gcda")
+        os.link(dest_filename, alias_filename)
+
+        self._Write(os.path.join("root", "a", "one.gcda"), "updated")
+
+        stager = ArtifactStager()
+
+        self.assertEqual(self._GatherFiles(stager), (1, 0, []))
+
+        # The staged file was replaced (rather than rewritten in place) with a copy (rather than
+        # a link)
+        self.assertEqual(stager.num_copied, 1)
+        self.assertEqual(self._Read(dest_filename), "updated")
+        self.assertFalse(os.path.samefile(source_filename, dest_filename))
+        self.assertEqual(self._Read(alias_filename), "one")
+
+    # ----------------------------------------------------------------------
+    def test_PreserveFilesNotStaged(self):
+        self._Write(os.path.join("root", "a", "one.gcda"), "one")
+        self._Write(os.path.join("root", "a", "two.gcda"), "two")
+
+        existing_filename = self._Write(os.path.join("root", "one.gcda"), "existing")
+        self._Write(os.path.join("root", "two.gcda"), "two")
+
+        num_staged, num_skipped, collisions = self._GatherFiles(ArtifactStager())
+
+        self.assertEqual((num_staged, num_skipped), (0, 2))
+        self.assertEqual(
+            collisions,
+            [(existing_filename, [existing_filename, os.path.join(self._root, "a", "one.gcda")])],
+        )
+
+        self.assertEqual(self._Read(existing_filename), "existing")
+
+    # ----------------------------------------------------------------------
+    def test_Collisions(self):
+        self._Write(os.path.join("root", "a", "one.gcda"), "a")
+        self._Write(os.path.join("root", "b", "one.gcda"), "b")
+        self._Write(os.path.join("root", "c", "one.gcda"), "a")
+        self._Write(os.path.join("root", "a", "two.gcda"), "two")
+        self._Write(os.path.join("root", "b", "two.gcda"), "two")
+
+        expected_collision = (
+            os.path.join(self._root, "one.gcda"),
+            [os.path.join(self._root, name, "one.gcda") for name in ["a", "b", "c"]],
+        )
+
+        # Files with the same content aren't collisions; the file whose path sorts first is staged
+        self.assertEqual(self._GatherFiles(ArtifactStager()), (2, 0, [expected_collision]))
+        self.assertEqual(self._Read(os.path.join(self._root, "one.gcda")), "a")
+
+        # The collision is only reported once
+        self.assertEqual(self._GatherFiles(ArtifactStager()), (0, 2, []))
+        self.assertEqual(self._GatherFiles(ArtifactStager()), (0, 2, []))
+
+        # The collision is reported again if it is resolved and then reappears
+        self._Write(os.path.join("root", "b", "one.gcda"), "a")
+        self.assertEqual(self._GatherFiles(ArtifactStager()), (0, 2, []))
+
+        self._Write(os.path.join("root", "b", "one.gcda"), "b")
+        self.assertEqual(self._GatherFiles(ArtifactStager()), (0, 2, [expected_collision]))
+
+    # ----------------------------------------------------------------------
+    def test_RecreatedRoot(self):
+        self._Write(os.path.join("root", "a", "one.gcda"), "one")
+
+        self.assertEqual(self._GatherFiles(ArtifactStager()), (1, 0, []))
+
+        # Files in a recreated root weren't staged, even if they have the same names (the
+        # original root is removed after the new one is created so that it has a different inode)
+        os.rename(self._root, os.path.join(self._temp_directory, "original_root"))
+
+        self._Write(os.path.join("root", "a", "one.gcda"), "one")
+        existing_filename = self._Write(os.path.join("root", "one.gcda"), "existing")
+
+        shutil.rmtree(os.path.join(self._temp_directory, "original_root"))
+
+        num_staged, num_skipped, collisions = self._GatherFiles(ArtifactStager())
+
+        self.assertEqual((num_staged, num_skipped, len(collisions)), (0, 1, 1))
+        self.assertEqual(self._Read(existing_filename), "existing")
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _GatherFiles(self, stager):
+        return GatherFiles(self._root, ".gcda", stager, record_dir=self._record_dir)
+
+    # ----------------------------------------------------------------------
+    def _Write(self, name, content):
+        filename = os.path.join(self._temp_directory, name)
+
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+
+        # Replace the file rather than writing to it, as it may be linked
+        if os.path.exists(filename):
+            os.remove(filename)
+
+        with open(filename, "w") as f:
+            f.write(content)
+
+        return filename
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _Read(filename):
+        with open(filename) as f:
+            return f.read()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,231 @@
+# ----------------------------------------------------------------------
+# |
+# |  AsyncProcess_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-06 13:40:26
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for AsyncProcess.py"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import threading
+import unittest
+
+from unittest import mock
+
+import CommonEnvironment
+
+from CppClangCommon import AsyncProcess
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+        self._running_dir = os.path.join(self._temp_directory, "running")
+        self._started_dir = os.path.join(self._temp_directory, "started")
+
+        os.makedirs(self._running_dir)
+        os.makedirs(self._started_dir)
+
+        # The script writes the number of processes running when it started and exits with the
+        # provided exit code
+        self._script_filename = os.path.join(self._temp_directory, "script.py")
+
+        with open(self._script_filename, "w") as f:
+            f.write(
+                textwrap.dedent(
+                    """\
+                    import os
+                    import sys
+                    import time
+
+                    running_dir, started_dir, name, exit_code, delay = sys.argv[1:]
+
+                    open(os.path.join(started_dir, name), "w").close()
+
+                    marker_filename = os.path.join(running_dir, name)
+                    open(marker_filename, "w").close()
+
+                    sys.stdout.write("{} {}\\n".format(name, len(os.listdir(running_dir))))
+                    sys.stdout.flush()
+
+                    time.sleep(float(delay))
+
+                    os.remove(marker_filename)
+
+                    sys.exit(int(exit_code))
+                    """,
+                ),
+            )
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_Empty(self):
+        self.assertEqual(AsyncProcess.Execute([]), [])
+
+    # ----------------------------------------------------------------------
+    def test_Results(self):
+        results = AsyncProcess.Execute(
+            [
+                self._CreateCommandLine("a", 0, 0.3),
+                self._CreateCommandLine("b", 3),
+                'echo "Invalid é" && exit 2',
+            ],
+        )
+
+        # The results are in the same order as the command lines, regardless of when the
+        # processes complete
+        self.assertEqual([result.result for result in results], [0, 3, 2])
+        self.assertEqual([result.output.split()[0] for result in results], ["a", "b", "Invalid"])
+        self.assertIn("é", results[2].output)
+        self.assertEqual([result.value for result in results], [None, None, None])
+
+    # ----------------------------------------------------------------------
+    def test_MaxConcurrency(self):
+        results = AsyncProcess.Execute(
+            [self._CreateCommandLine(str(index), 0, 0.5) for index in range(6)],
+            max_concurrency=2,
+        )
+
+        num_running = [int(result.output.split()[1]) for result in results]
+
+        self.assertEqual(max(num_running), 2)
+
+    # ----------------------------------------------------------------------
+    def test_MaxConcurrencyEnvironmentVar(self):
+        self.assertEqual(AsyncProcess.GetMaxConcurrency(3), 3)
+
+        with mock.patch.dict(os.environ, {AsyncProcess.MAX_PROCESSES_ENVIRONMENT_VAR: "5"}):
+            self.assertEqual(AsyncProcess.GetMaxConcurrency(), 5)
+            self.assertEqual(AsyncProcess.GetMaxConcurrency(3), 3)
+
+        with mock.patch.dict(os.environ, {AsyncProcess.MAX_PROCESSES_ENVIRONMENT_VAR: "0"}):
+            self.assertEqual(AsyncProcess.GetMaxConcurrency(), 1)
+
+        with mock.patch.dict(os.environ, {AsyncProcess.MAX_PROCESSES_ENVIRONMENT_VAR: "invalid"}):
+            self.assertGreaterEqual(AsyncProcess.GetMaxConcurrency(), 1)
+
+    # ----------------------------------------------------------------------
+    def test_OnComplete(self):
+        calls = []
+        calls_lock = threading.Lock()
+
+        # ----------------------------------------------------------------------
+        def OnComplete(index, result, output):
+            # Other processes continue to run while the output is processed
+            with calls_lock:
+                calls.append((index, result, output.split()[0], len(os.listdir(self._running_dir))))
+
+            return index * 10
+
+        # ----------------------------------------------------------------------
+
+        results = AsyncProcess.Execute(
+            [
+                self._CreateCommandLine("a", 0, 0.1),
+                self._CreateCommandLine("b", 1, 1.0),
+            ],
+            on_complete=OnComplete,
+            max_concurrency=2,
+        )
+
+        self.assertEqual([result.value for result in results], [0, 10])
+
+        self.assertEqual(calls, [(0, 0, "a", 1), (1, 1, "b", 0)])
+
+    # ----------------------------------------------------------------------
+    def test_OnCompleteException(self):
+        completed = []
+        completed_lock = threading.Lock()
+
+        # ----------------------------------------------------------------------
+        def OnComplete(index, result, output):
+            if index == 0:
+                raise Exception("Failure in {}".format(index))
+
+            with completed_lock:
+                completed.append(index)
+
+        # ----------------------------------------------------------------------
+
+        with self.assertRaisesRegex(Exception, "Failure in 0"):
+            AsyncProcess.Execute(
+                [
+                    self._CreateCommandLine("a", 0),
+                    self._CreateCommandLine("b", 0, 0.5),
+                ],
+                on_complete=OnComplete,
+                max_concurrency=2,
+            )
+
+        # The exception is raised after the other jobs have finished
+        self.assertEqual(completed, [1])
+        self.assertEqual(os.listdir(self._running_dir), [])
+
+    # ----------------------------------------------------------------------
+    def test_NoProcessesStartedAfterFailure(self):
+        # ----------------------------------------------------------------------
+        def OnComplete(index, result, output):
+            raise Exception("Failure in {}".format(index))
+
+        # ----------------------------------------------------------------------
+
+        with self.assertRaisesRegex(Exception, "Failure in 0"):
+            AsyncProcess.Execute(
+                [self._CreateCommandLine(str(index), 0) for index in range(4)],
+                on_complete=OnComplete,
+                max_concurrency=1,
+            )
+
+        # The second process may have started before the callback for the first one raised
+        self.assertIn(sorted(os.listdir(self._started_dir)), [["0"], ["0", "1"]])
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _CreateCommandLine(self, name, exit_code, delay=0):
+        return '"{}" "{}" "{}" "{}" {} {} {}'.format(
+            sys.executable,
+            self._script_filename,
+            self._running_dir,
+            self._started_dir,
+            name,
+            exit_code,
+            delay,
+        )
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,283 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageDiff_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-03 11:48:05
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for CoverageDiff.py"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon import CoverageDiff
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_LoadLcov(self):
+        results = CoverageDiff.Load(
+            self._Write(
+                "coverage.info",
+                """\
+                SF:/a.cpp
+                FN:1,Func
+                FNDA:2,Func
+                DA:1,2
+                DA:2,0
+                end_of_record
+                """,
+            ),
+        )
+
+        self.assertEqual(list(results), ["/a.cpp"])
+        self.assertEqual(self._GetLines(results["/a.cpp"]), {1: 2, 2: 0})
+        self.assertEqual(results["/a.cpp"].function_hits, {"Func": 2})
+        self.assertEqual(results["/a.cpp"].GetLineCoverage(), (1, 2))
+
+    # ----------------------------------------------------------------------
+    def test_LoadLcovWithAndWithoutTestName(self):
+        # Records for the same file are combined, regardless of their test names
+        results = CoverageDiff.Load(
+            self._Write(
+                "coverage.info",
+                """\
+                SF:/a.cpp
+                DA:1,1
+                DA:2,0
+                end_of_record
+                TN:test
+                SF:/a.cpp
+                DA:2,3
+                DA:3,1.0
+                end_of_record
+                TN:test
+                SF:/b.cpp
+                DA:4,0
+                end_of_record
+                """,
+            ),
+        )
+
+        self.assertEqual(sorted(results), ["/a.cpp", "/b.cpp"])
+        self.assertEqual(self._GetLines(results["/a.cpp"]), {1: 1, 2: 3, 3: 1})
+        self.assertEqual(self._GetLines(results["/b.cpp"]), {4: 0})
+
+    # ----------------------------------------------------------------------
+    def test_LoadLcovLineFormats(self):
+        # Contiguous "DA:" lines are parsed in bulk; other formats are parsed line by line
+        results = CoverageDiff.Load(
+            self._Write(
+                "coverage.info",
+                """\
+                SF:/contiguous.cpp
+                DA:1,2
+                DA:3,0
+                DA:2,4
+                LF:3
+                end_of_record
+                SF:/interleaved.cpp
+                DA:1,1
+                BRDA:1,0,0,1
+                DA:2,0
+                end_of_record
+                SF:/checksums.cpp
+                DA:1,1,abcdef
+                DA:2,0,012345
+                end_of_record
+                SF:/floats.cpp
+                DA:1,1.0
+                DA:2,2.5e1
+                end_of_record
+                SF:/duplicates.cpp
+                DA:1,1
+                DA:1,2
+                DA:2,0
+                end_of_record
+                SF:/leading_zeros.cpp
+                DA:01,1
+                DA:2,00
+                end_of_record
+                SF:/no_lines.cpp
+                FNDA:1,Func
+                end_of_record
+                """,
+            ),
+        )
+
+        self.assertEqual(self._GetLines(results["/contiguous.cpp"]), {1: 2, 2: 4, 3: 0})
+        self.assertEqual(self._GetLines(results["/interleaved.cpp"]), {1: 1, 2: 0})
+        self.assertEqual(self._GetLines(results["/checksums.cpp"]), {1: 1, 2: 0})
+        self.assertEqual(self._GetLines(results["/floats.cpp"]), {1: 1, 2: 25})
+        self.assertEqual(self._GetLines(results["/duplicates.cpp"]), {1: 3, 2: 0})
+        self.assertEqual(self._GetLines(results["/leading_zeros.cpp"]), {1: 1, 2: 0})
+        self.assertEqual(self._GetLines(results["/no_lines.cpp"]), {})
+
+    # ----------------------------------------------------------------------
+    def test_LoadLcovCrLf(self):
+        filename = os.path.join(self._temp_directory, "coverage.info")
+
+        with open(filename, "wb") as f:
+            f.write(b"SF:/a.cpp\r\nDA:1,1\r\nDA:2,0\r\nend_of_record\r\n")
+
+        self.assertEqual(self._GetLines(CoverageDiff.Load(filename)["/a.cpp"]), {1: 1, 2: 0})
+
+    # ----------------------------------------------------------------------
+    def test_LoadAde(self):
+        results = CoverageDiff.Load(
+            self._Write(
+                "coverage.ade",
+                """\
+                {"file":{"name":"a.cpp"},"language":"c/c++","method":{"covered":[3,4],"name":"_Z3Addii","total_covered":2,"total_uncovered":0,"uncovered":[]}}
+                {"file":{"name":"a.cpp"},"language":"c/c++","method":{"covered":[],"name":"_Z6Unusedi","total_covered":0,"total_uncovered":2,"uncovered":[7,8]}}
+                {"file":{"covered":[3,4],"name":"a.cpp","total_covered":2,"total_uncovered":3,"uncovered":[7,8,9]},"is_file":true,"language":"c/c++","method":{"covered":[],"total_covered":0,"total_uncovered":0,"uncovered":[]}}
+                """,
+            ),
+        )
+
+        self.assertEqual(list(results), ["a.cpp"])
+        self.assertEqual(self._GetLines(results["a.cpp"]), {3: 1, 4: 1, 7: 0, 8: 0, 9: 0})
+        self.assertEqual(results["a.cpp"].function_hits, {"_Z3Addii": 2, "_Z6Unusedi": 0})
+
+    # ----------------------------------------------------------------------
+    def test_LoadEmpty(self):
+        self.assertEqual(CoverageDiff.Load(self._Write("empty.info", "\n\n")), {})
+
+    # ----------------------------------------------------------------------
+    def test_CompareAddedAndRemovedFiles(self):
+        before = self._Create(
+            {
+                "/removed.cpp": ({1: 1, 2: 0}, {"Removed": 1}),
+                "/same.cpp": ({1: 1}, {}),
+            },
+        )
+
+        after = self._Create(
+            {
+                "/added.cpp": ({1: 0, 2: 4}, {"Added": 4}),
+                "/same.cpp": ({1: 1}, {}),
+            },
+        )
+
+        self.assertEqual(
+            CoverageDiff.Compare(before, after),
+            [
+                CoverageDiff.FileDelta("/added.cpp", None, (1, 2), [2], [], ["Added"], []),
+                CoverageDiff.FileDelta("/removed.cpp", (1, 2), None, [], [1], [], ["Removed"]),
+            ],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_CompareChangedFile(self):
+        before = self._Create({"/a.cpp": ({1: 1, 2: 0, 3: 1}, {"Func": 0})})
+        after = self._Create({"/a.cpp": ({1: 1, 2: 5, 3: 0, 4: 0}, {"Func": 1})})
+
+        self.assertEqual(
+            CoverageDiff.Compare(before, after),
+            [CoverageDiff.FileDelta("/a.cpp", (2, 3), (2, 4), [2], [3], ["Func"], [])],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_CompareUninstrumentedFile(self):
+        # A file that is present in both indexes without any lines has the same coverage
+        before = self._Create({"/a.cpp": ({}, {})})
+        after = self._Create({"/a.cpp": ({}, {})})
+
+        self.assertEqual(CoverageDiff.Compare(before, after), [])
+
+    # ----------------------------------------------------------------------
+    def test_CompareSameFile(self):
+        before = self._Create({"/a.cpp": ({1: 1, 2: 0}, {"Func": 1})})
+        after = self._Create({"/a.cpp": ({1: 1, 2: 0}, {"Func": 1})})
+
+        self.assertEqual(CoverageDiff.Compare(before, after), [])
+
+        # The number of hits doesn't matter, only whether a line was hit
+        after = self._Create({"/a.cpp": ({1: 3, 2: 0}, {"Func": 2})})
+
+        self.assertEqual(CoverageDiff.Compare(before, after), [])
+
+    # ----------------------------------------------------------------------
+    def test_CreateRanges(self):
+        self.assertEqual(CoverageDiff.CreateRanges([]), "")
+        self.assertEqual(CoverageDiff.CreateRanges([5]), "5")
+        self.assertEqual(CoverageDiff.CreateRanges([1, 2, 3, 7, 9, 10]), "1-3, 7, 9-10")
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Write(self, name, content):
+        filename = os.path.join(self._temp_directory, name)
+
+        with open(filename, "w") as f:
+            f.write(textwrap.dedent(content))
+
+        return filename
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _Create(values):
+        results = {}
+
+        for filename, (lines, functions) in values.items():
+            file_info = CoverageDiff.FileInfo()
+
+            for line, hits in lines.items():
+                file_info.AddLine(line, hits)
+
+            for name, hits in functions.items():
+                file_info.AddFunction(name, hits)
+
+            results[filename] = file_info
+
+        return results
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _GetLines(file_info):
+        return {
+            line: hits
+            for line, hits in enumerate(file_info.line_hits)
+            if hits != CoverageDiff.NOT_INSTRUMENTED
+        }
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,109 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageIndex_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-04 08:41:12
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Unit test for CoverageIndex.py
+
+The fixtures in `Fixtures/Gcc/MultipleBinaries` were created by compiling `src/A.cpp` and
+`src/B.cpp` (each of which defines `main` and a static `Helper` function) into binaries in
+the `A` and `B` directories with `g++ -O0 --coverage` (GCC 12) and running each binary once.
+`lcov.info` and `lcov.ade` were generated by `grcov A B` (with `-t lcov` and `-t ade`), and
+`A/lcov.ade` and `B/lcov.ade` by invoking grcov for each directory.
+"""
+
+import os
+import sys
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon import AdeParser
+from CppClangCommon.CoverageIndex import CoverageIndex
+from CppClangCommon.MethodFilter import MethodFilter
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_FromLcov(self):
+        coverage_index = CoverageIndex.FromLcov(
+            self._GetFixture("lcov.info"),
+            [self._GetFixture("A"), self._GetFixture("B")],
+        )
+
+        self._Verify(coverage_index)
+
+    # ----------------------------------------------------------------------
+    def test_FromAde(self):
+        coverage_index = CoverageIndex.FromMethods(
+            AdeParser.AggregateByFileAndMethod(self._GetFixture("lcov.ade")),
+            [self._GetFixture("A"), self._GetFixture("B")],
+        )
+
+        self._Verify(coverage_index)
+
+    # ----------------------------------------------------------------------
+    def test_Filter(self):
+        coverage_index = CoverageIndex.FromLcov(
+            self._GetFixture("lcov.info"),
+            [self._GetFixture("A"), self._GetFixture("B")],
+        )
+
+        # Each binary only reports its own `main`
+        self.assertEqual(coverage_index.Query(self._GetFixture("A", "A.gcno"), MethodFilter(["main"], None)), (4, 0))
+        self.assertEqual(coverage_index.Query(self._GetFixture("B", "B.gcno"), MethodFilter(["main"], None)), (3, 1))
+
+        self.assertEqual(coverage_index.Query(self._GetFixture("A", "A.gcno"), MethodFilter(None, ["main"])), (5, 1))
+
+    # ----------------------------------------------------------------------
+    def test_Contains(self):
+        coverage_index = CoverageIndex.FromLcov(self._GetFixture("lcov.info"), [self._GetFixture("A")])
+
+        self.assertIn(self._GetFixture("A", "A.gcno"), coverage_index)
+        self.assertNotIn(self._GetFixture("B", "B.gcno"), coverage_index)
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Verify(self, coverage_index):
+        # The results for each binary should match those generated by invoking grcov for that binary alone
+        for name in ["A", "B"]:
+            self.assertEqual(
+                coverage_index.Query(self._GetFixture(name, "{}.gcno".format(name)), MethodFilter(None, None)),
+                AdeParser.Aggregate(self._GetFixture(name, "lcov.ade")),
+            )
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _GetFixture(*parts):
+        return os.path.join(_script_dir, "Fixtures", "Gcc", "MultipleBinaries", *parts)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
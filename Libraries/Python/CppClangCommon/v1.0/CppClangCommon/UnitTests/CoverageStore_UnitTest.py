@@ -0,0 +1,196 @@
+# ----------------------------------------------------------------------
+# |
+# |  CoverageStore_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-03 12:14:36
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for CoverageStore.py"""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon import CoverageDiff
+from CppClangCommon import CoverageStore
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_RoundTrip(self):
+        files = {
+            "/src/b.cpp": self._CreateFileInfo({1: 3, 2: 0, 5: 1}, {"_Z3Barv": 3, "_Z3Bazv": 0}),
+            "/src/a.cpp": self._CreateFileInfo({10: 0}, {}),
+            "/src/\u00e9t\u00e9.cpp": self._CreateFileInfo({2: 7}, {"main": 1}),
+        }
+
+        filename = os.path.join(self._temp_directory, "Nested", "coverage.store")
+
+        CoverageStore.Write(filename, files)
+
+        self.assertTrue(CoverageStore.IsStoreFile(filename))
+        self.assertFalse(os.path.exists("{}.tmp".format(filename)))
+
+        with CoverageStore.CoverageStore(filename) as store:
+            self.assertEqual(len(store), 3)
+            self.assertEqual(list(store), sorted(files))
+
+            for source_filename, file_info in files.items():
+                self.assertIn(source_filename, store)
+
+                stored = store[source_filename]
+
+                self.assertEqual(stored.filename, source_filename)
+                self.assertEqual(list(stored.line_hits), list(file_info.line_hits))
+                self.assertEqual(stored.function_hits, file_info.function_hits)
+                self.assertEqual(stored.GetLineCoverage(), file_info.GetLineCoverage())
+
+                del stored
+
+            self.assertNotIn("/src/c.cpp", store)
+            self.assertIsNone(store.get("/src/c.cpp"))
+
+            with self.assertRaises(KeyError):
+                store["/src/c.cpp"]
+
+    # ----------------------------------------------------------------------
+    def test_Empty(self):
+        filename = os.path.join(self._temp_directory, "coverage.store")
+
+        CoverageStore.Write(filename, {})
+
+        with CoverageStore.CoverageStore(filename) as store:
+            self.assertEqual(len(store), 0)
+            self.assertEqual(list(store), [])
+            self.assertNotIn("/src/a.cpp", store)
+
+    # ----------------------------------------------------------------------
+    def test_Overwrite(self):
+        filename = os.path.join(self._temp_directory, "coverage.store")
+
+        CoverageStore.Write(filename, {"/src/a.cpp": self._CreateFileInfo({1: 1}, {})})
+        CoverageStore.Write(filename, {"/src/b.cpp": self._CreateFileInfo({1: 0}, {})})
+
+        with CoverageStore.CoverageStore(filename) as store:
+            self.assertEqual(list(store), ["/src/b.cpp"])
+
+    # ----------------------------------------------------------------------
+    def test_InvalidFiles(self):
+        lcov_filename = self._WriteBytes("coverage.info", b"SF:/a.cpp\nDA:1,1\nend_of_record\n")
+
+        self.assertFalse(CoverageStore.IsStoreFile(lcov_filename))
+
+        with self.assertRaises(Exception):
+            CoverageStore.CoverageStore(lcov_filename)
+
+        with self.assertRaises(Exception):
+            CoverageStore.CoverageStore(self._WriteBytes("short.store", CoverageStore.MAGIC))
+
+        filename = os.path.join(self._temp_directory, "coverage.store")
+
+        CoverageStore.Write(filename, {})
+
+        with open(filename, "r+b") as f:
+            f.seek(len(CoverageStore.MAGIC))
+            f.write(struct.pack("<I", CoverageStore.VERSION + 1))
+
+        with self.assertRaises(Exception):
+            CoverageStore.CoverageStore(filename)
+
+    # ----------------------------------------------------------------------
+    def test_Diff(self):
+        # A store created from an LCOV file compares as equal to that file
+        lcov_filename = self._WriteBytes(
+            "coverage.info",
+            textwrap.dedent(
+                """\
+                SF:/src/a.cpp
+                FNDA:1,Func
+                DA:1,1
+                DA:2,0
+                end_of_record
+                """,
+            ).encode("utf-8"),
+        )
+
+        store_filename = os.path.join(self._temp_directory, "coverage.store")
+
+        CoverageStore.Write(store_filename, CoverageDiff.Load(lcov_filename))
+
+        store = CoverageDiff.Load(store_filename)
+
+        try:
+            self.assertIsInstance(store, CoverageStore.CoverageStore)
+
+            self.assertEqual(CoverageDiff.Compare(CoverageDiff.Load(lcov_filename), store), [])
+            self.assertEqual(
+                CoverageDiff.Compare({}, store),
+                [CoverageDiff.FileDelta("/src/a.cpp", None, (1, 2), [1], [], ["Func"], [])],
+            )
+        finally:
+            store.Close()
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _WriteBytes(self, name, content):
+        filename = os.path.join(self._temp_directory, name)
+
+        with open(filename, "wb") as f:
+            f.write(content)
+
+        return filename
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _CreateFileInfo(lines, functions):
+        file_info = CoverageDiff.FileInfo()
+
+        for line, hits in lines.items():
+            file_info.AddLine(line, hits)
+
+        for name, hits in functions.items():
+            file_info.AddFunction(name, hits)
+
+        return file_info
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
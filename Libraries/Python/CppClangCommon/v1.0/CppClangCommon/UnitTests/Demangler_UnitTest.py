@@ -0,0 +1,172 @@
+# ----------------------------------------------------------------------
+# |
+# |  Demangler_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-05 10:31:08
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for Demangler.py"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon.Demangler import Demangler
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+        self._cache_filename = os.path.join(self._temp_directory, "names.txt")
+
+        demangler = Demangler.Create(self._cache_filename)
+        if demangler is None:
+            shutil.rmtree(self._temp_directory)
+            self.skipTest("A demangling tool isn't available")
+
+        demangler.Close()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_Demangle(self):
+        demangler = Demangler.Create(self._cache_filename)
+
+        try:
+            self.assertEqual(
+                demangler.Demangle(["_ZN2ns3Foo6MethodEc", "main", "_ZN2ns3Foo6MethodEc"]),
+                {"_ZN2ns3Foo6MethodEc": "ns::Foo::Method(char)", "main": "main"},
+            )
+        finally:
+            demangler.Close()
+
+        self.assertEqual(
+            sorted(self._ReadCacheFile()),
+            ["_ZN2ns3Foo6MethodEc\tns::Foo::Method(char)", "main\tmain"],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_Cache(self):
+        with open(self._cache_filename, "w") as f:
+            f.write("_Z3Foov\tCached\n")
+
+        demangler = Demangler.Create(self._cache_filename)
+
+        try:
+            self.assertEqual(demangler.Demangle(["_Z3Foov"]), {"_Z3Foov": "Cached"})
+
+            # The process isn't started when all of the names are cached
+            self.assertIsNone(demangler._process)
+
+            self.assertEqual(demangler.Demangle(["_Z3Barv"]), {"_Z3Barv": "Bar()"})
+        finally:
+            demangler.Close()
+
+        self.assertEqual(self._ReadCacheFile(), ["_Z3Foov\tCached", "_Z3Barv\tBar()"])
+
+    # ----------------------------------------------------------------------
+    def test_Compact(self):
+        # Duplicate names (added by concurrent processes) and the oldest names are removed
+        with open(self._cache_filename, "w") as f:
+            f.write("_Z3Foov\tOld\n" * 10)
+            f.write("_Z4Old0v\tOld0()\n_Z4Old1v\tOld1()\n_Z3Foov\tFoo()\n")
+
+        demangler = Demangler.Create(self._cache_filename)
+
+        try:
+            demangler.MAX_CACHE_FILE_SIZE = 2 * len("_Z4Old1v\tOld1()\n_Z3Foov\tFoo()\n_Z3Barv\tBar()\n")
+
+            self.assertEqual(demangler.Demangle(["_Z3Barv"]), {"_Z3Barv": "Bar()"})
+        finally:
+            demangler.Close()
+
+        self.assertEqual(
+            self._ReadCacheFile(),
+            ["_Z4Old1v\tOld1()", "_Z3Foov\tFoo()", "_Z3Barv\tBar()"],
+        )
+
+        self.assertEqual(sorted(os.listdir(self._temp_directory)), ["names.txt", "names.txt.lock"])
+
+    # ----------------------------------------------------------------------
+    def test_ConcurrentProcesses(self):
+        names_per_process = ["_Z{}Name{}v".format(len(str(index)) + 4, index) for index in range(200)]
+
+        processes = [
+            multiprocessing.Process(
+                target=_Demangle,
+                args=(self._cache_filename, names_per_process[process_index::4]),
+            )
+            for process_index in range(4)
+        ]
+
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        lines = self._ReadCacheFile()
+
+        self.assertEqual(len(lines), len(names_per_process))
+        self.assertEqual(
+            sorted(lines),
+            sorted("{}\tName{}()".format(name, index) for index, name in enumerate(names_per_process)),
+        )
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _ReadCacheFile(self):
+        with open(self._cache_filename, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+def _Demangle(cache_filename, names):
+    demangler = Demangler.Create(cache_filename)
+
+    try:
+        # Demangle the names individually so that the processes write to the cache file at the
+        # same time.
+        for name in names:
+            demangler.Demangle([name])
+    finally:
+        demangler.Close()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,159 @@
+# ----------------------------------------------------------------------
+# |
+# |  DirectoryIndex_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-06 08:24:51
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for DirectoryIndex.py"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon.DirectoryIndex import DirectoryIndex
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_LookupPriority(self):
+        self._Create("Foo.gcno", "Foo.cpp.gcno", "Foo.c.gcno", "FooBar.gcno", "Fo.gcno")
+
+        directory_index = DirectoryIndex()
+
+        # Exact match
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("Foo.gcno"))
+
+        # The binary's extension isn't part of its name
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo.exe"), ".gcno"), self._GetFilename("Foo.gcno"))
+
+        os.remove(self._GetFilename("Foo.gcno"))
+        directory_index = DirectoryIndex()
+
+        # A match with an additional extension; shorter names are preferred
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("Foo.c.gcno"))
+
+        os.remove(self._GetFilename("Foo.c.gcno"))
+        os.remove(self._GetFilename("Foo.cpp.gcno"))
+        directory_index = DirectoryIndex()
+
+        # Any other match
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("FooBar.gcno"))
+
+    # ----------------------------------------------------------------------
+    def test_LookupTies(self):
+        self._Create("Foo.b.gcno", "Foo.a.gcno", "FooB.gcno", "FooA.gcno", "FooAA.gcno")
+
+        directory_index = DirectoryIndex()
+
+        # Ties are broken alphabetically
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("Foo.a.gcno"))
+
+        for name in ["Foo.a.gcno", "Foo.b.gcno"]:
+            os.remove(self._GetFilename(name))
+
+        directory_index = DirectoryIndex()
+
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("FooA.gcno"))
+
+    # ----------------------------------------------------------------------
+    def test_LookupNoMatch(self):
+        self._Create("Bar.gcno", "Fo.gcno", "foo.gcno", "Foo.gcda", "Foo.txt")
+
+        directory_index = DirectoryIndex()
+
+        self.assertIsNone(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"))
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcda"), self._GetFilename("Foo.gcda"))
+
+        self.assertIsNone(directory_index.Lookup(self._GetFilename("DoesNotExist", "Foo"), ".gcno"))
+
+    # ----------------------------------------------------------------------
+    def test_GetFilenames(self):
+        self._Create("B.gcno", "A.gcno", "A.gcda", "A.txt")
+        os.makedirs(self._GetFilename("Dir.gcno"))
+
+        directory_index = DirectoryIndex()
+
+        self.assertEqual(
+            directory_index.GetFilenames(self._temp_directory, ".gcno"),
+            [self._GetFilename("A.gcno"), self._GetFilename("B.gcno")],
+        )
+
+        self.assertEqual(directory_index.GetFilenames(self._temp_directory, ".gcda"), [self._GetFilename("A.gcda")])
+        self.assertEqual(directory_index.GetFilenames(self._GetFilename("DoesNotExist"), ".gcno"), [])
+
+    # ----------------------------------------------------------------------
+    def test_Invalidation(self):
+        self._Create("Foo.cpp.gcno")
+
+        original_mtime = os.stat(self._temp_directory).st_mtime_ns
+
+        directory_index = DirectoryIndex()
+
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("Foo.cpp.gcno"))
+
+        # The directory isn't scanned again while its modification time is the same
+        self._Create("Foo.gcno")
+        os.utime(self._temp_directory, ns=(original_mtime, original_mtime))
+
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("Foo.cpp.gcno"))
+
+        # ...and is scanned again when it changes
+        os.utime(self._temp_directory, ns=(original_mtime + 1000000000, original_mtime + 1000000000))
+
+        self.assertEqual(directory_index.Lookup(self._GetFilename("Foo"), ".gcno"), self._GetFilename("Foo.gcno"))
+        self.assertEqual(
+            directory_index.GetFilenames(self._temp_directory, ".gcno"),
+            [self._GetFilename("Foo.gcno"), self._GetFilename("Foo.cpp.gcno")],
+        )
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Create(self, *names):
+        for name in names:
+            with open(self._GetFilename(name), "w") as f:
+                f.write(name)
+
+    # ----------------------------------------------------------------------
+    def _GetFilename(self, *parts):
+        return os.path.join(self._temp_directory, *parts)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
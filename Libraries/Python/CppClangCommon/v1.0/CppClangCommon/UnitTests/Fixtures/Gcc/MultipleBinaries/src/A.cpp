@@ -0,0 +1,13 @@
+#include "Common.h"
+
+static int Helper(int v) {
+    if(v > 10)
+        return 1;
+    return 0;
+}
+
+int main() {
+    int r = Twice(3);
+    r += Helper(r);
+    return r == 6 ? 0 : 1;
+}
@@ -0,0 +1,18 @@
+#include "Common.h"
+
+static int Helper(int v) {
+    return v + 1;
+}
+
+static int Unused(int v) {
+    for(int i = 0; i < v; ++i)
+        v += i;
+    return v;
+}
+
+int main(int argc, char **) {
+    if(argc > 5)
+        return Unused(argc);
+
+    return Helper(Twice(0));
+}
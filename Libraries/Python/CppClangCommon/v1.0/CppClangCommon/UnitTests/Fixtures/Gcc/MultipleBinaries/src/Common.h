@@ -0,0 +1,3 @@
+inline int Twice(int v) {
+    return v * 2;
+}
@@ -0,0 +1,31 @@
+#include <cstdio>
+
+int Add(int a, int b) {
+    return a + b;
+}
+
+int Classify(int value) {
+    if(value < 0)
+        return -1;
+
+    if(value == 0)
+        return 0;
+
+    return 1;
+}
+
+int Unused(int value) {
+    int result = 0;
+
+    for(int i = 0; i < value; ++i)
+        result += i;
+
+    return result;
+}
+
+int main() {
+    std::printf("%d\n", Add(1, 2));
+    std::printf("%d\n", Classify(5));
+    std::printf("%d\n", Classify(-5));
+    return 0;
+}
@@ -0,0 +1,112 @@
+# ----------------------------------------------------------------------
+# |
+# |  GcovData_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-03 11:02:17
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Unit test for GcovData.py
+
+The fixtures in `Fixtures/Gcc` were created by compiling `Sample.cpp` with
+`g++ -O0 --coverage` (GCC 12), running the binary once, and then running
+`grcov <dir> -t ade` to generate `Sample.ade`.
+"""
+
+import json
+import os
+import sys
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon import GcovData
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_ReadNoteFunctionNames(self):
+        self.assertEqual(
+            sorted(GcovData.ReadNoteFunctionNames(self._GetFixture("Gcc", "Sample.gcno"))),
+            ["_Z3Addii", "_Z6Unusedi", "_Z8Classifyi", "main"],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_ComputeFunctionCoverageGcc(self):
+        self.assertEqual(
+            GcovData.ComputeFunctionCoverage(
+                self._GetFixture("Gcc", "Sample.gcno"),
+                self._GetFixture("Gcc", "Sample.gcda"),
+            ),
+            self._ReadAde(self._GetFixture("Gcc", "Sample.ade")),
+        )
+
+    # ----------------------------------------------------------------------
+    def test_ComputeFunctionCoverageWithoutData(self):
+        expected = {
+            name: (0, covered + uncovered)
+            for name, (covered, uncovered) in self._ReadAde(self._GetFixture("Gcc", "Sample.ade")).items()
+        }
+
+        self.assertEqual(
+            GcovData.ComputeFunctionCoverage(
+                self._GetFixture("Gcc", "Sample.gcno"),
+                self._GetFixture("Gcc", "DoesNotExist.gcda"),
+            ),
+            expected,
+        )
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _GetFixture(*parts):
+        return os.path.join(_script_dir, "Fixtures", *parts)
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _ReadAde(filename):
+        results = {}
+
+        with open(filename) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+
+                data = json.loads(line)
+                if data.get("is_file", False):
+                    continue
+
+                method = data["method"]
+
+                results[method["name"]] = (method["total_covered"], method["total_uncovered"])
+
+        return results
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
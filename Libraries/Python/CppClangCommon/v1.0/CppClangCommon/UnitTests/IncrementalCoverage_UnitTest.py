@@ -0,0 +1,268 @@
+# ----------------------------------------------------------------------
+# |
+# |  IncrementalCoverage_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-06 10:05:33
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Unit test for IncrementalCoverage.py
+
+grcov is replaced by a script that generates an LCOV record for each .gcno file that it
+finds; a line is covered when there is a corresponding .gcda file, and the process fails when
+the .gcda file contains "fail".
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from unittest import mock
+
+import CommonEnvironment
+
+from CppClangCommon import CoverageDiff
+from CppClangCommon import CoverageTools
+from CppClangCommon import IncrementalCoverage
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+        self._bin_dir = os.path.join(self._temp_directory, "bin")
+        self._output_dir = os.path.join(self._temp_directory, "output")
+
+        os.makedirs(self._bin_dir)
+        os.makedirs(self._output_dir)
+
+        self._script_filename = os.path.join(self._temp_directory, "grcov.py")
+
+        with open(self._script_filename, "w") as f:
+            f.write(
+                textwrap.dedent(
+                    """\
+                    import os
+                    import sys
+
+                    input_dir, output_filename = sys.argv[1:]
+
+                    with open(output_filename, "w") as f:
+                        for item in sorted(os.listdir(input_dir)):
+                            stem, ext = os.path.splitext(item)
+                            if ext != ".gcno":
+                                continue
+
+                            gcda_filename = os.path.join(input_dir, "{}.gcda".format(stem))
+
+                            if os.path.isfile(gcda_filename):
+                                with open(gcda_filename) as gcda_file:
+                                    if gcda_file.read() == "fail":
+                                        sys.stdout.write("Unable to process '{}'\\n".format(stem))
+                                        sys.exit(1)
+
+                                hits = 1
+                            else:
+                                hits = 0
+
+                            f.write("SF:/src/{}.cpp\\nDA:1,{}\\nDA:2,0\\nend_of_record\\n".format(stem, hits))
+                    """,
+                ),
+            )
+
+        self._processed = []
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_Generate(self):
+        self._Write("A.gcno", "A")
+        self._Write("A.gcda", "A")
+        self._Write("B.gcno", "B")
+
+        self.assertEqual(self._Generate(), 0)
+        self.assertEqual(self._processed, ["A.gcda A.gcno", "B.gcno"])
+
+        self.assertEqual(self._GetCoverage(), {"/src/A.cpp": (1, 2), "/src/B.cpp": (0, 2)})
+
+        with open(os.path.join(self._output_dir, IncrementalCoverage.MANIFEST_FILENAME)) as f:
+            manifest = json.load(f)
+
+        self.assertEqual(manifest["version"], IncrementalCoverage.MANIFEST_VERSION)
+        self.assertEqual(
+            sorted(manifest["units"]),
+            [os.path.realpath(os.path.join(self._bin_dir, name)) for name in ["A.gcno", "B.gcno"]],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_ReuseUnchanged(self):
+        self._Write("A.gcno", "A")
+        self._Write("A.gcda", "A")
+        self._Write("B.gcno", "B")
+
+        self.assertEqual(self._Generate(), 0)
+
+        self._processed = []
+
+        output_stream = io.StringIO()
+
+        self.assertEqual(self._Generate(output_stream), 0)
+        self.assertEqual(self._processed, [])
+        self.assertEqual(output_stream.getvalue(), "Incremental coverage: 0 of 2 object files changed.\n")
+
+        self.assertEqual(self._GetCoverage(), {"/src/A.cpp": (1, 2), "/src/B.cpp": (0, 2)})
+
+        # Only the changed unit is processed
+        self._Write("B.gcda", "Changed")
+
+        self.assertEqual(self._Generate(), 0)
+        self.assertEqual(self._processed, ["B.gcda B.gcno"])
+
+        self.assertEqual(self._GetCoverage(), {"/src/A.cpp": (1, 2), "/src/B.cpp": (1, 2)})
+
+    # ----------------------------------------------------------------------
+    def test_MissingPartial(self):
+        self._Write("A.gcno", "A")
+        self._Write("B.gcno", "B")
+
+        self.assertEqual(self._Generate(), 0)
+
+        partials_dir = os.path.join(self._output_dir, IncrementalCoverage.PARTIALS_DIRNAME)
+
+        self.assertEqual(len(os.listdir(partials_dir)), 2)
+        os.remove(os.path.join(partials_dir, sorted(os.listdir(partials_dir))[0]))
+
+        self._processed = []
+
+        self.assertEqual(self._Generate(), 0)
+        self.assertEqual(len(self._processed), 1)
+        self.assertEqual(self._GetCoverage(), {"/src/A.cpp": (0, 2), "/src/B.cpp": (0, 2)})
+
+    # ----------------------------------------------------------------------
+    def test_RemovedUnit(self):
+        self._Write("A.gcno", "A")
+        self._Write("B.gcno", "B")
+
+        self.assertEqual(self._Generate(), 0)
+
+        os.remove(os.path.join(self._bin_dir, "B.gcno"))
+
+        self._processed = []
+
+        self.assertEqual(self._Generate(), 0)
+        self.assertEqual(self._processed, [])
+
+        # The partial result is removed
+        self.assertEqual(len(os.listdir(os.path.join(self._output_dir, IncrementalCoverage.PARTIALS_DIRNAME))), 1)
+        self.assertEqual(self._GetCoverage(), {"/src/A.cpp": (0, 2)})
+
+    # ----------------------------------------------------------------------
+    def test_InvalidManifest(self):
+        self._Write("A.gcno", "A")
+
+        self.assertEqual(self._Generate(), 0)
+
+        for content in ['{"version": 0, "units": {}}', "not json"]:
+            with open(os.path.join(self._output_dir, IncrementalCoverage.MANIFEST_FILENAME), "w") as f:
+                f.write(content)
+
+            self._processed = []
+
+            self.assertEqual(self._Generate(), 0)
+            self.assertEqual(self._processed, ["A.gcno"])
+
+    # ----------------------------------------------------------------------
+    def test_Failure(self):
+        self._Write("A.gcno", "A")
+        self._Write("B.gcno", "B")
+        self._Write("B.gcda", "fail")
+
+        output_stream = io.StringIO()
+
+        self.assertEqual(self._Generate(output_stream), 1)
+        self.assertIn("Unable to process 'B'", output_stream.getvalue())
+        self.assertFalse(os.path.exists(os.path.join(self._output_dir, "lcov.info")))
+
+        # The successful result is reused and the failed unit is processed again
+        self._Write("B.gcda", "B")
+
+        self._processed = []
+
+        self.assertEqual(self._Generate(), 0)
+        self.assertEqual(self._processed, ["B.gcda B.gcno"])
+        self.assertEqual(self._GetCoverage(), {"/src/A.cpp": (0, 2), "/src/B.cpp": (1, 2)})
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Generate(self, output_stream=None):
+        # ----------------------------------------------------------------------
+        def CreateLcovCommandLine(bin_dirs, output_filename):
+            assert len(bin_dirs) == 1
+
+            # The artifacts are staged before the command line is created
+            self._processed.append(" ".join(sorted(os.listdir(bin_dirs[0]))))
+
+            return '"{}" "{}" "{}" "{}"'.format(sys.executable, self._script_filename, bin_dirs[0], output_filename)
+
+        # ----------------------------------------------------------------------
+
+        with mock.patch.object(CoverageTools, "CreateLcovCommandLine", CreateLcovCommandLine):
+            return IncrementalCoverage.Generate(
+                [self._bin_dir],
+                self._output_dir,
+                output_stream or io.StringIO(),
+            )
+
+    # ----------------------------------------------------------------------
+    def _GetCoverage(self):
+        return {
+            filename: file_info.GetLineCoverage()
+            for filename, file_info in CoverageDiff.Load(os.path.join(self._output_dir, "lcov.info")).items()
+        }
+
+    # ----------------------------------------------------------------------
+    def _Write(self, name, content):
+        filename = os.path.join(self._bin_dir, name)
+
+        # Ensure that the fingerprint changes, even if the modification time doesn't
+        if os.path.isfile(filename):
+            content += " " * (os.path.getsize(filename) + 1)
+
+        with open(filename, "w") as f:
+            f.write(content)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,237 @@
+# ----------------------------------------------------------------------
+# |
+# |  Lcov_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-03 10:12:44
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for Lcov.py"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon import Lcov
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._temp_directory = tempfile.mkdtemp()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self._temp_directory)
+
+    # ----------------------------------------------------------------------
+    def test_IndexRecords(self):
+        content = textwrap.dedent(
+            """\
+            SF:/a.cpp
+            DA:1,1
+            end_of_record
+            TN:test
+            SF:/b.cpp
+            DA:2,0
+            end_of_record
+            """,
+        ).encode("utf-8")
+
+        records = Lcov.IndexRecords(content)
+
+        self.assertEqual([(record[0], record[1]) for record in records], [(b"/a.cpp", None), (b"/b.cpp", b"TN:test")])
+        self.assertEqual(content[records[0][2] : records[0][3]], b"DA:1,1\n")
+        self.assertEqual(content[records[1][2] : records[1][3]], b"DA:2,0\n")
+
+    # ----------------------------------------------------------------------
+    def test_Merge(self):
+        self.assertEqual(
+            self._Merge(
+                """\
+                TN:test
+                SF:/b.cpp
+                FN:3,Func
+                FNDA:1,Func
+                BRDA:4,0,0,1
+                BRDA:4,0,1,-
+                DA:3,1
+                DA:4,1
+                end_of_record
+                SF:/a.cpp
+                DA:1,2
+                end_of_record
+                """,
+                """\
+                TN:test
+                SF:/b.cpp
+                FN:3,Func
+                FNDA:2,Func
+                BRDA:4,0,0,0
+                BRDA:4,0,1,3
+                DA:3,2
+                DA:4,0
+                DA:5,0
+                end_of_record
+                """,
+            ),
+            # The test name applies to all of the records that follow it
+            textwrap.dedent(
+                """\
+                TN:test
+                SF:/a.cpp
+                DA:1,2
+                LF:1
+                LH:1
+                end_of_record
+                TN:test
+                SF:/b.cpp
+                FN:3,Func
+                FNDA:3,Func
+                FNF:1
+                FNH:1
+                BRDA:4,0,0,1
+                BRDA:4,0,1,3
+                BRF:2
+                BRH:2
+                DA:3,3
+                DA:4,1
+                DA:5,0
+                LF:3
+                LH:2
+                end_of_record
+                """,
+            ),
+        )
+
+    # ----------------------------------------------------------------------
+    def test_MergeWithAndWithoutTestName(self):
+        # Records for the same file with and without a test name are merged
+        self.assertEqual(
+            self._Merge(
+                """\
+                SF:/x.cpp
+                DA:1,1
+                end_of_record
+                TN:t
+                SF:/x.cpp
+                DA:1,2
+                DA:2,0
+                end_of_record
+                """,
+                """\
+                SF:/x.cpp
+                DA:2,4
+                end_of_record
+                """,
+            ),
+            textwrap.dedent(
+                """\
+                TN:t
+                SF:/x.cpp
+                DA:1,3
+                DA:2,4
+                LF:2
+                LH:2
+                end_of_record
+                """,
+            ),
+        )
+
+    # ----------------------------------------------------------------------
+    def test_MergeEmpty(self):
+        self.assertEqual(self._Merge("", ""), "")
+
+    # ----------------------------------------------------------------------
+    def test_AggregateByFileAndMethod(self):
+        # Lines belong to the method that starts on or before them (as with `grcov -t ade`);
+        # methods that start on the same line share those lines.
+        filename = os.path.join(self._temp_directory, "input.info")
+
+        with open(filename, "w") as f:
+            f.write(
+                textwrap.dedent(
+                    """\
+                    SF:/a.cpp
+                    FN:3,First
+                    FN:10,Second
+                    FN:10,SecondAlias
+                    DA:1,1
+                    DA:3,1
+                    DA:4,0
+                    DA:10,2
+                    DA:11,0
+                    DA:12,0
+                    end_of_record
+                    SF:/b.cpp
+                    FN:1,main
+                    DA:1,1
+                    end_of_record
+                    SF:/a.cpp
+                    DA:4,1
+                    end_of_record
+                    """,
+                ),
+            )
+
+        self.assertEqual(
+            Lcov.AggregateByFileAndMethod(filename),
+            {
+                ("/a.cpp", "First"): (2, 0),
+                ("/a.cpp", "Second"): (1, 2),
+                ("/a.cpp", "SecondAlias"): (1, 2),
+                ("/b.cpp", "main"): (1, 0),
+            },
+        )
+
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    # ----------------------------------------------------------------------
+    def _Merge(self, *contents):
+        input_filenames = []
+
+        for index, content in enumerate(contents):
+            input_filename = os.path.join(self._temp_directory, "input{}.info".format(index))
+
+            with open(input_filename, "w") as f:
+                f.write(textwrap.dedent(content))
+
+            input_filenames.append(input_filename)
+
+        output_filename = os.path.join(self._temp_directory, "output.info")
+
+        Lcov.Merge(input_filenames, output_filename)
+
+        with open(output_filename) as f:
+            return f.read()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,255 @@
+# ----------------------------------------------------------------------
+# |
+# |  MethodFilter_UnitTest.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-05 09:12:47
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""Unit test for MethodFilter.py"""
+
+import os
+import sys
+import unittest
+
+import CommonEnvironment
+
+from CppClangCommon import MethodFilter as MethodFilterModule
+from CppClangCommon.MethodFilter import DemangledMethodFilter, MethodFilter
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+class StandardSuite(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_NoFilters(self):
+        method_filter = MethodFilter(None, None)
+
+        self.assertTrue(method_filter("main"))
+        self.assertTrue(method_filter("_ZN2ns3Foo6MethodEv"))
+
+        self.assertEqual(method_filter.Filter(["main", "_Z3Addii"]), ["main", "_Z3Addii"])
+
+    # ----------------------------------------------------------------------
+    def test_Includes(self):
+        method_filter = MethodFilter(["ns::Foo::*", "Add"], None)
+
+        # Every component of an include must be present
+        self.assertTrue(method_filter("_ZN2ns3Foo6MethodEv"))
+        self.assertFalse(method_filter("_ZN2ns3Bar6MethodEv"))
+        self.assertFalse(method_filter("_ZN5other3Foo6MethodEv"))
+
+        # Any include can match
+        self.assertTrue(method_filter("_Z3Addii"))
+        self.assertFalse(method_filter("main"))
+
+    # ----------------------------------------------------------------------
+    def test_Excludes(self):
+        method_filter = MethodFilter(None, ["ns::Foo::*"])
+
+        self.assertFalse(method_filter("_ZN2ns3Foo6MethodEv"))
+        self.assertTrue(method_filter("_ZN2ns3Bar6MethodEv"))
+        self.assertTrue(method_filter("main"))
+
+    # ----------------------------------------------------------------------
+    def test_ExcludesTakePrecedence(self):
+        method_filter = MethodFilter(["ns::*"], ["ns::Foo::*"])
+
+        self.assertFalse(method_filter("_ZN2ns3Foo6MethodEv"))
+        self.assertTrue(method_filter("_ZN2ns3Bar6MethodEv"))
+        self.assertFalse(method_filter("main"))
+
+        self.assertEqual(
+            method_filter.Filter(["_ZN2ns3Foo6MethodEv", "_ZN2ns3Bar6MethodEv", "main"]),
+            ["_ZN2ns3Bar6MethodEv"],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_WildcardOnly(self):
+        # A filter without any components matches everything
+        self.assertTrue(MethodFilter(["*"], None)("main"))
+        self.assertFalse(MethodFilter(None, ["*::*"])("main"))
+
+    # ----------------------------------------------------------------------
+    def test_OverlappingPatterns(self):
+        # Components that are prefixes, suffixes, or substrings of each other are all found
+        method_filter = MethodFilter(["Foo::FooBar", "oBa::Barr"], None)
+
+        self.assertTrue(method_filter("_ZN6FooBar3BazEv"))
+        self.assertFalse(method_filter("_ZN3Foo3BazEv"))
+        self.assertTrue(method_filter("_ZN5Barr3BazEv_oBa"))
+        self.assertFalse(method_filter("_ZN4Bar3BazEv_oBa"))
+
+        method_filter = MethodFilter(None, ["aa::aaa"])
+
+        self.assertTrue(method_filter("_Z2aav"))
+        self.assertFalse(method_filter("_Z3aaav"))
+
+    # ----------------------------------------------------------------------
+    def test_ManyPatterns(self):
+        # The automaton is used when there are many components; results should be the same as
+        # those produced when searching for each component individually.
+        includes = ["ns{}::Type{}".format(index, index) for index in range(MethodFilterModule._MAX_SUBSTRING_PARTS)]
+        includes.append("Overlap::Overlapping")
+
+        names = [
+            "_ZN3ns04Type06MethodEv",
+            "_ZN3ns14Type16MethodEv",
+            "_ZN4ns314Type316MethodEv",
+            "_ZN11Overlapping6MethodEv",
+            "_ZN7Overlap6MethodEv",
+            "main",
+        ]
+
+        expected = [
+            "_ZN3ns04Type06MethodEv",
+            "_ZN3ns14Type16MethodEv",
+            "_ZN4ns314Type316MethodEv",
+            "_ZN11Overlapping6MethodEv",
+        ]
+
+        self.assertEqual(MethodFilter(includes, None).Filter(names), expected)
+        self.assertEqual(MethodFilter(includes[:2], None).Filter(names), expected[:2])
+
+        self.assertEqual(
+            MethodFilter(None, includes).Filter(names),
+            [name for name in names if name not in expected],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_Cache(self):
+        method_filter = MethodFilter(["Foo"], None)
+
+        evaluated = []
+        original_evaluate = method_filter._Evaluate
+
+        # ----------------------------------------------------------------------
+        def Evaluate(method_name):
+            evaluated.append(method_name)
+            return original_evaluate(method_name)
+
+        # ----------------------------------------------------------------------
+
+        method_filter._Evaluate = Evaluate
+
+        self.assertEqual(method_filter.Filter(["_Z3Foov", "main", "_Z3Foov"]), ["_Z3Foov", "_Z3Foov"])
+        self.assertFalse(method_filter("main"))
+        self.assertTrue(method_filter("_Z3Foov"))
+
+        self.assertEqual(evaluated, ["_Z3Foov", "main"])
+
+    # ----------------------------------------------------------------------
+    def test_StripSignature(self):
+        for demangled_name, expected in [
+            ("main", "main"),
+            ("ns::Foo<int>::Method(char) const", "ns::Foo<int>::Method"),
+            ("int ns::Foo<int>::Method(char) const", "ns::Foo<int>::Method"),
+            ("unsigned long ns::Size()", "ns::Size"),
+            ("std::function<void (int)> ns::Get()", "ns::Get"),
+            ("void std::sort<std::vector<int, std::allocator<int> > >(int*, int*)", "std::sort<std::vector<int, std::allocator<int> > >"),
+            ("ns::GetName[abi:cxx11](int)", "ns::GetName[abi:cxx11]"),
+            # Anonymous namespaces
+            ("(anonymous namespace)::Helper(int)", "(anonymous namespace)::Helper"),
+            ("ns::(anonymous namespace)::Helper(int)", "ns::(anonymous namespace)::Helper"),
+            ("ns::Foo<(anonymous namespace)::X>::Bar()", "ns::Foo<(anonymous namespace)::X>::Bar"),
+            # Operators
+            ("ns::Foo::operator()(int)", "ns::Foo::operator()"),
+            ("ns::Foo::operator<<(std::ostream&)", "ns::Foo::operator<<"),
+            ("ns::Foo::operator>>=(int)", "ns::Foo::operator>>="),
+            ("ns::Foo::operator->()", "ns::Foo::operator->"),
+            ("ns::Foo::operator< (int)", "ns::Foo::operator<"),
+            ("bool operator< <int>(A const&, A const&)", "operator< <int>"),
+            ("operator new(unsigned long)", "operator new"),
+            ("ns::Foo::operator bool() const", "ns::Foo::operator bool"),
+            # Lambdas (gcc and llvm)
+            ("main::{lambda(int)#1}::operator()(int) const", "main::{lambda(int)#1}::operator()"),
+            ("main::'lambda'(int)::operator()(int) const", "main::'lambda'(int)::operator()"),
+            ("main::'lambda0'()::operator()() const", "main::'lambda0'()::operator()"),
+            # decltype return types (gcc and llvm)
+            ("decltype ({parm#1}+{parm#2}) Add<int, int>(int, int)", "Add<int, int>"),
+            ("decltype((fp) + (fp0)) Add<int, int>(int, int)", "Add<int, int>"),
+            ("auto ns::Add<int>(int) -> decltype(x)", "ns::Add<int>"),
+            # Functions that return function pointers/references
+            ("void (*ns::GetHandler(int))(char)", "ns::GetHandler"),
+            ("int (*ns::Foo<int>::Get() const)(int)", "ns::Foo<int>::Get"),
+            ("int (&ns::GetArray())[4]", "ns::GetArray"),
+        ]:
+            self.assertEqual(MethodFilterModule._StripSignature(demangled_name), expected, demangled_name)
+
+    # ----------------------------------------------------------------------
+    def test_StripTemplateArgs(self):
+        for qualified_name, expected in [
+            ("ns::Foo::Method", "ns::Foo::Method"),
+            ("ns::Foo<int>::Method", "ns::Foo::Method"),
+            ("std::sort<std::vector<int, std::allocator<int> > >", "std::sort"),
+            ("ns::Foo<(anonymous namespace)::X>::Bar", "ns::Foo::Bar"),
+            ("operator< <int>", "operator<"),
+            ("ns::Foo<int>::operator<<", "ns::Foo::operator<<"),
+            ("ns::Foo<int>::operator>>=", "ns::Foo::operator>>="),
+            ("ns::Foo<int>::operator->", "ns::Foo::operator->"),
+            ("ns::Foo<int>::operator()", "ns::Foo::operator()"),
+            ("main::{lambda(int)#1}::operator()", "main::{lambda(int)#1}::operator()"),
+        ]:
+            self.assertEqual(MethodFilterModule._StripTemplateArgs(qualified_name), expected, qualified_name)
+
+    # ----------------------------------------------------------------------
+    def test_DemangledMethodFilter(self):
+        demangler = _Demangler(
+            {
+                "_ZN2ns3FooIiE6MethodEc": "int ns::Foo<int>::Method(char) const",
+                "_ZN2ns10GetHandlerEi": "void (*ns::GetHandler(int))(char)",
+                "_Z3AddIiiEDTplfp_fp0_ET_T0_": "decltype ({parm#1}+{parm#2}) Add<int, int>(int, int)",
+                "main": "main",
+            },
+        )
+
+        method_filter = DemangledMethodFilter(["ns::Foo::*", "ns::GetHandler", "Add<int, *>"], ["*(char) const"], demangler)
+
+        self.assertEqual(
+            method_filter.Filter(["_ZN2ns3FooIiE6MethodEc", "_ZN2ns10GetHandlerEi", "_Z3AddIiiEDTplfp_fp0_ET_T0_", "main"]),
+            ["_ZN2ns10GetHandlerEi", "_Z3AddIiiEDTplfp_fp0_ET_T0_"],
+        )
+
+        self.assertTrue(DemangledMethodFilter(["ns::Foo::*"], None, demangler)("_ZN2ns3FooIiE6MethodEc"))
+
+        # Results are cached
+        self.assertEqual(demangler.num_requests, 2)
+        self.assertTrue(method_filter("_ZN2ns10GetHandlerEi"))
+        self.assertEqual(demangler.num_requests, 2)
+
+
+# ----------------------------------------------------------------------
+class _Demangler(object):
+    # ----------------------------------------------------------------------
+    def __init__(self, names):
+        self.names                          = names
+        self.num_requests                   = 0
+
+    # ----------------------------------------------------------------------
+    def Demangle(self, names):
+        self.num_requests += 1
+        return {name: self.names[name] for name in names}
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    try:
+        sys.exit(
+            unittest.main(
+                verbosity=2,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
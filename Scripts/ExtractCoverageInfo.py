@@ -17,26 +17,18 @@
 
 import os
 import sys
-import textwrap
-
-from collections import OrderedDict
-
-import inflect as inflect_mod
 
 import CommonEnvironment
 from CommonEnvironment import CommandLine
-from CommonEnvironment import FileSystem
-from CommonEnvironment import Process
-from CommonEnvironment.Shell.All import CurrentShell
-from CommonEnvironment.StreamDecorator import StreamDecorator
+
+from CppClangCommon import CoverageDaemon
+from CppClangCommon import CoverageTools
 
 # ----------------------------------------------------------------------
 _script_fullpath                            = CommonEnvironment.ThisFullpath()
 _script_dir, _script_name                   = os.path.split(_script_fullpath)
 # ----------------------------------------------------------------------
 
-inflect                                     = inflect_mod.engine()
-
 # ----------------------------------------------------------------------
 @CommandLine.EntryPoint()
 @CommandLine.Constraints(
@@ -77,43 +69,110 @@ def Lcov(
             "An 'output_dir' must be provided when multiple 'bin_dirs' are parsed",
         )
 
-    if len(bin_dirs) == 1 and not output_dir:
-        output_dir = bin_dirs[0]
+    return CoverageTools.Lcov(
+        bin_dirs,
+        output_dir=output_dir,
+        output_filename=output_filename,
+        type=type,
+        not_llvm=not_llvm,
+        output_stream=output_stream,
+        verbose=verbose,
+    )
 
-    with StreamDecorator(output_stream).DoneManager(
-        line_prefix="",
-        prefix="\nResults: ",
-        suffix="\n",
-    ) as dm:
-        output_filename = os.path.join(output_dir, output_filename)
 
-        dm.stream.write("Creating '{}'...".format(output_filename))
-        with dm.stream.DoneManager() as this_dm:
-            FileSystem.MakeDirs(output_dir)
+# ----------------------------------------------------------------------
+@CommandLine.EntryPoint()
+@CommandLine.Constraints(
+    bin_dir=CommandLine.DirectoryTypeInfo(
+        arity="?",
+    ),
+    profraw_filename=CommandLine.StringTypeInfo(
+        arity="*",
+    ),
+    profdata_filename=CommandLine.StringTypeInfo(
+        arity="?",
+    ),
+    executable=CommandLine.FilenameTypeInfo(
+        arity="*",
+    ),
+    source_dir=CommandLine.DirectoryTypeInfo(
+        arity="*",
+    ),
+    output_filename=CommandLine.StringTypeInfo(
+        arity="?",
+    ),
+    output_dir=CommandLine.DirectoryTypeInfo(
+        ensure_exists=False,
+        arity="?",
+    ),
+    num_threads=CommandLine.IntTypeInfo(
+        min=1,
+        arity="?",
+    ),
+    merge_fan_in=CommandLine.IntTypeInfo(
+        min=2,
+        arity="?",
+    ),
+    output_stream=None,
+)
+def Html(
+    bin_dir=None,
+    profraw_filename=None,
+    profdata_filename="default.profdata",
+    executable=None,
+    source_dir=None,
+    output_filename="code_coverage.html",
+    output_dir=None,
+    num_threads=None,
+    compress=False,
+    force=False,
+    no_sparse=False,
+    merge_fan_in=None,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Generates a HTML file based on *.profdata files.
 
-            command_line = 'grcov {dirs} -o "{output_filename}"{llvm}{type}'.format(
-                dirs=" ".join(['"{}"'.format(dir) for dir in bin_dirs]),
-                output_filename=output_filename,
-                llvm="" if not_llvm else " --llvm",
-                type="" if type is None else " -t {}".format(type),
-            )
+    `profraw_filename` may be a filename, a directory (searched recursively for *.profraw
+    files), or a glob pattern. Many profraw files are merged in parallel.
 
-            if verbose:
-                this_dm.stream.write(
-                    textwrap.dedent(
-                        """\
-                        Command Line:
-                            {}
+    When `output_dir` is provided, a page is written for each source file (along with an
+    index) using multiple threads rather than writing everything to `output_filename`;
+    `compress` writes a gzipped copy of each page (other than the index) alongside the page
+    once it has been rendered, for use by web servers that serve precompressed content.
+    """
 
-                        """,
-                    ).format(command_line),
-                )
+    profraw_filenames = profraw_filename
+    del profraw_filename
 
-            this_dm.result = Process.Execute(command_line, this_dm.stream)
-            if this_dm.result != 0:
-                return this_dm.result
+    executables = executable
+    del executable
+
+    source_dirs = source_dir
+    del source_dir
 
-        return dm.result
+    if compress and not output_dir:
+        raise CommandLine.UsageException(
+            "An 'output_dir' must be provided when pages are compressed",
+        )
+
+    return CoverageTools.Html(
+        bin_dir=bin_dir,
+        profraw_filenames=profraw_filenames,
+        profdata_filename=profdata_filename,
+        executables=executables,
+        source_dirs=source_dirs,
+        output_filename=output_filename,
+        output_dir=output_dir,
+        num_threads=num_threads,
+        compress=compress,
+        force=force,
+        no_sparse=no_sparse,
+        merge_fan_in=merge_fan_in,
+        output_stream=output_stream,
+        verbose=verbose,
+    )
 
 
 # ----------------------------------------------------------------------
@@ -123,7 +182,7 @@ def Lcov(
         arity="?",
     ),
     profraw_filename=CommandLine.StringTypeInfo(
-        arity="?",
+        arity="*",
     ),
     profdata_filename=CommandLine.StringTypeInfo(
         arity="?",
@@ -137,21 +196,39 @@ def Lcov(
     output_filename=CommandLine.StringTypeInfo(
         arity="?",
     ),
+    num_threads=CommandLine.IntTypeInfo(
+        min=1,
+        arity="?",
+    ),
+    merge_fan_in=CommandLine.IntTypeInfo(
+        min=2,
+        arity="?",
+    ),
     output_stream=None,
 )
-def Html(
+def Summary(
     bin_dir=None,
-    profraw_filename="default.profraw",
+    profraw_filename=None,
     profdata_filename="default.profdata",
     executable=None,
     source_dir=None,
-    output_filename="code_coverage.html",
+    output_filename=None,
+    functions=False,
+    num_threads=None,
     force=False,
     no_sparse=False,
+    merge_fan_in=None,
     output_stream=sys.stdout,
     verbose=False,
 ):
-    """Generates a HTML file based on *.profdata files"""
+    """\
+    Displays per-file (and optionally per-function) coverage information based on *.profdata files.
+
+    The information is written to `output_filename` if provided.
+    """
+
+    profraw_filenames = profraw_filename
+    del profraw_filename
 
     executables = executable
     del executable
@@ -159,112 +236,167 @@ def Html(
     source_dirs = source_dir
     del source_dir
 
-    if bin_dir is None:
-        bin_dir = os.getcwd()
-
-    with StreamDecorator(output_stream).DoneManager(
-        line_prefix="",
-        prefix="\nResults: ",
-        suffix="\n",
-    ) as dm:
-        # Generate the profdata file (if necessary)
-        profdata_filename = os.path.join(bin_dir, profdata_filename)
-
-        if force or not os.path.isfile(profdata_filename):
-            profraw_filename = os.path.join(bin_dir, profraw_filename)
-            if not os.path.isfile(profraw_filename):
-                raise CommandLine.UsageException(
-                    "'{}' does not exist.".format(profraw_filename),
-                )
-
-            dm.stream.write("Creating '{}'...".format(profdata_filename))
-            with dm.stream.DoneManager(
-                suffix="\n",
-            ) as this_dm:
-                FileSystem.MakeDirs(os.path.dirname(profdata_filename))
-
-                command_line = 'llvm-profdata merge {sparse} -o "{output_filename}" "{input_filename}"'.format(
-                    sparse="" if no_sparse else "-sparse",
-                    output_filename=profdata_filename,
-                    input_filename=profraw_filename,
-                )
-
-                if verbose:
-                    this_dm.stream.write(
-                        textwrap.dedent(
-                            """\
-                            Command Line:
-                                {}
-
-                            """,
-                        ).format(command_line),
-                    )
-
-                this_dm.result = Process.Execute(command_line, this_dm.stream)
-                if this_dm.result != 0:
-                    return this_dm.result
-
-        # Generate the html
-        output_filename = os.path.join(bin_dir, output_filename)
-
-        dm.stream.write("Creating '{}'...".format(output_filename))
-        with dm.stream.DoneManager(
-            suffix="\n",
-        ) as this_dm:
-            if not executables:
-                this_dm.stream.write("Finding executables...")
-                with this_dm.stream.DoneManager(
-                    done_suffix=lambda: "{} found".format(
-                        inflect.no("executable", len(executables)),
-                    ),
-                ) as find_dm:
-                    if CurrentShell.ExecutableExtension:
-                        executables = list(
-                            FileSystem.WalkFiles(
-                                bin_dir,
-                                include_file_extensions=[
-                                    CurrentShell.ExecutableExtension
-                                ],
-                                recurse=False,
-                            ),
-                        )
-                    else:
-                        for filename in FileSystem.WalkFiles(
-                            bin_dir,
-                            recurse=False,
-                        ):
-                            if os.access(filename, os.X_OK):
-                                executables.append(filename)
-
-            FileSystem.MakeDirs(os.path.dirname(output_filename))
-
-            command_line = 'llvm-cov show {executables} "-instr-profile={profdata}" -use-color --format html {sources} > "{output_filename}"'.format(
-                executables=" ".join(
-                    ['"{}"'.format(executable) for executable in executables],
-                ),
-                profdata=profdata_filename,
-                sources=" ".join(
-                    ['"{}"'.format(source_dir) for source_dir in source_dirs],
-                ) if source_dirs else "",
-                output_filename=output_filename,
-            )
-
-            if verbose:
-                this_dm.stream.write(
-                    textwrap.dedent(
-                        """\
-                        Command Line:
-                            {}
-
-                        """,
-                    ).format(command_line),
-                )
-
-            this_dm.result = Process.Execute(command_line, this_dm.stream)
-            if this_dm.result != 0:
-                return this_dm.result
-
-        return dm.result
+    return CoverageTools.Summary(
+        bin_dir=bin_dir,
+        profraw_filenames=profraw_filenames,
+        profdata_filename=profdata_filename,
+        executables=executables,
+        source_dirs=source_dirs,
+        output_filename=output_filename,
+        functions=functions,
+        num_threads=num_threads,
+        force=force,
+        no_sparse=no_sparse,
+        merge_fan_in=merge_fan_in,
+        output_stream=output_stream,
+        verbose=verbose,
+    )
+
+
+# ----------------------------------------------------------------------
+@CommandLine.EntryPoint()
+@CommandLine.Constraints(
+    input_filename=CommandLine.FilenameTypeInfo(
+        arity="+",
+    ),
+    output_filename=CommandLine.FilenameTypeInfo(
+        ensure_exists=False,
+    ),
+    output_stream=None,
+)
+def Merge(
+    input_filename,
+    output_filename,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Merges LCOV files (for example, those generated by different shards of a test suite)
+    into a single file, summing line, function, and branch hits for each source file.
+    """
+
+    input_filenames = input_filename
+    del input_filename
+
+    return CoverageTools.Merge(
+        input_filenames,
+        output_filename,
+        output_stream=output_stream,
+        verbose=verbose,
+    )
+
+
+# ----------------------------------------------------------------------
+@CommandLine.EntryPoint()
+@CommandLine.Constraints(
+    before_filename=CommandLine.FilenameTypeInfo(),
+    after_filename=CommandLine.FilenameTypeInfo(),
+    output_filename=CommandLine.FilenameTypeInfo(
+        ensure_exists=False,
+        arity="?",
+    ),
+    output_stream=None,
+)
+def Diff(
+    before_filename,
+    after_filename,
+    output_filename=None,
+    output_stream=sys.stdout,
+    verbose=False,
+):
+    """\
+    Displays the per-file and per-function coverage differences between two LCOV, ade
+    (`grcov -t ade`), or coverage store (see `Store`) files.
+    """
+
+    return CoverageTools.Diff(
+        before_filename,
+        after_filename,
+        output_filename=output_filename,
+        output_stream=output_stream,
+        verbose=verbose,
+    )
+
+
+# ----------------------------------------------------------------------
+@CommandLine.EntryPoint()
+@CommandLine.Constraints(
+    input_filename=CommandLine.FilenameTypeInfo(),
+    output_filename=CommandLine.FilenameTypeInfo(
+        ensure_exists=False,
+    ),
+    output_stream=None,
+)
+def Store(
+    input_filename,
+    output_filename,
+    output_stream=sys.stdout,
+):
+    """\
+    Converts an LCOV or ade (`grcov -t ade`) file into a binary coverage store that can be
+    opened without parsing (and used with `Diff`).
+    """
+
+    return CoverageTools.Store(
+        input_filename,
+        output_filename,
+        output_stream=output_stream,
+    )
+
+
+# ----------------------------------------------------------------------
+@CommandLine.EntryPoint()
+@CommandLine.Constraints(
+    socket_filename=CommandLine.StringTypeInfo(
+        arity="?",
+    ),
+    idle_timeout=CommandLine.IntTypeInfo(
+        min=0,
+        arity="?",
+    ),
+    output_stream=None,
+)
+def Daemon(
+    socket_filename=None,
+    idle_timeout=None,
+    background=False,
+    stop=False,
+    output_stream=sys.stdout,
+):
+    """\
+    Runs a service that keeps coverage state warm between runs; `CodeCoverageExecutor`
+    sends its requests to the service while it is running. The service exits after
+    `idle_timeout` seconds without a request (0 to run until stopped).
+    """
+
+    if not CoverageDaemon.IsSupported():
+        raise CommandLine.UsageException("The daemon is not supported on this platform")
+
+    if stop:
+        return CoverageDaemon.Stop(
+            socket_filename=socket_filename,
+            output_stream=output_stream,
+        )
+
+    if background:
+        command_line = [sys.executable, _script_fullpath, "Daemon"]
+
+        if socket_filename:
+            command_line.append("/socket_filename={}".format(socket_filename))
+        if idle_timeout is not None:
+            command_line.append("/idle_timeout={}".format(idle_timeout))
+
+        return CoverageDaemon.Launch(
+            command_line,
+            socket_filename=socket_filename,
+            output_stream=output_stream,
+        )
+
+    return CoverageDaemon.Serve(
+        socket_filename=socket_filename,
+        idle_timeout=idle_timeout,
+        output_stream=output_stream,
+    )
 
 
 # ----------------------------------------------------------------------
@@ -54,6 +54,9 @@ del sys.path[0]
 
 from _custom_data import _CUSTOM_DATA
 
+import _install_stamp
+import _test_executor_registry
+
 # ----------------------------------------------------------------------
 # There are two types of repositories: Standard and Mixin. Only one standard
 # repository may be activated within an environment at a time while any number
@@ -168,9 +171,29 @@ def GetCustomActions(debug, verbose, explicit_configurations):
     else:
         FilenameToUri = CommonEnvironmentImports.FileSystem.FilenameToUri
 
+    # Installation is skipped when the stamp recorded after the previous installation matches
+    # the current state of the installation directory (this can be overridden by setting the
+    # environment variable `DEVELOPMENT_ENVIRONMENT_CPP_CLANG_FORCE_INSTALL`).
+    #
+    # Extraction and hash verification are performed by AcquireBinaries.py (in the fundamental
+    # repository) as separate passes; the stamp only avoids both of them when nothing has changed.
+    stamps_filename = os.path.join(_script_dir, "Generated", "InstallStamps.json")
+
+    if os.getenv("DEVELOPMENT_ENVIRONMENT_CPP_CLANG_FORCE_INSTALL") == "1":
+        stamps = {}
+    else:
+        stamps = _install_stamp.Load(stamps_filename)
+
     for name, version, path_parts in _CUSTOM_DATA:
         this_dir = os.path.join(*([_script_dir] + path_parts))
 
+        if stamps.get(this_dir, None) == _install_stamp.Create(this_dir, version):
+            if verbose:
+                sys.stdout.write("'{}' is already installed.\n".format(name))
+
+            continue
+
+        # The stamp is recorded by a separate action that only runs when the installation succeeds
         actions += [
             CurrentShell.Commands.Execute(
                 'python "{script}" Install "{name}" "{uri}" "{dir}" "/unique_id={version}" /unique_id_is_hash'.format(
@@ -186,6 +209,12 @@ def GetCustomActions(debug, verbose, explicit_configurations):
                     version=version,
                 ),
             ),
+            CurrentShell.Commands.Execute(
+                _install_stamp.CreateRecordCommandLine(stamps_filename, this_dir, version),
+            ),
         ]
 
+    # Enumerate test executors and probe the toolchain now so that activation doesn't have to
+    _test_executor_registry.Save(_test_executor_registry.Create())
+
     return actions
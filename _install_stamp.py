@@ -0,0 +1,150 @@
+# ----------------------------------------------------------------------
+# |
+# |  _install_stamp.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-02 14:18:52
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Stamps that record the state of tools installed by Setup_custom.py and verified by
+Activate_custom.py.
+
+A stamp contains the expected hash of the tool's archive and a fingerprint of its
+installation directory (the names, sizes, and modification times of its files). The
+fingerprint is inexpensive to calculate, as file contents are not read.
+
+Stamps are recorded by a separate command line (see `CreateRecordCommandLine`) that runs after
+the install or verify action has succeeded, so a failed action never results in a stamp.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.getenv("DEVELOPMENT_ENVIRONMENT_FUNDAMENTAL"))
+from RepositoryBootstrap.SetupAndActivate import CommonEnvironment
+
+del sys.path[0]
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+# ----------------------------------------------------------------------
+def Create(directory, hash_value):
+    return {
+        "hash": hash_value,
+        "fingerprint": CalculateFingerprint(directory),
+    }
+
+
+# ----------------------------------------------------------------------
+def CreateRecordCommandLine(filename, directory, hash_value):
+    """Returns a command line that records the current stamp for the directory in the file"""
+
+    return 'python "{script}" "{filename}" "{dir}" "{hash}"'.format(
+        script=_script_fullpath,
+        filename=filename,
+        dir=directory,
+        hash=hash_value,
+    )
+
+
+# ----------------------------------------------------------------------
+def Record(filename, directory, hash_value):
+    stamps = Load(filename)
+
+    stamps[directory] = Create(directory, hash_value)
+
+    Save(filename, stamps)
+
+
+# ----------------------------------------------------------------------
+def CalculateFingerprint(directory):
+    """Returns a value that changes when files are added to, removed from, or modified within the directory"""
+
+    hasher = hashlib.sha256()
+
+    for root, directories, filenames in os.walk(directory):
+        # Ensure a consistent order
+        directories.sort()
+
+        for filename in sorted(filenames):
+            fullpath = os.path.join(root, filename)
+            stat = os.stat(fullpath)
+
+            hasher.update(
+                "{}|{}|{}\n".format(
+                    os.path.relpath(fullpath, directory).replace(os.path.sep, "/"),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ).encode("utf-8", "surrogateescape"),
+            )
+
+    return hasher.hexdigest()
+
+
+# ----------------------------------------------------------------------
+def Load(filename):
+    """Returns a dict of directory -> stamp (which is empty if the file doesn't exist or is invalid)"""
+
+    try:
+        with open(filename) as f:
+            content = json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+    return content if isinstance(content, dict) else {}
+
+
+# ----------------------------------------------------------------------
+def Save(filename, stamps):
+    # Stamps are an optimization; failing to write them shouldn't prevent setup or activation
+    temp_filename = None
+
+    try:
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+        # Use a unique temp file, as multiple activations may be saving stamps at the same time
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=os.path.dirname(filename),
+            prefix="{}.".format(os.path.basename(filename)),
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            temp_filename = f.name
+            json.dump(stamps, f, indent=2, sort_keys=True)
+
+        os.replace(temp_filename, filename)
+        temp_filename = None
+
+    except (IOError, OSError):
+        pass
+
+    finally:
+        if temp_filename is not None and os.path.isfile(temp_filename):
+            os.remove(temp_filename)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        sys.stderr.write("Usage: {} <filename> <directory> <hash>\n".format(_script_name))
+        sys.exit(-1)
+
+    Record(*sys.argv[1:])
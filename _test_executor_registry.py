@@ -0,0 +1,161 @@
+# ----------------------------------------------------------------------
+# |
+# |  _test_executor_registry.py
+# |
+# |  David Brownell <db@DavidBrownell.com>
+# |      2022-04-02 09:41:27
+# |
+# ----------------------------------------------------------------------
+# |
+# |  Copyright David Brownell 2022
+# |  Distributed under the Boost Software License, Version 1.0. See
+# |  accompanying file LICENSE_1_0.txt or copy at
+# |  http://www.boost.org/LICENSE_1_0.txt.
+# |
+# ----------------------------------------------------------------------
+"""\
+Manifest of the test executors in this repository (and results of the toolchain probes
+that activation depends upon) used by both Setup_custom.py and Activate_custom.py.
+
+The manifest is created during setup so that activation doesn't need to scan directories
+or search the path. It is recreated when this repository's location, the manifest version,
+the test executors directory, or the toolchain files that were found change. The path isn't
+part of the manifest, as it is always different during setup and activation.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import CommonEnvironment
+from CommonEnvironment.Shell.All import CurrentShell
+
+# ----------------------------------------------------------------------
+_script_fullpath                            = CommonEnvironment.ThisFullpath()
+_script_dir, _script_name                   = os.path.split(_script_fullpath)
+# ----------------------------------------------------------------------
+
+TEST_EXECUTORS_DIR                          = os.path.join(_script_dir, "Scripts", "TestExecutors")
+MANIFEST_FILENAME                           = os.path.join(_script_dir, "Generated", "TestExecutorRegistry.json")
+
+C_RUNTIME_FILENAME                          = "/usr/lib/x86_64-linux-gnu/crt1.o"
+
+# ----------------------------------------------------------------------
+def Get():
+    """Returns a valid manifest, creating (and saving) a new one if necessary"""
+
+    manifest = Load()
+    if manifest is None:
+        manifest = Create()
+        Save(manifest)
+
+    return manifest
+
+
+# ----------------------------------------------------------------------
+def Create():
+    manifest = {
+        "version": _VERSION,
+        "test_executors_dir": TEST_EXECUTORS_DIR,
+        "test_executors_dir_mtime": _GetModifiedTime(TEST_EXECUTORS_DIR),
+        "test_executors": [],
+        "ld": None,
+        "ld_mtime": None,
+        "c_runtime": None,
+        "c_runtime_mtime": None,
+    }
+
+    if os.path.isdir(TEST_EXECUTORS_DIR):
+        for item in sorted(os.listdir(TEST_EXECUTORS_DIR)):
+            fullpath = os.path.join(TEST_EXECUTORS_DIR, item)
+            if not os.path.isfile(fullpath):
+                continue
+
+            name, ext = os.path.splitext(item)
+
+            if ext == ".py" and name.endswith("TestExecutor"):
+                manifest["test_executors"].append(fullpath)
+
+    if CurrentShell.CategoryName == "Linux":
+        ld = shutil.which("ld")
+        if ld:
+            manifest["ld"] = ld
+            manifest["ld_mtime"] = _GetModifiedTime(ld)
+
+        if os.path.isfile(C_RUNTIME_FILENAME):
+            manifest["c_runtime"] = C_RUNTIME_FILENAME
+            manifest["c_runtime_mtime"] = _GetModifiedTime(C_RUNTIME_FILENAME)
+
+    return manifest
+
+
+# ----------------------------------------------------------------------
+def Load():
+    """Returns the saved manifest or None if it doesn't exist or is out of date"""
+
+    try:
+        with open(MANIFEST_FILENAME) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return None
+
+    if not isinstance(manifest, dict) or manifest.get("version", None) != _VERSION:
+        return None
+
+    if (
+        manifest["test_executors_dir"] != TEST_EXECUTORS_DIR
+        or manifest["test_executors_dir_mtime"] != _GetModifiedTime(TEST_EXECUTORS_DIR)
+    ):
+        return None
+
+    if CurrentShell.CategoryName == "Linux":
+        for key in ["ld", "c_runtime"]:
+            if manifest[key] and manifest["{}_mtime".format(key)] != _GetModifiedTime(manifest[key]):
+                return None
+
+    return manifest
+
+
+# ----------------------------------------------------------------------
+def Save(manifest):
+    # The manifest is an optimization; failing to write it shouldn't prevent setup or activation
+    temp_filename = None
+
+    try:
+        if not os.path.isdir(os.path.dirname(MANIFEST_FILENAME)):
+            os.makedirs(os.path.dirname(MANIFEST_FILENAME), exist_ok=True)
+
+        # Use a unique temp file, as multiple activations may be saving the manifest at the same time
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=os.path.dirname(MANIFEST_FILENAME),
+            prefix="{}.".format(os.path.basename(MANIFEST_FILENAME)),
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            temp_filename = f.name
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        os.replace(temp_filename, MANIFEST_FILENAME)
+        temp_filename = None
+
+    except (IOError, OSError):
+        pass
+
+    finally:
+        if temp_filename is not None and os.path.isfile(temp_filename):
+            os.remove(temp_filename)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+_VERSION                                    = 2
+
+# ----------------------------------------------------------------------
+def _GetModifiedTime(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return None